@@ -4,8 +4,10 @@ Running this script launches the application.
 """
 
 from json import dumps
+from os import environ
 from pathlib import Path
 from sys import maxsize
+from uuid import uuid4
 
 import dash
 from dash import Dash
@@ -22,13 +24,27 @@ import dash_html_components as html
 import dash_core_components as dcc
 from dash_html_components import Div
 from flask import Flask
-import plotly.graph_objects as go
 
-from data_parser import get_app_data, parse_fields_from_example_file
-from main_fig_generator import (get_main_fig,
+from bundles import get_bundle_ids, load_bundle, load_bundles
+from cache import get_cache, get_cache_key, get_fig_cache
+from dataset_store import add_dataset, append_dataset, get_dataset
+from data_parser import (get_main_fig_viewport,
+                         get_viewport_app_data,
+                         parse_fields_from_example_file)
+from main_fig_generator import (get_compact_fig,
+                                get_dict_copy,
+                                get_fig_diff,
+                                get_main_fig,
+                                get_main_fig_patch,
+                                get_main_fig_render_opts,
+                                get_patched_fig,
                                 get_zoomed_out_main_fig,
+                                get_zoomed_out_main_fig_patch,
                                 get_main_fig_x_axis,
-                                get_main_fig_y_axis)
+                                get_main_fig_y_axis,
+                                is_viewport_culling_needed,
+                                is_zoomed_out_lod_needed,
+                                update_main_fig_zoom)
 from modal_generator import (get_upload_data_modal,
                              get_create_config_file_modal,
                              get_create_config_modal_form,
@@ -38,6 +54,13 @@ from modal_generator import (get_upload_data_modal,
 from legend_fig_generator import (get_node_symbol_legend_fig,
                                   get_link_legend_col,
                                   get_node_color_legend_fig)
+from jobs import (JOB_STAGES,
+                  JOB_STAGE_LABELS,
+                  fetch_app_data,
+                  get_job_status,
+                  is_app_data_job_needed,
+                  set_session_job,
+                  start_app_data_job)
 
 # For gunicorn during docker deployment
 server = Flask(__name__)
@@ -51,6 +74,208 @@ app = Dash(
     suppress_callback_exceptions=True
 )
 
+# Recently generated ``get_app_data`` ret vals, so zoomed in main figs
+# can be culled, and figs can be updated after selecting or filtering,
+# without recomputing them. By default, they are shared by gunicorn
+# workers through a directory on disk. Set AMR_TV_CACHE_BACKEND to
+# "lru" to keep them in each worker instead, or to "redis" to use a
+# local Redis-compatible server.
+APP_DATA_CACHE_BACKEND = environ.get("AMR_TV_CACHE_BACKEND", "disk")
+app_data_cache = get_cache(APP_DATA_CACHE_BACKEND)
+
+# Figs recently sent to each session, so figs can be updated by only
+# sending changed props, without the browser sending its figs back.
+fig_cache = get_fig_cache(APP_DATA_CACHE_BACKEND)
+
+# Whether app data that is not cached yet is generated in a background
+# process. Only possible if other workers can read the results.
+APP_DATA_JOBS_ENABLED = APP_DATA_CACHE_BACKEND != "lru"
+
+# Bundles of precomputed app data are loaded when the user opens them.
+# Set AMR_TV_PRELOAD_BUNDLES to "1" to load all of them at startup
+# instead.
+if environ.get("AMR_TV_PRELOAD_BUNDLES") == "1":
+    load_bundles(app_data_cache)
+
+
+def get_cached_app_data(dataset_id, **kwargs):
+    """Get ``get_app_data`` ret val, reusing cached vals if possible.
+
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param kwargs: Keyword args passed to ``get_app_data``
+    :return: ``get_app_data`` ret val
+    :rtype: dict
+    :raises PreventUpdate: If there are no files stored under
+        ``dataset_id``.
+    """
+    app_data = fetch_app_data(app_data_cache, dataset_id, kwargs)
+    if app_data is None:
+        raise PreventUpdate
+    return app_data
+
+
+def get_unstale_vals(stale_vals_tbl, selected_nodes, filtered_node_symbols,
+                     filtered_node_colors, filtered_link_types):
+    """Replace vals specified in a previously generated viz.
+
+    :param stale_vals_tbl: Collection identifying dcc vars specified in
+        previously generated viz.
+    :type stale_vals_tbl: dict[str[None]]
+    :param selected_nodes: Currently selected nodes
+    :type selected_nodes: dict
+    :param filtered_node_symbols: Currently filtered node symbols
+    :type filtered_node_symbols: dict
+    :param filtered_node_colors: Currently filtered node colors
+    :type filtered_node_colors: dict
+    :param filtered_link_types: Currently filtered link types
+    :type filtered_link_types: dict
+    :return: Vals, with stale vals replaced by empty dicts
+    :rtype: tuple[dict]
+    """
+    if "selected-nodes" in stale_vals_tbl:
+        selected_nodes = {}
+    if "filtered-node-symbols" in stale_vals_tbl:
+        filtered_node_symbols = {}
+    if "filtered-node-colors" in stale_vals_tbl:
+        filtered_node_colors = {}
+    if "filtered-link-types" in stale_vals_tbl:
+        filtered_link_types = {}
+    return (selected_nodes, filtered_node_symbols, filtered_node_colors,
+            filtered_link_types)
+
+
+def get_fig_render_opts(fig):
+    """Get opts used to draw a fig, like whether WebGL was used.
+
+    :param fig: Plotly figure dict currently in the browser
+    :type fig: dict
+    :return: Keyword args that draw the same traces as ``fig``, when
+        passed to the fn that generated it. Empty if ``fig`` is
+        ``None``.
+    :rtype: dict
+    """
+    return dict(get_fig_meta(fig).get("render_opts", {}))
+
+
+def get_fig_meta(fig):
+    """Get meta of a fig, like the app data versions it was drawn with.
+
+    :param fig: Plotly figure dict currently in the browser
+    :type fig: dict
+    :return: Meta of ``fig``. Empty if ``fig`` is ``None``, or has no
+        meta.
+    :rtype: dict
+    """
+    if not fig:
+        return {}
+    return fig["layout"].get("meta") or {}
+
+
+def get_cached_fig(session_id, fig_state, app_data):
+    """Get fig currently in the browser, from figs sent to session.
+
+    The browser only sends the id of its fig, and the visible ranges
+    if the user zoomed it. Zooming is applied to the cached fig the
+    same way ``updateMainVizFigs`` applies it clientside.
+
+    :param session_id: Id of browser session
+    :type session_id: str
+    :param fig_state: Id of fig in browser, and its visible x-axis
+        and y-axis ranges, if any.
+    :type fig_state: dict
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :return: Compact Plotly figure dict currently in the browser.
+        ``None`` if it is not cached anymore.
+    :rtype: dict|None
+    """
+    if not fig_state:
+        return None
+    fig = fig_cache.get(get_cache_key("fig", session_id, fig_state["fig_id"]))
+    if fig is None:
+        return None
+    # Cached figs are shared, so only copies are zoomed. Zooming
+    # only changes dicts, and replaces other vals instead of modifying
+    # them.
+    fig = {"data": [get_dict_copy(e) for e in fig["data"]],
+           "layout": get_dict_copy(fig["layout"])}
+    xaxis_range = fig_state.get("xaxis_range")
+    yaxis_range = fig_state.get("yaxis_range")
+    if xaxis_range and yaxis_range:
+        first_x_axis_range = app_data["main_fig_xaxis_range"]
+        change_in_range = xaxis_range[1] - xaxis_range[0]
+        change_in_range /= first_x_axis_range[1] - first_x_axis_range[0]
+        update_main_fig_zoom(fig, xaxis_range, yaxis_range, change_in_range)
+    return fig
+
+
+def get_patched_trace_indices(fig_patch):
+    """Get indices of traces in a fig patch.
+
+    :param fig_patch: ``main_fig_generator.get_main_fig_patch`` or
+        ``main_fig_generator.get_zoomed_out_main_fig_patch`` ret val
+    :type fig_patch: dict|None
+    :return: Indices of patched traces, or ``None`` if there is no
+        patch.
+    :rtype: list[int]|None
+    """
+    if fig_patch is None:
+        return None
+    return list(fig_patch["data"])
+
+
+def get_fig_update(old_fig, new_fig, session_id=None,
+                   patched_trace_indices=None):
+    """Get val used by ``applyFigUpdate`` clientside to update a graph.
+
+    If the old and new figs have the same traces, only the props that
+    changed are sent to the browser. Otherwise, the whole new fig is
+    sent.
+
+    If ``session_id`` is given, the new fig is cached with a new id in
+    its meta, so ``get_cached_fig`` can get it for the next update.
+    Several figs are kept per session, because the browser drops
+    responses superseded by a newer request, and keeps its old fig.
+
+    :param old_fig: Plotly figure dict currently in the browser
+    :type old_fig: dict
+    :param new_fig: Plotly figure dict that should replace it
+    :type new_fig: dict
+    :param session_id: Id of browser session
+    :type session_id: str
+    :param patched_trace_indices: Indices of traces patched, if
+        ``new_fig`` is a ``main_fig_generator.get_patched_fig`` ret val
+        for ``old_fig``. ``new_fig`` is already compact then, and only
+        these traces are compared.
+    :type patched_trace_indices: list[int]
+    :return: Dict with the compact new fig under ``fig``, or the
+        ``main_fig_generator.get_fig_diff`` ret val under ``diff``.
+        ``no_update`` if nothing changed.
+    :rtype: dict
+    """
+    if new_fig is no_update:
+        return no_update
+    if patched_trace_indices is None:
+        new_fig = get_compact_fig(new_fig)
+    fig_diff = get_fig_diff(old_fig,
+                            new_fig,
+                            trace_indices=patched_trace_indices)
+    if fig_diff is not None and not fig_diff["data"] \
+            and not fig_diff["layout"]:
+        return no_update
+    if session_id is not None:
+        fig_id = uuid4().hex
+        new_fig["layout"]["meta"] = \
+            dict(new_fig["layout"].get("meta") or {}, fig_id=fig_id)
+        fig_cache.set(get_cache_key("fig", session_id, fig_id), new_fig)
+        if fig_diff is not None:
+            fig_diff["layout"]["meta"] = \
+                dict(fig_diff["layout"].get("meta", {}), fig_id=fig_id)
+    if fig_diff is None:
+        return {"fig": new_fig}
+    return {"diff": fig_diff}
+
 # We initially serve an empty container
 app.layout = dbc.Container(
     children=dcc.Store("first-launch"),
@@ -91,6 +316,13 @@ def launch_app(_):
                         type="circle"
                     ),
                     width="1"
+                ),
+                dbc.Col(
+                    dbc.Progress(id="app-data-job-progress",
+                                 striped=True,
+                                 animated=True,
+                                 style={"display": "none"}),
+                    width=4
                 )
             ],
             className="my-1 g-0",
@@ -243,14 +475,32 @@ def launch_app(_):
                 )
             ]
         ),
-        get_upload_data_modal(),
+        get_upload_data_modal(get_bundle_ids()),
         get_create_config_file_modal(),
         dcc.Store(id="selected-nodes", data={}),
         dcc.Store(id="filtered-node-symbols", data={}),
         dcc.Store(id="filtered-node-colors", data={}),
         dcc.Store(id="filtered-link-types", data={}),
         dcc.Store(id="added-scroll-handlers", data=False),
+        dcc.Store(id="link-filter-update-scheduled", data=False),
+        # Clicked clientside once link filters stop changing
+        html.Button(id="link-filter-update-btn", style={"display": "none"}),
+        dcc.Store(id="main-graph-fig-update"),
+        dcc.Store(id="main-graph-x-axis-fig-update"),
+        dcc.Store(id="main-graph-y-axis-fig-update"),
+        dcc.Store(id="main-graph-viewport-request"),
+        # Ids of figs in browser, and visible ranges of main graph
+        dcc.Store(id="main-graph-fig-state"),
+        dcc.Store(id="zoomed-out-main-graph-fig-update"),
+        dcc.Store(id="zoomed-out-main-graph-fig-state"),
         dcc.Store("new-upload", data=False),
+        dcc.Store(id="dataset-id"),
+        dcc.Store(id="session-id"),
+        dcc.Store(id="app-data-job"),
+        dcc.Store(id="app-data-job-done"),
+        dcc.Interval(id="app-data-job-interval",
+                     interval=1000,
+                     disabled=True),
         dcc.Store("stale-vals-tbl", data={}),
         dcc.Store("example-file-field-opts"),
         dcc.Store("config-file-generation-started", data=False),
@@ -395,6 +645,100 @@ def toggle_viz_btn_color(sample_file_contents, config_file_contents):
         return "secondary"
 
 
+@app.callback(
+    Output("dataset-id", "data"),
+    Output("session-id", "data"),
+    Output("upload-error-msg-label", "children"),
+    Output("upload-error-msg-col", "style"),
+    Input("viz-btn", "n_clicks"),
+    Input("open-bundle-btn", "n_clicks"),
+    State("upload-sample-file", "contents"),
+    State("upload-config-file", "contents"),
+    State("upload-matrix-file", "contents"),
+    State("append-data-switch", "value"),
+    State("bundle-select", "value"),
+    State("dataset-id", "data"),
+    State("session-id", "data"),
+    prevent_initial_call=True
+)
+def store_uploaded_files(_, __, sample_file_contents, config_file_contents,
+                         matrix_file_contents, append_data_switch_vals,
+                         bundle_id, old_dataset_id, session_id):
+    """Store uploaded files server-side after user clicks viz btn.
+
+    This is the only callback uploaded files are sent to. Other
+    callbacks only send the id of the stored files. The browser tab is
+    also given a session id the first time, so later updates can
+    abandon background jobs started by earlier ones.
+
+    If the user chose to append samples to the current data, the
+    uploaded sample and matrix files only need the new samples, and
+    the config file is not needed.
+
+    Opening a bundle stores its files instead, and caches its
+    precomputed app data.
+
+    Sample files that cannot be appended are not stored, and the user
+    is shown why instead.
+
+    :param _: User clicked viz btn
+    :param __: User clicked open bundle btn
+    :param sample_file_contents: Contents of uploaded sample file
+    :type sample_file_contents: str
+    :param config_file_contents: Contents of uploaded config file
+    :type config_file_contents: str
+    :param matrix_file_contents: Contents of uploaded matrix file
+    :type matrix_file_contents: str
+    :param append_data_switch_vals: Vals of append data switch
+    :type append_data_switch_vals: list[str]
+    :param bundle_id: Id of bundle selected by user
+    :type bundle_id: str
+    :param old_dataset_id: Id of files currently visualized, if any
+    :type old_dataset_id: str
+    :param session_id: Id of browser session, if it has one
+    :type session_id: str
+    :return: Id of stored files, id of browser session, and error msg
+        shown in upload data modal with its style.
+    :rtype: tuple[str|dict]
+    """
+    if session_id is None:
+        session_id = uuid4().hex
+
+    ctx = dash.callback_context
+    trigger = ctx.triggered[0]["prop_id"]
+    if trigger == "open-bundle-btn.n_clicks":
+        dataset_id = load_bundle(bundle_id, app_data_cache)
+        if dataset_id is None:
+            raise PreventUpdate
+        return dataset_id, session_id, None, {"visibility": "hidden"}
+
+    if sample_file_contents is None:
+        raise PreventUpdate
+
+    sample_file_base64_str = sample_file_contents.split(",")[1]
+    matrix_file_base64_str = \
+        matrix_file_contents.split(",")[1] if matrix_file_contents else None
+    dataset_id = None
+    if "append" in append_data_switch_vals and old_dataset_id is not None:
+        try:
+            dataset_id = \
+                append_dataset(old_dataset_id,
+                               sample_file_base64_str,
+                               matrix_file_base64_str=matrix_file_base64_str)
+        except ValueError as e:
+            return no_update, session_id, str(e), {"visibility": "visible"}
+    # Not appending, or current data is not stored anymore
+    if dataset_id is None:
+        if config_file_contents is None:
+            raise PreventUpdate
+        config_file_base64_str = config_file_contents.split(",")[1]
+        dataset_id = \
+            add_dataset(sample_file_base64_str,
+                        config_file_base64_str,
+                        matrix_file_base64_str=matrix_file_base64_str)
+    return dataset_id, session_id, None, {"visibility": "hidden"}
+
+
 @app.callback(
     Output("create-config-file-modal", "is_open"),
     inputs=[
@@ -1019,7 +1363,13 @@ def select_nodes(click_data, selected_nodes, stale_vals_tbl):
     :return: New table of selected nodes
     :rtype: dict
     """
-    clicked_node_opacity = click_data["points"][0]["customdata"]
+    # Avoid selecting points in link traces, which have no customdata,
+    # and in label traces, which have customdata that is not a list.
+    if not isinstance(click_data["points"][0].get("customdata"), list):
+        raise PreventUpdate
+
+    [clicked_node_opacity, clicked_node_index] = \
+        click_data["points"][0]["customdata"]
 
     # Avoid selecting filtered nodes
     if not clicked_node_opacity:
@@ -1030,7 +1380,7 @@ def select_nodes(click_data, selected_nodes, stale_vals_tbl):
         selected_nodes = {}
 
     new_selected_nodes = selected_nodes
-    clicked_node = str(click_data["points"][0]["pointIndex"])
+    clicked_node = str(clicked_node_index)
     if clicked_node in selected_nodes:
         new_selected_nodes.pop(clicked_node)
     else:
@@ -1184,33 +1534,6 @@ def toggle_link_legend_filter_form(_, is_open):
     return not is_open
 
 
-@app.callback(
-    inputs=[
-        Input({"type": "link-legend-slider", "index": ALL}, "id"),
-        Input({"type": "link-legend-slider", "index": ALL}, "value")
-    ],
-    output=Output("link-legend-slider-vals-dict", "data"),
-)
-def update_link_legend_slider_dict(link_legend_slider_ids,
-                                   link_legend_slider_vals):
-    """Update dcc var that tracks link legend slider vals.
-
-    :param link_legend_slider_ids: Link legend slider ids
-    :type link_legend_slider_ids: list[dict[str[str]]]
-    :param link_legend_slider_vals: Link legend slider vals;
-        e.g., [[1, 10], [20, 30]].
-    :type link_legend_slider_vals: list[list]
-    :return: Dict mapping link types to slider vals
-    :rtype: dict[str[list[int]]]
-    """
-    link_legend_slider_vals_dict = {}
-    for i, div_id in enumerate(link_legend_slider_ids):
-        link = div_id["index"]
-        link_legend_slider_vals_dict[link] = \
-            link_legend_slider_vals[i]
-    return link_legend_slider_vals_dict
-
-
 @app.callback(
     inputs=[
         Input({"type": "link-legend-filter-collapse", "index": ALL}, "id"),
@@ -1238,27 +1561,52 @@ def update_link_legend_collapse_dict(link_legend_filter_collapse_ids,
 
 
 @app.callback(
-    inputs=[
-        Input({"type": "link-legend-filter-form", "index": ALL}, "id"),
-        Input({"type": "link-legend-filter-form", "index": ALL}, "options"),
-        Input({"type": "link-legend-filter-form", "index": ALL}, "value")
+    inputs=Input("link-filter-update-btn", "n_clicks"),
+    state=[
+        State({"type": "link-legend-slider", "index": ALL}, "id"),
+        State({"type": "link-legend-slider", "index": ALL}, "value"),
+        State({"type": "link-legend-filter-form", "index": ALL}, "id"),
+        State({"type": "link-legend-filter-form", "index": ALL}, "options"),
+        State({"type": "link-legend-filter-form", "index": ALL}, "value")
+    ],
+    output=[
+        Output("link-legend-slider-vals-dict", "data"),
+        Output("link-legend-neq-dict", "data")
     ],
-    output=Output("link-legend-neq-dict", "data")
+    prevent_initial_call=True
 )
-def update_link_legend_neq_dict(link_legend_filter_ids,
-                                link_legend_filter_opts,
-                                link_legend_filter_vals):
-    """Update dcc var that tracks deselected vals in link filter forms.
+def update_link_filter_dicts(_, link_legend_slider_ids,
+                             link_legend_slider_vals, link_legend_filter_ids,
+                             link_legend_filter_opts,
+                             link_legend_filter_vals):
+    """Update dcc vars that track link legend slider and filter vals.
+
+    Link legend sliders and filter forms are debounced clientside. So
+    this is only triggered once they stop changing, and several
+    changes are applied at once.
 
+    :param _: Link legend sliders or filter forms stopped changing
+    :param link_legend_slider_ids: Link legend slider ids
+    :type link_legend_slider_ids: list[dict[str[str]]]
+    :param link_legend_slider_vals: Link legend slider vals;
+        e.g., [[1, 10], [20, 30]].
+    :type link_legend_slider_vals: list[list]
     :param link_legend_filter_ids: Link filter form ids
     :type link_legend_filter_ids: list[dict[str, str]]
     :param link_legend_filter_opts: Link filter form opts
     :type link_legend_filter_opts: list[dict[str[int]]]
     :param link_legend_filter_vals: Link filter form vals
     :type link_legend_filter_vals: list[list[int]]
-    :return: Dict mapping link types to unselected filter form vals
-    :rtype: dict[str[list[int]]]
+    :return: Dict mapping link types to slider vals, and dict mapping
+        link types to unselected filter form vals.
+    :rtype: tuple[dict[str[list[int]]]]
     """
+    link_legend_slider_vals_dict = {}
+    for i, div_id in enumerate(link_legend_slider_ids):
+        link = div_id["index"]
+        link_legend_slider_vals_dict[link] = \
+            link_legend_slider_vals[i]
+
     link_legend_neq_dict = {}
     for i, div_id in enumerate(link_legend_filter_ids):
         link = div_id["index"]
@@ -1266,7 +1614,7 @@ def update_link_legend_neq_dict(link_legend_filter_ids,
         val_set = set(link_legend_filter_vals[i])
         link_legend_neq_dict[link] = \
             [e["value"] for e in opts if e["value"] not in val_set]
-    return link_legend_neq_dict
+    return link_legend_slider_vals_dict, link_legend_neq_dict
 
 
 @app.callback(
@@ -1277,27 +1625,26 @@ def update_link_legend_neq_dict(link_legend_filter_ids,
         Input("filtered-link-types", "data"),
         Input("link-legend-slider-vals-dict", "data"),
         Input("link-legend-neq-dict", "data"),
-        Input("viz-btn", "n_clicks"),
-        Input("main-graph", "relayoutData")
+        Input("dataset-id", "data"),
+        Input("main-graph-viewport-request", "data"),
+        Input("app-data-job-done", "data")
     ],
     state=[
-        State("upload-sample-file", "contents"),
-        State("upload-config-file", "contents"),
-        State("upload-matrix-file", "contents"),
-        State("main-graph", "figure"),
-        State("main-graph-x-axis", "figure"),
-        State("main-graph-y-axis", "figure"),
+        State("main-graph-fig-state", "data"),
+        State("zoomed-out-main-graph-fig-state", "data"),
         State("link-legend-filter-collapse-states-dict", "data"),
-        State("stale-vals-tbl", "data")
+        State("stale-vals-tbl", "data"),
+        State("session-id", "data"),
+        State("app-data-job", "data")
     ],
     output=[
-        Output("main-graph", "figure"),
+        Output("main-graph-fig-update", "data"),
         Output("main-graph", "style"),
-        Output("main-graph-x-axis", "figure"),
+        Output("main-graph-x-axis-fig-update", "data"),
         Output("main-graph-x-axis", "style"),
-        Output("main-graph-y-axis", "figure"),
+        Output("main-graph-y-axis-fig-update", "data"),
         Output("main-graph-y-axis", "style"),
-        Output("zoomed-out-main-graph", "figure"),
+        Output("zoomed-out-main-graph-fig-update", "data"),
         Output("node-shape-legend-title", "children"),
         Output("node-shape-legend-graph", "figure"),
         Output("link-legend-col", "children"),
@@ -1305,17 +1652,18 @@ def update_link_legend_neq_dict(link_legend_filter_ids,
         Output("node-color-legend-graph", "figure"),
         Output("y-axis-legend-col", "children"),
         Output("graph-loading", "children"),
-        Output("stale-vals-tbl", "data")
+        Output("stale-vals-tbl", "data"),
+        Output("app-data-job", "data")
     ],
     prevent_initial_call=True
 )
 def update_main_viz(selected_nodes, filtered_node_symbols,
                     filtered_node_colors, filtered_link_types,
-                    link_legend_slider_vals_dict, link_legend_neq_dict, _,
-                    relayout_data, sample_file_contents, config_file_contents,
-                    matrix_file_contents, old_main_fig, old_main_fig_x_axis,
-                    old_main_fig_y_axis, link_filter_collapse_states_dict,
-                    stale_vals_tbl):
+                    link_legend_slider_vals_dict, link_legend_neq_dict,
+                    dataset_id, viewport_request, app_data_job_done,
+                    main_fig_state, zoomed_out_main_fig_state,
+                    link_filter_collapse_states_dict, stale_vals_tbl,
+                    session_id, pending_app_data_job):
     """Update main graph, axes, zoomed-out main graph, and legends.
 
     Current triggers:
@@ -1327,7 +1675,9 @@ def update_main_viz(selected_nodes, filtered_node_symbols,
     * User filters links by type
     * User modifies link slider vals
     * User modifies link filter forms
-    * User adjusts zoom level of free-zoom graph
+    * User zooms free-zoom graph outside of elements sent for culled
+      fig.
+    * Background job started by an earlier trigger generated app data
 
     :param selected_nodes: Currently selected nodes
     :type selected_nodes: dict
@@ -1343,29 +1693,34 @@ def update_main_viz(selected_nodes, filtered_node_symbols,
     :param link_legend_neq_dict: Dict mapping link types to unselected
         filter form vals.
     :type link_legend_neq_dict: dict[str[list[int]]]
-    :param _: User clicked viz btn
-    :param relayout_data: Information on main graph relayout event
-    :type relayout_data: dict
-    :param sample_file_contents: Contents of uploaded sample file
-    :type sample_file_contents: str
-    :param config_file_contents: Contents of uploaded config file
-    :type config_file_contents: str
-    :param matrix_file_contents: Contents of uploaded matrix file
-    :type matrix_file_contents: str
-    :param old_main_fig: Current main fig
-    :type old_main_fig: go.Figure
-    :param old_main_fig_x_axis: Current main x-axis fig
-    :type old_main_fig_x_axis: go.Figure
-    :param old_main_fig_y_axis: Current main y-axis fig
-    :type old_main_fig_y_axis: go.Figure
+    :param dataset_id: Id of files stored after user clicked viz btn
+    :type dataset_id: str
+    :param viewport_request: Visible ranges of a culled main fig,
+        after zooming outside of its viewport.
+    :type viewport_request: dict[str, list[float]]
+    :param app_data_job_done: Background job that generated app data,
+        and the trigger that started it.
+    :type app_data_job_done: dict[str, str]
+    :param main_fig_state: Id of current main fig, and its visible
+        x-axis and y-axis ranges if user zoomed it.
+    :type main_fig_state: dict
+    :param zoomed_out_main_fig_state: Id of current zoomed-out main
+        fig.
+    :type zoomed_out_main_fig_state: dict
     :param link_filter_collapse_states_dict: Dict mapping link types to
         filter form collapse states.
     :type link_filter_collapse_states_dict: dict[str[bool]]
     :param stale_vals_tbl: Collection identifying dcc vars specified in
         previously generated viz.
     :type stale_vals_tbl: dict[str[None]]
-    :return: New main graphs, axes, and legends
-    :rtype: tuple[go.Figure]
+    :param session_id: Id of browser session
+    :type session_id: str
+    :param pending_app_data_job: Background job started by an earlier
+        trigger, if it has not been used yet.
+    :type pending_app_data_job: dict[str, str]
+    :return: Updates to main graphs, and new axes and legends. Only a
+        background job, if app data is not cached yet.
+    :rtype: tuple[dict]
     """
     main_fig = no_update
     main_fig_style = no_update
@@ -1381,84 +1736,69 @@ def update_main_viz(selected_nodes, filtered_node_symbols,
     node_color_legend_fig = no_update
     y_axis_legend = no_update
     graph_loading = None
+    app_data_job = no_update
+    main_fig_patch = None
+    zoomed_out_main_fig_patch = None
 
-    if None in [sample_file_contents, config_file_contents]:
+    if dataset_id is None:
         raise PreventUpdate
 
-    sample_file_base64_str = sample_file_contents.split(",")[1]
-    config_file_base64_str = config_file_contents.split(",")[1]
-    matrix_file_base64_str = \
-        matrix_file_contents.split(",")[1] if matrix_file_contents else None
-
     ctx = dash.callback_context
     trigger = ctx.triggered[0]["prop_id"]
-
-    # Not generating new fig; just zooming
-    if trigger == "main-graph.relayoutData":
-        zoom_keys = ["xaxis.range[0]",
-                     "xaxis.range[1]",
-                     "yaxis.range[0]",
-                     "yaxis.range[1]"]
-        autorange_keys = ["xaxis.autorange",
-                          "yaxis.autorange"]
-        zoom_event = all([e in relayout_data for e in zoom_keys])
-        autorange_event = all([e in relayout_data for e in autorange_keys])
-        if not zoom_event and not autorange_event:
-            raise PreventUpdate
-
-        main_fig = go.Figure(old_main_fig)
-        main_fig_x_axis = go.Figure(old_main_fig_x_axis)
-        main_fig_y_axis = go.Figure(old_main_fig_y_axis)
-
-        first_x_axis_range = old_main_fig_x_axis["data"][0]["customdata"]
-        first_y_axis_range = old_main_fig_y_axis["data"][0]["customdata"]
-
-        if zoom_event:
-            new_x_axis_range = old_main_fig["layout"]["xaxis"]["range"]
-            new_y_axis_range = old_main_fig["layout"]["yaxis"]["range"]
-        else:
-            new_x_axis_range = first_x_axis_range
-            new_y_axis_range = first_y_axis_range
-
-        # Should be about equal across x and y
+    # Finish what the trigger that started the job would have done
+    if trigger == "app-data-job-done.data":
+        trigger = app_data_job_done["trigger"]
+        # Hides job progress
+        app_data_job = None
+
+    # Not generating new fig; just refetching elements of a culled fig
+    # that were not sent for the previous viewport. Zooming itself is
+    # handled clientside.
+    if trigger == "main-graph-viewport-request.data":
+        (selected_nodes, filtered_node_symbols, filtered_node_colors,
+         filtered_link_types) = \
+            get_unstale_vals(stale_vals_tbl,
+                             selected_nodes,
+                             filtered_node_symbols,
+                             filtered_node_colors,
+                             filtered_link_types)
+        app_data = get_cached_app_data(
+            dataset_id,
+            selected_nodes=selected_nodes,
+            filtered_node_symbols=filtered_node_symbols,
+            filtered_node_colors=filtered_node_colors,
+            filtered_link_types=filtered_link_types,
+            link_slider_vals_dict=link_legend_slider_vals_dict,
+            link_neq_dict=link_legend_neq_dict
+        )
+        old_main_fig = get_cached_fig(session_id, main_fig_state, app_data)
+        old_zoomed_out_main_fig = None
+        new_x_axis_range = viewport_request["xaxis_range"]
+        new_y_axis_range = viewport_request["yaxis_range"]
+        viewport = get_main_fig_viewport(new_x_axis_range, new_y_axis_range)
+        # Elements are drawn the same way in every viewport
+        main_fig_render_opts = get_fig_render_opts(old_main_fig) \
+            or get_main_fig_render_opts(app_data)
+        main_fig = get_main_fig(get_viewport_app_data(app_data, viewport),
+                                **main_fig_render_opts)
+        main_fig["layout"]["meta"]["viewport"] = viewport
+
+        first_x_axis_range = app_data["main_fig_xaxis_range"]
         change_in_range = new_x_axis_range[1] - new_x_axis_range[0]
-        change_in_range /= (first_x_axis_range[1] - first_x_axis_range[0])
-
-        # TODO do not used hardcoded values
-        main_fig_nodes_trace = \
-            [e for e in old_main_fig["data"]
-             if "name" in e and e["name"] == "main_fig_nodes_trace"][0]
-        new_marker_size = max(1, 24/change_in_range)
-        new_textfont_size = max(1, 16/change_in_range)
-
-        main_fig.update_traces(marker={"size": new_marker_size},
-                               textfont={"size": new_textfont_size},
-                               selector={"name": "main_fig_nodes_trace"})
-        main_fig_x_axis.update_traces(textfont={"size": new_textfont_size},
-                                      selector={
-                                          "name": "main_fig_x_axis_trace"
-                                      })
-        main_fig_y_axis.update_traces(textfont={"size": new_textfont_size},
-                                      selector={
-                                          "name": "main_fig_y_axis_trace"
-                                      })
-
-        main_fig.update_layout(xaxis={"range": new_x_axis_range,
-                                      "autorange": False},
-                               yaxis={"range": new_y_axis_range,
-                                      "autorange": False})
-        main_fig_x_axis.update_layout(xaxis={"range": new_x_axis_range})
-        main_fig_y_axis.update_layout(yaxis={"range": new_y_axis_range})
+        change_in_range /= first_x_axis_range[1] - first_x_axis_range[0]
+        update_main_fig_zoom(main_fig,
+                             new_x_axis_range,
+                             new_y_axis_range,
+                             change_in_range)
     # Generating new fig or selecting/filtering
     else:
-        if trigger == "viz-btn.n_clicks":
+        if trigger == "dataset-id.data":
             # Reset some stale vals if generating new fig
             link_legend_slider_vals_dict = {}
             link_filter_collapse_states_dict = {}
             link_legend_neq_dict = {}
-            old_main_fig = None
-            old_main_fig_x_axis = None
-            old_main_fig_y_axis = None
+            main_fig_state = None
+            zoomed_out_main_fig_state = None
             # Also declare that a bunch of vals are now stale
             stale_vals_tbl = {"selected-nodes": None,
                               "filtered-node-symbols": None,
@@ -1477,63 +1817,139 @@ def update_main_viz(selected_nodes, filtered_node_symbols,
             # stale vals as empty dicts each time this fn is called.
             trigger_id = trigger.split(".data")[0]
             stale_vals_tbl.pop(trigger_id, None)
-            if "selected-nodes" in stale_vals_tbl:
-                selected_nodes = {}
-            if "filtered-node-symbols" in stale_vals_tbl:
-                filtered_node_symbols = {}
-            if "filtered-node-colors" in stale_vals_tbl:
-                filtered_node_colors = {}
-            if "filtered-link-types" in stale_vals_tbl:
-                filtered_link_types = {}
-
-        app_data = \
-            get_app_data(sample_file_base64_str,
-                         config_file_base64_str,
-                         matrix_file_base64_str=matrix_file_base64_str,
-                         selected_nodes=selected_nodes,
-                         filtered_node_symbols=filtered_node_symbols,
-                         filtered_node_colors=filtered_node_colors,
-                         filtered_link_types=filtered_link_types,
-                         link_slider_vals_dict=link_legend_slider_vals_dict,
-                         link_neq_dict=link_legend_neq_dict)
-        zoomed_out_app_data = \
-            get_app_data(sample_file_base64_str,
-                         config_file_base64_str,
-                         matrix_file_base64_str=matrix_file_base64_str,
-                         selected_nodes=selected_nodes,
-                         filtered_node_symbols=filtered_node_symbols,
-                         filtered_node_colors=filtered_node_colors,
-                         filtered_link_types=filtered_link_types,
-                         link_slider_vals_dict=link_legend_slider_vals_dict,
-                         link_neq_dict=link_legend_neq_dict,
-                         vpsc=True)
-        main_fig = get_main_fig(app_data)
-        zoomed_out_main_fig = get_zoomed_out_main_fig(zoomed_out_app_data)
-        node_symbol_legend_fig = get_node_symbol_legend_fig(app_data)
-        node_color_legend_fig = get_node_color_legend_fig(app_data)
-        link_legend_col = get_link_legend_col(app_data,
-                                              link_filter_collapse_states_dict)
-
-        # Selecting/filtering
+            (selected_nodes, filtered_node_symbols, filtered_node_colors,
+             filtered_link_types) = \
+                get_unstale_vals(stale_vals_tbl,
+                                 selected_nodes,
+                                 filtered_node_symbols,
+                                 filtered_node_colors,
+                                 filtered_link_types)
+
+        app_data_kwargs = dict(
+            selected_nodes=selected_nodes,
+            filtered_node_symbols=filtered_node_symbols,
+            filtered_node_colors=filtered_node_colors,
+            filtered_link_types=filtered_link_types,
+            link_slider_vals_dict=link_legend_slider_vals_dict,
+            link_neq_dict=link_legend_neq_dict
+        )
+        # Generating app data may take longer than a request can run,
+        # so it is left to a background job. This fn is triggered again
+        # once the job is done. Nothing else is updated until then. Any
+        # job started by an earlier trigger is abandoned, as its
+        # results would not be shown anymore.
+        if APP_DATA_JOBS_ENABLED and is_app_data_job_needed(app_data_cache,
+                                                            dataset_id,
+                                                            app_data_kwargs):
+            if get_dataset(dataset_id) is None:
+                raise PreventUpdate
+            job_id = start_app_data_job(APP_DATA_CACHE_BACKEND,
+                                        session_id,
+                                        dataset_id,
+                                        app_data_kwargs)
+            app_data_job = {"job_id": job_id, "trigger": trigger}
+            return (no_update,) * 15 + (app_data_job,)
+        elif APP_DATA_JOBS_ENABLED and pending_app_data_job:
+            set_session_job(APP_DATA_CACHE_BACKEND, session_id)
+            app_data_job = None
+
+        app_data = get_cached_app_data(dataset_id, **app_data_kwargs)
+        old_main_fig = get_cached_fig(session_id, main_fig_state, app_data)
+        old_zoomed_out_main_fig = \
+            get_cached_fig(session_id, zoomed_out_main_fig_state, app_data)
+        # Selecting/filtering draws figs the same way as before, so
+        # only changed props need to be sent to the browser. Culled
+        # figs are drawn the same way as the full fig.
+        main_fig_render_opts = get_fig_render_opts(old_main_fig) \
+            or get_main_fig_render_opts(app_data)
+        zoomed_out_main_fig_render_opts = \
+            get_fig_render_opts(old_zoomed_out_main_fig)
+
+        first_x_axis_range = app_data["main_fig_xaxis_range"]
+        first_y_axis_range = app_data["main_fig_yaxis_range"]
         if old_main_fig:
-            first_x_axis_range = old_main_fig_x_axis["data"][0]["customdata"]
             old_x_axis_range = old_main_fig["layout"]["xaxis"]["range"]
-            # Need to adjust some things if fig was zoomed
-            if first_x_axis_range != old_x_axis_range:
-                old_y_axis_range = old_main_fig["layout"]["yaxis"]["range"]
-                main_fig.update_layout(xaxis={"range": old_x_axis_range,
-                                              "autorange": False},
-                                       yaxis={"range": old_y_axis_range,
-                                              "autorange": False})
-                main_fig_nodes_trace = \
-                    [e for e in old_main_fig["data"]
-                     if "name" in e and e["name"] == "main_fig_nodes_trace"][0]
-                old_marker_size = main_fig_nodes_trace["marker"]["size"]
-                old_textfont_size = main_fig_nodes_trace["textfont"]["size"]
-                main_fig.update_traces(marker={"size": old_marker_size},
-                                       textfont={"size": old_textfont_size},
-                                       selector={"name": "main_fig_nodes_trace"})
+            old_y_axis_range = old_main_fig["layout"]["yaxis"]["range"]
+        else:
+            old_x_axis_range = first_x_axis_range
+            old_y_axis_range = first_y_axis_range
+        # Need to adjust some things if fig was zoomed
+        zoomed = first_x_axis_range != old_x_axis_range
+        viewport = None
+        if is_viewport_culling_needed(app_data):
+            # Elements of the old fig's viewport are still around the
+            # visible range, or the browser would have refetched them.
+            # The full fig is also the viewport of an unzoomed fig.
+            viewport = get_fig_meta(old_main_fig).get("viewport")
+            if viewport is None and zoomed:
+                viewport = get_main_fig_viewport(old_x_axis_range,
+                                                 old_y_axis_range)
+            elif viewport is None:
+                viewport = [first_x_axis_range, first_y_axis_range]
+        main_fig_app_data = app_data
+        if viewport and viewport != [first_x_axis_range, first_y_axis_range]:
+            main_fig_app_data = get_viewport_app_data(app_data, viewport)
+
+        # Node states do not change the layout, so only the traces of
+        # nodes and of links that changed are generated again.
+        if old_main_fig and get_fig_meta(old_main_fig).get("viewport") \
+                == viewport:
+            main_fig_patch = get_main_fig_patch(
+                main_fig_app_data,
+                get_fig_meta(old_main_fig).get("version_dict"),
+                **main_fig_render_opts
+            )
+        if main_fig_patch is None:
+            main_fig = get_main_fig(main_fig_app_data, **main_fig_render_opts)
+            if viewport:
+                main_fig["layout"]["meta"]["viewport"] = viewport
+        else:
+            main_fig = get_patched_fig(old_main_fig, main_fig_patch)
+        if zoomed:
+            change_in_range = old_x_axis_range[1] - old_x_axis_range[0]
+            change_in_range /= first_x_axis_range[1] - first_x_axis_range[0]
+            update_main_fig_zoom(main_fig,
+                                 old_x_axis_range,
+                                 old_y_axis_range,
+                                 change_in_range)
+
+        # Aggregated cells do not need node overlap removal
+        zoomed_out_main_fig_render_opts["lod"] = \
+            is_zoomed_out_lod_needed(app_data)
+        if zoomed_out_main_fig_render_opts["lod"]:
+            zoomed_out_app_data = app_data
         else:
+            zoomed_out_app_data = \
+                get_cached_app_data(dataset_id, vpsc=True, **app_data_kwargs)
+        if old_zoomed_out_main_fig:
+            zoomed_out_main_fig_patch = get_zoomed_out_main_fig_patch(
+                zoomed_out_app_data,
+                get_fig_meta(old_zoomed_out_main_fig).get("version_dict"),
+                **zoomed_out_main_fig_render_opts
+            )
+        if zoomed_out_main_fig_patch is None:
+            zoomed_out_main_fig = \
+                get_zoomed_out_main_fig(zoomed_out_app_data,
+                                        main_fig_app_data=app_data,
+                                        **zoomed_out_main_fig_render_opts)
+        else:
+            zoomed_out_main_fig = \
+                get_patched_fig(old_zoomed_out_main_fig,
+                                zoomed_out_main_fig_patch)
+        # Legends only change if their own vals were updated
+        if trigger in ["dataset-id.data", "filtered-node-symbols.data"]:
+            node_symbol_legend_fig = get_node_symbol_legend_fig(app_data)
+        if trigger in ["dataset-id.data", "filtered-node-colors.data"]:
+            node_color_legend_fig = get_node_color_legend_fig(app_data)
+        if trigger not in ["selected-nodes.data",
+                           "filtered-node-symbols.data",
+                           "filtered-node-colors.data"]:
+            link_legend_col = \
+                get_link_legend_col(app_data,
+                                    link_filter_collapse_states_dict)
+
+        # Generating new fig
+        if not old_main_fig:
             main_fig_x_axis = get_main_fig_x_axis(app_data)
             main_fig_x_axis_style = {
                 "height": "100%",
@@ -1559,13 +1975,31 @@ def update_main_viz(selected_nodes, filtered_node_symbols,
             y_axis_legend += \
                 [html.P(e) for e in app_data["secondary_y_axes_attributes"]]
 
-    return (main_fig,
+    # Only send changed props of figs, if possible
+    main_fig_update = get_fig_update(
+        old_main_fig,
+        main_fig,
+        session_id,
+        patched_trace_indices=get_patched_trace_indices(main_fig_patch)
+    )
+    main_fig_x_axis_update = get_fig_update(None, main_fig_x_axis)
+    main_fig_y_axis_update = get_fig_update(None, main_fig_y_axis)
+    zoomed_out_main_fig_update = get_fig_update(
+        old_zoomed_out_main_fig,
+        zoomed_out_main_fig,
+        session_id,
+        patched_trace_indices=get_patched_trace_indices(
+            zoomed_out_main_fig_patch
+        )
+    )
+
+    return (main_fig_update,
             main_fig_style,
-            main_fig_x_axis,
+            main_fig_x_axis_update,
             main_fig_x_axis_style,
-            main_fig_y_axis,
+            main_fig_y_axis_update,
             main_fig_y_axis_style,
-            zoomed_out_main_fig,
+            zoomed_out_main_fig_update,
             node_symbol_legend_title,
             node_symbol_legend_fig,
             link_legend_col,
@@ -1573,9 +2007,103 @@ def update_main_viz(selected_nodes, filtered_node_symbols,
             node_color_legend_fig,
             y_axis_legend,
             graph_loading,
-            stale_vals_tbl)
+            stale_vals_tbl,
+            app_data_job)
 
 
+@app.callback(
+    inputs=[
+        Input("app-data-job", "data"),
+        Input("app-data-job-interval", "n_intervals")
+    ],
+    output=[
+        Output("app-data-job-interval", "disabled"),
+        Output("app-data-job-progress", "value"),
+        Output("app-data-job-progress", "children"),
+        Output("app-data-job-progress", "color"),
+        Output("app-data-job-progress", "style"),
+        Output("app-data-job-done", "data")
+    ],
+    prevent_initial_call=True
+)
+def poll_app_data_job(app_data_job, _):
+    """Show progress of background job started by ``update_main_viz``.
+
+    Polls until the job is done, and then lets ``update_main_viz``
+    generate figs from the job's results. ``update_main_viz`` clears
+    ``app_data_job`` after that, which hides the progress bar.
+
+    :param app_data_job: Id of job, and the trigger that started it
+    :type app_data_job: dict[str, str]
+    :param _: Number of times job was polled
+    :type _: int
+    :return: Whether to stop polling, progress bar val, label, color
+        and style, and the job if it is done.
+    :rtype: tuple
+    """
+    if app_data_job is None:
+        return True, 0, None, "primary", {"display": "none"}, no_update
+
+    job_status = get_job_status(APP_DATA_CACHE_BACKEND,
+                                app_data_job["job_id"])
+    if job_status is None:
+        job_status = {"stage": None,
+                      "done": False,
+                      "error": "Job was lost before it finished",
+                      "cancelled": False}
+    # Job was abandoned just as this session needed it again.
+    # ``update_main_viz`` starts it again.
+    if job_status["cancelled"]:
+        return True, 0, None, "primary", {}, app_data_job
+    if job_status["error"]:
+        label = "Failed: %s" % job_status["error"]
+        return True, 100, label, "danger", {}, no_update
+
+    stage_num = JOB_STAGES.index(job_status["stage"]) + 1
+    val = 100 * stage_num / len(JOB_STAGES)
+    label = "%s (%s/%s)" % (JOB_STAGE_LABELS[job_status["stage"]],
+                            stage_num,
+                            len(JOB_STAGES))
+    if job_status["done"]:
+        return True, val, label, "primary", {}, app_data_job
+    return False, val, label, "primary", {}, no_update
+
+
+# Apply figs, or changes to figs, sent by ``update_main_viz``. Also
+# resize nodes and text in main graph and axes after zooming, and
+# request elements of culled main graph outside its viewport. Ids of
+# applied figs, and visible ranges, are kept for ``update_main_viz``.
+app.clientside_callback(
+    ClientsideFunction(
+        namespace="clientside",
+        function_name="updateMainVizFigs"
+    ),
+    Output("main-graph", "figure"),
+    Output("main-graph-x-axis", "figure"),
+    Output("main-graph-y-axis", "figure"),
+    Output("main-graph-viewport-request", "data"),
+    Output("main-graph-fig-state", "data"),
+    Input("main-graph-fig-update", "data"),
+    Input("main-graph-x-axis-fig-update", "data"),
+    Input("main-graph-y-axis-fig-update", "data"),
+    Input("main-graph", "relayoutData"),
+    State("main-graph", "figure"),
+    State("main-graph-x-axis", "figure"),
+    State("main-graph-y-axis", "figure"),
+    State("main-graph-fig-state", "data"),
+    prevent_initial_call=True
+)
+app.clientside_callback(
+    ClientsideFunction(
+        namespace="clientside",
+        function_name="applyFigUpdate"
+    ),
+    Output("zoomed-out-main-graph", "figure"),
+    Output("zoomed-out-main-graph-fig-state", "data"),
+    Input("zoomed-out-main-graph-fig-update", "data"),
+    State("zoomed-out-main-graph", "figure"),
+    prevent_initial_call=True
+)
 # Switch to main graph tab and scroll to corresponding node, after
 # clicking node in zoomed-out main graph.
 app.clientside_callback(
@@ -1588,6 +2116,19 @@ app.clientside_callback(
     Input("zoomed-out-main-graph", "clickData"),
     prevent_initial_call=True
 )
+# Click link filter update btn once link legend sliders and filter
+# forms stop changing, so only the last of several quick changes
+# regenerates the viz.
+app.clientside_callback(
+    ClientsideFunction(
+        namespace="clientside",
+        function_name="scheduleLinkFilterUpdate"
+    ),
+    Output("link-filter-update-scheduled", "data"),
+    Input({"type": "link-legend-slider", "index": ALL}, "value"),
+    Input({"type": "link-legend-filter-form", "index": ALL}, "options"),
+    Input({"type": "link-legend-filter-form", "index": ALL}, "value")
+)
 # Add event handlers to main graph axes figs to sync scrolling w/ main
 # graph.
 app.clientside_callback(
@@ -2,11 +2,321 @@
  * @fileoverview This file stores callbacks that are performed clientside.
  */
 
+/**
+ * Get a copy of an object, with changed vals merged into it.
+ * Nested objects are merged recursively, like Plotly merges figure props.
+ * Other vals, like arrays, are replaced.
+ * @param {Object} obj Object to merge changes into.
+ * @param {Object} changes Changed vals.
+ * @return {Object} Copy of obj with changes merged into it.
+ */
+const mergeFigProps = (obj, changes) => {
+  const ret = Object.assign({}, obj);
+  for (const [key, val] of Object.entries(changes)) {
+    const isObj = (e) => e !== null && typeof e === 'object' &&
+        !Array.isArray(e);
+    ret[key] = isObj(val) && isObj(ret[key]) ?
+        mergeFigProps(ret[key], val) : val;
+  }
+  return ret;
+};
+
+/**
+ * Visible fraction of the full main graph range, at or below which weight
+ * labels drawn as text traces are swapped for angled annotations. Same as
+ * MAX_TEXT_LABEL_ZOOM in main_fig_generator.py.
+ */
+const MAX_TEXT_LABEL_ZOOM = 0.25;
+
+/**
+ * Margin around the visible range of culled main graphs, as a fraction of
+ * the visible range. Same as the default margin in data_parser.py.
+ */
+const VIEWPORT_MARGIN = 0.5;
+
+/**
+ * Ms that link legend sliders and filter forms must stop changing for,
+ * before their vals are sent to the server.
+ */
+const LINK_FILTER_UPDATE_DELAY = 300;
+
+/**
+ * Id of the timeout that clicks the link filter update btn, if one is
+ * scheduled.
+ */
+let linkFilterUpdateTimeout = null;
+
+/**
+ * Get a fig updated with a fig, or changes to it, sent by the server.
+ * @param {?Object} figUpdate Object with a new fig under fig, or changed
+ *     trace props by trace index and changed layout props under diff.
+ * @param {Object} fig Current fig.
+ * @return {Object} Updated fig.
+ */
+const getUpdatedFig = (figUpdate, fig) => {
+  if (!figUpdate) {
+    return fig;
+  }
+  if (figUpdate['fig']) {
+    return figUpdate['fig'];
+  }
+
+  const dataDiff = figUpdate['diff']['data'];
+  const layoutDiff = figUpdate['diff']['layout'];
+  const data = fig['data'].map((trace, i) =>
+    i in dataDiff ? mergeFigProps(trace, dataDiff[i]) : trace);
+  const layout = mergeFigProps(fig['layout'], layoutDiff);
+  return {'data': data, 'layout': layout};
+};
+
+/**
+ * Get angled annotations for weight labels drawn as text traces, inside
+ * the visible range of the main graph.
+ * Same as get_zoomed_in_label_annotations in main_fig_generator.py.
+ * @param {Object} fig Main graph fig.
+ * @param {Array.<number>} xRange Visible x-axis range.
+ * @param {Array.<number>} yRange Visible y-axis range.
+ * @return {Array.<Object>} Weight label annotations.
+ */
+const getZoomedInLabelAnnotations = (fig, xRange, yRange) => {
+  const annotations = [];
+  for (const trace of fig['data']) {
+    if (trace['name'] !== 'main_fig_labels_trace') {
+      continue;
+    }
+    trace['x'].forEach((x, i) => {
+      const y = trace['y'][i];
+      if (x < xRange[0] || x > xRange[1] || y < yRange[0] || y > yRange[1]) {
+        return;
+      }
+      // Arrays where every val is the same are sent as a single val
+      const text = Array.isArray(trace['text']) ?
+          trace['text'][i] : trace['text'];
+      annotations.push({
+        'x': x,
+        'y': y,
+        'text': text,
+        'textangle': trace['customdata'][i],
+        'showarrow': false,
+        'font': {'color': trace['textfont']['color'], 'size': 12},
+        'bgcolor': 'white',
+        'name': 'main_fig_label_annotation',
+      });
+    });
+  }
+  return annotations;
+};
+
+/**
+ * Get main graph and axes figs, with nodes and text resized after zooming.
+ * Same as update_main_fig_zoom in main_fig_generator.py.
+ * @param {Object} fig Main graph fig.
+ * @param {Object} xAxisFig Main graph x-axis fig.
+ * @param {Object} yAxisFig Main graph y-axis fig.
+ * @param {Array.<number>} xRange Visible x-axis range.
+ * @param {Array.<number>} yRange Visible y-axis range.
+ * @return {Array.<Object>} New main graph, x-axis and y-axis figs.
+ */
+const getZoomedFigs = (fig, xAxisFig, yAxisFig, xRange, yRange) => {
+  const firstXRange = xAxisFig['data'][0]['customdata'];
+  // Should be about equal across x and y
+  const changeInRange =
+      (xRange[1] - xRange[0]) / (firstXRange[1] - firstXRange[0]);
+  // TODO do not used hardcoded values
+  const markerSize = Math.max(1, 24 / changeInRange);
+  const textfontSize = Math.max(1, 16 / changeInRange);
+
+  const zoomedIn = changeInRange <= MAX_TEXT_LABEL_ZOOM;
+  const hasTextLabels =
+      fig['data'].some((e) => e['name'] === 'main_fig_labels_trace');
+  const data = fig['data'].map((trace) => {
+    if (trace['name'] === 'main_fig_nodes_trace') {
+      return mergeFigProps(trace, {
+        'marker': {'size': markerSize},
+        'textfont': {'size': textfontSize},
+      });
+    }
+    if (trace['name'] === 'main_fig_labels_trace') {
+      return mergeFigProps(trace, {'visible': !zoomedIn});
+    }
+    return trace;
+  });
+  let layout = mergeFigProps(fig['layout'], {
+    'xaxis': {'range': xRange, 'autorange': false},
+    'yaxis': {'range': yRange, 'autorange': false},
+  });
+  if (hasTextLabels) {
+    let annotations = (layout['annotations'] || []).filter(
+        (e) => e['name'] !== 'main_fig_label_annotation');
+    if (zoomedIn) {
+      annotations = annotations.concat(
+          getZoomedInLabelAnnotations(fig, xRange, yRange));
+    }
+    layout = Object.assign(layout, {'annotations': annotations});
+  }
+
+  const getAxisFig = (axisFig, traceName, axisName, range) => ({
+    'data': axisFig['data'].map((trace) => trace['name'] === traceName ?
+        mergeFigProps(trace, {'textfont': {'size': textfontSize}}) : trace),
+    'layout': mergeFigProps(axisFig['layout'], {[axisName]: {'range': range}}),
+  });
+  return [
+    {'data': data, 'layout': layout},
+    getAxisFig(xAxisFig, 'main_fig_x_axis_trace', 'xaxis', xRange),
+    getAxisFig(yAxisFig, 'main_fig_y_axis_trace', 'yaxis', yRange),
+  ];
+};
+
+/**
+ * Determine whether elements of a culled main graph must be refetched.
+ * This is the case if the visible range leaves the viewport of elements
+ * sent by the server, or if the user zoomed in enough that most elements
+ * in the viewport are not visible.
+ * @param {Array.<Array.<number>>} viewport x-axis and y-axis ranges of
+ *     elements sent by the server.
+ * @param {Array.<number>} xRange Visible x-axis range.
+ * @param {Array.<number>} yRange Visible y-axis range.
+ * @return {boolean} Whether viewport must be refetched.
+ */
+const isViewportStale = (viewport, xRange, yRange) => {
+  const [[viewportX0, viewportX1], [viewportY0, viewportY1]] = viewport;
+  if (xRange[0] < viewportX0 || xRange[1] > viewportX1) {
+    return true;
+  }
+  if (yRange[0] < viewportY0 || yRange[1] > viewportY1) {
+    return true;
+  }
+  const viewportWidth = viewportX1 - viewportX0;
+  const minViewportWidth = (xRange[1] - xRange[0]) * (1 + 2 * VIEWPORT_MARGIN);
+  return viewportWidth > 2 * minViewportWidth;
+};
+
 window.dash_clientside = Object.assign({}, window.dash_clientside, {
   clientside: {
+    /**
+     * Update a graph with a fig, or changes to its current fig, sent by the
+     * server.
+     * Changed props are merged into copies of the changed traces and
+     * layout, so Plotly only redraws what changed.
+     * @param {Object} figUpdate Object with a new fig under fig, or changed
+     *     trace props by trace index and changed layout props under diff.
+     * @param {Object} fig Current fig of graph.
+     * @return {Array} New fig of graph, and its id, which the server uses
+     *     to find the fig it diffs the next fig against.
+     */
+    applyFigUpdate: (figUpdate, fig) => {
+      const noUpdate = window.dash_clientside.no_update;
+      if (!figUpdate) {
+        return [noUpdate, noUpdate];
+      }
+      const newFig = getUpdatedFig(figUpdate, fig);
+      return [newFig, {'fig_id': newFig['layout']['meta']['fig_id']}];
+    },
+    /**
+     * Update main graph and axes figs with figs, or changes to them, sent
+     * by the server. Or resize nodes and text in them after zooming, which
+     * needs no server round-trip, unless elements of a culled main graph
+     * must be refetched.
+     * The server does not receive the main graph fig, so the id of the fig
+     * and its visible ranges are kept, for the server to find the fig it
+     * diffs the next fig against, and zoom it like the browser did.
+     * @param {Object} figUpdate Update to main graph fig.
+     * @param {Object} xAxisFigUpdate Update to main graph x-axis fig.
+     * @param {Object} yAxisFigUpdate Update to main graph y-axis fig.
+     * @param {Object} relayoutData Plotly object containing info on last
+     *     main graph relayout event.
+     * @param {Object} fig Current main graph fig.
+     * @param {Object} xAxisFig Current main graph x-axis fig.
+     * @param {Object} yAxisFig Current main graph y-axis fig.
+     * @param {?Object} figState Id of current main graph fig, and its
+     *     visible ranges if the user zoomed it.
+     * @return {Array} New main graph, x-axis and y-axis figs, visible
+     *     ranges of main graph if its elements must be refetched, and new
+     *     id and visible ranges of main graph fig.
+     */
+    updateMainVizFigs: (figUpdate, xAxisFigUpdate, yAxisFigUpdate,
+        relayoutData, fig, xAxisFig, yAxisFig, figState) => {
+      const noUpdate = window.dash_clientside.no_update;
+      const triggered = window.dash_clientside.callback_context.triggered
+          .map((e) => e['prop_id']);
+      if (!triggered.includes('main-graph.relayoutData')) {
+        // Stores keep their last update, even if it was already applied
+        const xAxisFigUpdated =
+            triggered.includes('main-graph-x-axis-fig-update.data');
+        const yAxisFigUpdated =
+            triggered.includes('main-graph-y-axis-fig-update.data');
+        const newXAxisFig = xAxisFigUpdated ?
+            getUpdatedFig(xAxisFigUpdate, xAxisFig) : xAxisFig;
+        const newYAxisFig = yAxisFigUpdated ?
+            getUpdatedFig(yAxisFigUpdate, yAxisFig) : yAxisFig;
+        const axisFigs = [
+          xAxisFigUpdated ? newXAxisFig : noUpdate,
+          yAxisFigUpdated ? newYAxisFig : noUpdate,
+        ];
+        if (!triggered.includes('main-graph-fig-update.data')) {
+          return [noUpdate].concat(axisFigs, [noUpdate, noUpdate]);
+        }
+        const newFig = getUpdatedFig(figUpdate, fig);
+        const layout = newFig['layout'];
+        const figId = layout['meta']['fig_id'];
+        if (figUpdate['fig']) {
+          // Figs generated while zoomed in have fixed ranges
+          const zoomed = layout['xaxis']['autorange'] === false;
+          return [newFig].concat(axisFigs, [noUpdate, {
+            'fig_id': figId,
+            'xaxis_range': zoomed ? layout['xaxis']['range'] : null,
+            'yaxis_range': zoomed ? layout['yaxis']['range'] : null,
+          }]);
+        }
+        const newFigState = Object.assign({}, figState, {'fig_id': figId});
+        if (!newFigState['xaxis_range']) {
+          return [newFig].concat(axisFigs, [noUpdate, newFigState]);
+        }
+        // Changed props were diffed against the server's copy of the fig
+        // zoomed to these ranges, but the user may have zoomed since.
+        const zoomedFigs = getZoomedFigs(newFig, newXAxisFig, newYAxisFig,
+            newFigState['xaxis_range'], newFigState['yaxis_range']);
+        return zoomedFigs.concat([noUpdate, newFigState]);
+      }
+
+      let xRange;
+      let yRange;
+      if ('xaxis.range[0]' in relayoutData &&
+          'xaxis.range[1]' in relayoutData &&
+          'yaxis.range[0]' in relayoutData &&
+          'yaxis.range[1]' in relayoutData) {
+        xRange = [relayoutData['xaxis.range[0]'],
+          relayoutData['xaxis.range[1]']];
+        yRange = [relayoutData['yaxis.range[0]'],
+          relayoutData['yaxis.range[1]']];
+      } else if ('xaxis.autorange' in relayoutData &&
+          'yaxis.autorange' in relayoutData) {
+        xRange = xAxisFig['data'][0]['customdata'];
+        yRange = yAxisFig['data'][0]['customdata'];
+      } else {
+        return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+      }
+
+      const zoomedFigs = getZoomedFigs(fig, xAxisFig, yAxisFig, xRange,
+          yRange);
+      // Culled main graphs only include elements in a viewport around the
+      // visible range, so we refetch elements once it leaves there.
+      const viewport = (fig['layout']['meta'] || {})['viewport'];
+      let viewportRequest = noUpdate;
+      if (viewport && isViewportStale(viewport, xRange, yRange)) {
+        viewportRequest = {'xaxis_range': xRange, 'yaxis_range': yRange};
+      }
+      const newFigState = Object.assign({}, figState,
+          {'xaxis_range': xRange, 'yaxis_range': yRange});
+      return zoomedFigs.concat([viewportRequest, newFigState]);
+    },
     /**
      * Switch to main graph, and scroll to corresponding node, after
      * user clicks node in zoomed-out main graph.
+     * The zoomed-out main graph may draw cells that aggregate many nodes.
+     * So the customdata of each clicked point is the index of the
+     * corresponding, or a representative, node in the main graph, and the
+     * position of that node in the main graph.
      * @param {Object} clickData Plotly object containing info on last node
      *     clicked in zoomed-out main graph.
      * @return {Array.<?string>} The id of the main graph tab, which is made
@@ -14,35 +324,59 @@ window.dash_clientside = Object.assign({}, window.dash_clientside, {
      *     clicked.
      */
     scrollToNode: (clickData) => {
-      const mainGraph = document.getElementById('main-graph');
-      const mainGraphPoints = mainGraph.getElementsByClassName('point');
-      const clickedPoint = clickData['points'][0]['pointIndex'];
+      const clickedPoint = clickData['points'][0]['customdata'];
+      if (clickedPoint === undefined) {
+        return [window.dash_clientside.no_update, null];
+      }
+      const [nodeIndex, nodeX, nodeY] = clickedPoint;
+
+      // Nodes may be drawn with WebGL, which does not add an element for
+      // each point to the page. So we find the position of the clicked node
+      // using the main graph data and axes instead.
+      const mainGraph = document.getElementById('main-graph')
+          .getElementsByClassName('js-plotly-plot')[0];
+      const nodesTrace =
+          mainGraph.data.find((e) => e.name === 'main_fig_nodes_trace');
+      const xaxis = mainGraph._fullLayout.xaxis;
+      const yaxis = mainGraph._fullLayout.yaxis;
+      // Culled main graphs only include some nodes, so points are not in
+      // the order of node indices.
+      const point =
+          nodesTrace.customdata.findIndex((e) => e[1] === nodeIndex);
+      let nodeLeft;
+      let nodeTop;
+      if (point !== -1) {
+        nodeLeft = xaxis._offset + xaxis.l2p(nodesTrace.x[point]);
+        nodeTop = yaxis._offset + yaxis.l2p(nodesTrace.y[point]);
+      } else {
+        // Node was culled, so we pan to it, which also refetches the
+        // elements around it. It is then in the center of the plot.
+        const xHalfWidth = (xaxis.range[1] - xaxis.range[0]) / 2;
+        const yHalfWidth = (yaxis.range[1] - yaxis.range[0]) / 2;
+        Plotly.relayout(mainGraph, {
+          'xaxis.range[0]': nodeX - xHalfWidth,
+          'xaxis.range[1]': nodeX + xHalfWidth,
+          'yaxis.range[0]': nodeY - yHalfWidth,
+          'yaxis.range[1]': nodeY + yHalfWidth,
+        });
+        nodeLeft = xaxis._offset + xaxis._length / 2;
+        nodeTop = yaxis._offset + yaxis._length / 2;
+      }
 
       // We need to add the active class to the main graph tab, otherwise
-      // ``scrollIntoView`` does not work.
+      // we cannot scroll its contents.
       document.getElementById('main-graph-tab').classList.add('active');
 
-      const scrollIntoViewOptions = {'block': 'center', 'inline': 'center'}
-      mainGraphPoints[clickedPoint].scrollIntoView(scrollIntoViewOptions);
-
-      // We need to also scroll the axes. It is a bit convoluted, because
-      // scrolling the axes will scroll the main graph some more.
-      // First some important divs
+      // Scroll the main graph and its axes, so the clicked node is centered
       const mainGraphCol = document.getElementById('main-graph-col')
       const mainGraphXAxisCol = document.getElementById('main-graph-x-axis-col')
       const mainGraphYAxisCol = document.getElementById('main-graph-y-axis-col')
-      // Get scroll left and top vals for main graph after we scrolled clicked
-      // node into view.
-      const mainGraphScrollLeft = mainGraphCol.scrollLeft
-      const mainGraphScrollTop = mainGraphCol.scrollTop
-      // Reset main graph scroll position to current axis positions
-      mainGraphCol.scrollLeft = mainGraphXAxisCol.scrollLeft
-      mainGraphCol.scrollTop = mainGraphYAxisCol.scrollTop
-      // Now scroll everything to where it should be
-      mainGraphCol.scrollLeft = mainGraphScrollLeft
-      mainGraphCol.scrollTop = mainGraphScrollTop
-      mainGraphXAxisCol.scrollLeft = mainGraphScrollLeft
-      mainGraphYAxisCol.scrollTop = mainGraphScrollTop
+      const scrollLeft = nodeLeft - mainGraphCol.clientWidth / 2;
+      const scrollTop = nodeTop - mainGraphCol.clientHeight / 2;
+      mainGraphCol.scrollLeft = scrollLeft
+      mainGraphCol.scrollTop = scrollTop
+      mainGraphXAxisCol.scrollLeft = scrollLeft
+      mainGraphYAxisCol.scrollTop = scrollTop
 
       // Remove the active class, and let the return value make it active. There
       // seems to be more to fully activating tabs than just changing classes.
@@ -50,6 +384,28 @@ window.dash_clientside = Object.assign({}, window.dash_clientside, {
 
       return ['main-graph-tab', null];
     },
+    /**
+     * Click the link filter update btn once link legend sliders and filter
+     * forms stop changing.
+     * Each change restarts the delay, so several quick changes only
+     * regenerate the viz once, with the vals after the last change.
+     * @param {Array} sliderVals Vals of link legend sliders.
+     * @param {Array} filterFormOpts Opts of link filter forms.
+     * @param {Array} filterFormVals Vals of link filter forms.
+     * @return {boolean} Hidden browser var; only used b/c we need an output.
+     */
+    scheduleLinkFilterUpdate: (sliderVals, filterFormOpts, filterFormVals) => {
+      // No link legend yet
+      if (!sliderVals.length && !filterFormOpts.length) {
+        return window.dash_clientside.no_update;
+      }
+      clearTimeout(linkFilterUpdateTimeout);
+      linkFilterUpdateTimeout = setTimeout(() => {
+        linkFilterUpdateTimeout = null;
+        document.getElementById('link-filter-update-btn').click();
+      }, LINK_FILTER_UPDATE_DELAY);
+      return true;
+    },
     /**
      * Add event handlers to the main graph axes figs, to sync scrolling b/w
      * the main graph and its axes.
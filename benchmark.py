@@ -0,0 +1,467 @@
+"""Fns for benchmarking app data and fig generation on synthetic data.
+
+Synthetic datasets follow the schema of ``kpc3_data/kpc3_data.csv``:
+samples belong to plasmid clusters that share replicons, relaxases and
+flanks, and are collected by a few submitters over several years.
+Category frequencies are skewed like in that file, so a few tracks and
+clusters have most samples.
+
+Running this script times each stage of ``precompute.precompute_dataset``
+on synthetic datasets of several sizes, and writes a report that can be
+compared with later reports.
+"""
+
+from argparse import ArgumentParser
+import csv
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from io import StringIO
+from itertools import accumulate
+from json import dump, dumps, load
+from pathlib import Path
+from platform import platform, python_version
+import random
+from statistics import median
+from subprocess import CalledProcessError, check_output
+from tempfile import TemporaryDirectory
+
+from precompute import precompute_dataset
+
+# Replicon and relaxase cols of ``kpc3_data/kpc3_data.csv``
+INC_COLS = ["IncC", "IncFIA", "IncFIB", "IncFIC", "IncFII", "IncHI1A",
+            "IncHI1B", "IncHI2A", "IncI-gamma/K1", "IncI1/B/O", "IncI2",
+            "IncK2/Z", "IncL/M", "IncN", "IncP", "IncQ1", "IncR", "IncT",
+            "IncU", "IncX3", "IncX4", "IncY"]
+MOB_COLS = ["MOBC", "MOBF", "MOBH", "MOBP", "MOBQ"]
+
+# Genus and species of organisms, most frequent first
+ORGANISMS = [
+    ("Klebsiella", "Klebsiella pneumoniae"),
+    ("Serratia", "Serratia marcescens"),
+    ("Citrobacter", "Citrobacter freundii"),
+    ("Raoultella", "Raoultella planticola"),
+    ("Klebsiella", "Klebsiella oxytoca"),
+    ("Enterobacter", "Enterobacter cloacae"),
+    ("Escherichia", "Escherichia coli"),
+    ("Enterobacter", "Enterobacter asburiae"),
+    ("Raoultella", "Raoultella ornithinolytica"),
+    ("Aeromonas", "Aeromonas hydrophila"),
+    ("Pseudomonas", "Pseudomonas aeruginosa"),
+    ("Kluyvera", "Kluyvera cryocrescens")
+]
+
+# Flanking sequences, most frequent first
+FLANKS = ["GTTCT", "none", "AGTAG", "GTTCT|TTAAT", "GTCAT", "GTTCT|TTGTC"]
+
+# Range of collection dates
+FIRST_DATE = date(2015, 1, 1)
+LAST_DATE = date(2021, 10, 11)
+
+# Max number of samples in a synthetic matrix file, which grows with
+# the number of samples squared.
+MAX_MATRIX_SAMPLES = 2000
+
+# Stages faster than this in both reports are not compared, as their
+# times are mostly noise.
+MIN_COMPARED_SECONDS = 0.01
+
+
+def get_skewed_choice(rng, vals, skew=1.2):
+    """Choose a val, with earlier vals chosen more often.
+
+    Vals are chosen with probability proportional to
+    ``1 / rank ** skew``, like in Zipf's law.
+
+    :param rng: Random number generator
+    :type rng: random.Random
+    :param vals: Vals to choose from
+    :type vals: list
+    :param skew: How much more often earlier vals are chosen
+    :type skew: float
+    :return: Chosen val
+    """
+    cum_weights = get_skewed_cum_weights(len(vals), skew)
+    return rng.choices(vals, cum_weights=cum_weights)[0]
+
+
+@lru_cache()
+def get_skewed_cum_weights(num_of_vals, skew):
+    """Get cumulative weights used by ``get_skewed_choice``.
+
+    These are cached, as there may be many vals to choose from.
+
+    :param num_of_vals: Number of vals to choose from
+    :type num_of_vals: int
+    :param skew: How much more often earlier vals are chosen
+    :type skew: float
+    :return: Cumulative weights of vals
+    :rtype: list[float]
+    """
+    return list(accumulate(1 / (i + 1) ** skew for i in range(num_of_vals)))
+
+
+def get_synthetic_sample_rows(num_of_samples, seed=0):
+    """Get rows of a synthetic sample file.
+
+    :param num_of_samples: Number of rows
+    :type num_of_samples: int
+    :param seed: Seed of random number generator, so the same rows are
+        generated each time.
+    :type seed: int
+    :return: Rows, as dicts mapping cols to vals. ``snp_dist`` is
+        the position of each sample on a line, so that the abs diff
+        b/w two samples is their SNP distance.
+    :rtype: list[dict]
+    """
+    rng = random.Random(seed)
+    num_of_days = (LAST_DATE - FIRST_DATE).days
+
+    plasmid_clusters = []
+    for i in range(max(num_of_samples // 20, 1)):
+        inc_groups = {get_skewed_choice(rng, INC_COLS[::-1])
+                      for _ in range(rng.randint(1, 3))}
+        relaxases = {get_skewed_choice(rng, MOB_COLS[1:] + MOB_COLS[:1])
+                     for _ in range(rng.randint(0, 2))}
+        plasmid_clusters.append({
+            "PrimaryID": "AA%03d" % i,
+            "inc_groups": sorted(inc_groups),
+            "relaxases": sorted(relaxases),
+            "Left_flanks": get_skewed_choice(rng, FLANKS, skew=2),
+            "Right_flanks": get_skewed_choice(rng, FLANKS, skew=2),
+            "Predicted_mobility":
+                get_skewed_choice(rng, ["conjugative",
+                                        "non-mobilizable",
+                                        "mobilizable"], skew=2),
+            "first_day": rng.randrange(num_of_days),
+            # Samples of different clusters are far apart
+            "snp_dist": i * 1000
+        })
+    mlst_list = [str(rng.randint(1, 1000))
+                 for _ in range(max(num_of_samples // 6, 1))]
+    submitters = ["HA%s" % i for i in range(1, 8)]
+
+    ret = []
+    for i in range(num_of_samples):
+        plasmid_cluster = get_skewed_choice(rng, plasmid_clusters)
+        (genus, organism) = get_skewed_choice(rng, ORGANISMS)
+        day = plasmid_cluster["first_day"] + int(rng.expovariate(1 / 120))
+        if rng.random() < 0.05:
+            collection_date = "-"
+        else:
+            collection_date = \
+                str(FIRST_DATE + timedelta(days=min(day, num_of_days)))
+        row = {
+            "SampleID": "SYN%07d" % i,
+            "Collection_date": collection_date,
+            "Surname": rng.choice(["Clinical", "Environmental"]),
+            "Organism": organism,
+            "Genus": genus,
+            "MLST": "-" if rng.random() < 0.5
+            else get_skewed_choice(rng, mlst_list),
+            "Submitter": "-" if rng.random() < 0.05
+            else get_skewed_choice(rng, submitters, skew=2),
+            "Predicted_mobility": plasmid_cluster["Predicted_mobility"],
+            "PrimaryID": plasmid_cluster["PrimaryID"]
+        }
+        for col in INC_COLS:
+            row[col] = col if col in plasmid_cluster["inc_groups"] else ""
+        for col in MOB_COLS:
+            row[col] = col if col in plasmid_cluster["relaxases"] else ""
+        row["Left_flanks"] = plasmid_cluster["Left_flanks"]
+        row["Right_flanks"] = plasmid_cluster["Right_flanks"]
+        row["Incompatability_Groups"] = \
+            ";".join(plasmid_cluster["inc_groups"])
+        row["Relaxases"] = ";".join(plasmid_cluster["relaxases"])
+        row["snp_dist"] = plasmid_cluster["snp_dist"] + rng.randint(0, 40)
+        ret.append(row)
+    return ret
+
+
+def get_synthetic_config_file_dict(matrix=False):
+    """Get config file for synthetic sample files.
+
+    Links are the same as in ``kpc3_data/kpc3_config.json``, with SNP
+    distances as weights of potential clonal spread.
+
+    :param matrix: Get SNP distances from a matrix file instead of the
+        ``snp_dist`` col.
+    :type matrix: bool
+    :return: Config file contents
+    :rtype: dict
+    """
+    plasmid_cols = ["Left_flanks", "Right_flanks"] + MOB_COLS + INC_COLS
+    if matrix:
+        weight_exp = "{{matrix}}"
+    else:
+        weight_exp = "abs(@snp_dist@-!snp_dist!)"
+    return {
+        "sample_id": "SampleID",
+        "delimiter": ",",
+        "primary_y_axis": ["Submitter"],
+        "secondary_y_axes": [
+            ["PrimaryID"],
+            ["Left_flanks", "Right_flanks"],
+            ["Relaxases"],
+            ["Incompatability_Groups"]
+        ],
+        "date_attr": "Collection_date",
+        "date_input": "%Y-%m-%d",
+        "date_output": "%d-%m-%Y",
+        "label_attr": ["SampleID", "Organism"],
+        "links_config": {
+            "potential hgt": {
+                "all_eq": plasmid_cols,
+                "all_neq": [],
+                "any_eq": [],
+                "minimize_loops": 1,
+                "show_arrowheads": 0,
+                "weight_exp": "",
+                "show_weights": 0,
+                "weight_filters": {},
+                "attr_filters": {}
+            },
+            "potential clonal spread": {
+                "all_eq": ["Organism", "MLST"] + plasmid_cols,
+                "all_neq": [],
+                "any_eq": [],
+                "minimize_loops": 1,
+                "show_arrowheads": 0,
+                "weight_exp": weight_exp,
+                "show_weights": 1,
+                "weight_filters": {"greater_than": 20},
+                "attr_filters": {}
+            }
+        },
+        "node_color_attr": ["Predicted_mobility"],
+        "node_symbol_attr": ["Surname"],
+        "links_across_primary_y": 0,
+        "max_day_range": 60000,
+        "null_vals": ["-", "none"]
+    }
+
+
+def write_synthetic_dataset(dataset_dir, num_of_samples, seed=0,
+                            matrix=False):
+    """Write files of a synthetic dataset.
+
+    :param dataset_dir: Dir files are written to
+    :type dataset_dir: Path
+    :param num_of_samples: Number of samples
+    :type num_of_samples: int
+    :param seed: Seed of random number generator
+    :type seed: int
+    :param matrix: Write a SNP distance matrix file too
+    :type matrix: bool
+    :return: Paths of sample, config, and matrix file if written
+    :rtype: list[Path]
+    :raise ValueError: Too many samples for a matrix file
+    """
+    if matrix and num_of_samples > MAX_MATRIX_SAMPLES:
+        msg = "Matrix files are limited to %s samples" % MAX_MATRIX_SAMPLES
+        raise ValueError(msg)
+
+    rows = get_synthetic_sample_rows(num_of_samples, seed=seed)
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    ret = [dataset_dir / ("synthetic_%s.csv" % num_of_samples),
+           dataset_dir / ("synthetic_%s_config.json" % num_of_samples)]
+
+    output = StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(rows[0]),
+                            lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(rows)
+    ret[0].write_text(output.getvalue())
+
+    config_file_dict = get_synthetic_config_file_dict(matrix=matrix)
+    ret[1].write_text(dumps(config_file_dict, indent=2))
+
+    if matrix:
+        output = StringIO()
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(["snp-dists 0.7.0"] + [e["SampleID"] for e in rows])
+        for row in rows:
+            writer.writerow(
+                [row["SampleID"]]
+                + [abs(row["snp_dist"] - e["snp_dist"]) for e in rows]
+            )
+        ret.append(dataset_dir / ("synthetic_%s_matrix.csv" % num_of_samples))
+        ret[2].write_text(output.getvalue())
+    return ret
+
+
+def get_commit():
+    """Get commit of the working tree, if it is a git repo.
+
+    :return: Hash of commit, or ``None`` if there is none
+    :rtype: str|None
+    """
+    try:
+        return check_output(["git", "rev-parse", "HEAD"],
+                            cwd=Path(__file__).parent,
+                            text=True).strip()
+    except (CalledProcessError, OSError):
+        return None
+
+
+def run_benchmark(sizes, repeats=3, seed=0, matrix=False, dataset_dir=None):
+    """Time each stage of ``precompute_dataset`` on synthetic datasets.
+
+    :param sizes: Number of samples of each synthetic dataset
+    :type sizes: list[int]
+    :param repeats: Number of times each dataset is processed
+    :type repeats: int
+    :param seed: Seed of random number generator
+    :type seed: int
+    :param matrix: Get SNP distances from matrix files
+    :type matrix: bool
+    :param dataset_dir: Dir synthetic datasets are written to. A
+        temporary dir is used if ``None``.
+    :type dataset_dir: Path
+    :return: Report, with min and median seconds of each stage for each
+        size.
+    :rtype: dict
+    """
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": get_commit(),
+        "python": python_version(),
+        "platform": platform(),
+        "params": {"sizes": sizes,
+                   "repeats": repeats,
+                   "seed": seed,
+                   "matrix": matrix},
+        "results": {}
+    }
+    with TemporaryDirectory() as tmp_dir:
+        if dataset_dir is None:
+            dataset_dir = Path(tmp_dir) / "datasets"
+        for size in sizes:
+            file_paths = write_synthetic_dataset(dataset_dir,
+                                                 size,
+                                                 seed=seed,
+                                                 matrix=matrix)
+            timings_list = []
+            for i in range(repeats):
+                output_dir = Path(tmp_dir) / ("%s_%s" % (size, i))
+                timings_list.append(precompute_dataset(output_dir,
+                                                       *file_paths))
+            report["results"][str(size)] = {
+                stage: {"min": min(e[stage] for e in timings_list),
+                        "median": median(e[stage] for e in timings_list)}
+                for stage in timings_list[0]
+            }
+    return report
+
+
+def compare_reports(old_report, new_report):
+    """Get ratios of stage times in two reports.
+
+    Min times are compared, as they are the least affected by other
+    processes.
+
+    :param old_report: ``run_benchmark`` ret val
+    :type old_report: dict
+    :param new_report: ``run_benchmark`` ret val with the same params
+    :type new_report: dict
+    :return: Size, stage, old and new min seconds, and new over old
+        seconds, of stages in both reports.
+    :rtype: list[tuple]
+    """
+    ret = []
+    for size, new_results in new_report["results"].items():
+        old_results = old_report["results"].get(size, {})
+        for stage, new_result in new_results.items():
+            if stage not in old_results:
+                continue
+            old_seconds = old_results[stage]["min"]
+            new_seconds = new_result["min"]
+            if max(old_seconds, new_seconds) < MIN_COMPARED_SECONDS:
+                continue
+            ratio = new_seconds / old_seconds if old_seconds else None
+            ret.append((size, stage, old_seconds, new_seconds, ratio))
+    return ret
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Time app data and fig generation "
+                                        "on synthetic datasets.")
+    parser.add_argument("--sizes",
+                        nargs="+",
+                        type=int,
+                        default=[250, 500, 1000],
+                        help="Number of samples of each dataset")
+    parser.add_argument("--repeats",
+                        type=int,
+                        default=3,
+                        help="Number of times each dataset is processed")
+    parser.add_argument("--seed",
+                        type=int,
+                        default=0,
+                        help="Seed of random number generator")
+    parser.add_argument("--matrix",
+                        action="store_true",
+                        help="Get SNP distances from matrix files")
+    parser.add_argument("--dataset-dir",
+                        type=Path,
+                        help="Keep synthetic datasets in this dir")
+    parser.add_argument("--generate-only",
+                        action="store_true",
+                        help="Only write synthetic datasets to "
+                             "--dataset-dir")
+    parser.add_argument("--output",
+                        type=Path,
+                        help="Write report to this file")
+    parser.add_argument("--compare",
+                        type=Path,
+                        metavar="REPORT",
+                        help="Compare with an earlier report")
+    parser.add_argument("--max-slowdown",
+                        type=float,
+                        help="Exit with an error if a stage is this many "
+                             "times slower than in --compare")
+    args = parser.parse_args()
+
+    if args.generate_only:
+        if args.dataset_dir is None:
+            parser.error("--generate-only needs --dataset-dir")
+        for size in args.sizes:
+            for file_path in write_synthetic_dataset(args.dataset_dir,
+                                                     size,
+                                                     seed=args.seed,
+                                                     matrix=args.matrix):
+                print(file_path)
+        raise SystemExit
+
+    benchmark_report = run_benchmark(args.sizes,
+                                     repeats=args.repeats,
+                                     seed=args.seed,
+                                     matrix=args.matrix,
+                                     dataset_dir=args.dataset_dir)
+    if args.output:
+        with open(args.output, "w") as fp:
+            dump(benchmark_report, fp, indent=2)
+    for result_size, results in benchmark_report["results"].items():
+        print("%s samples:" % result_size)
+        for result_stage, result in results.items():
+            print("  %s: %.3fs min, %.3fs median"
+                  % (result_stage, result["min"], result["median"]))
+
+    if args.compare:
+        with open(args.compare) as fp:
+            earlier_report = load(fp)
+        if earlier_report["params"] != benchmark_report["params"]:
+            print("Warning: reports have different params")
+        slowdowns = []
+        print("Compared with %s:" % args.compare)
+        for row in compare_reports(earlier_report, benchmark_report):
+            (result_size, result_stage, old, new, new_over_old) = row
+            print("  %s samples, %s: %.3fs -> %.3fs (%s)"
+                  % (result_size, result_stage, old, new,
+                     "-" if new_over_old is None else "%.2fx" % new_over_old))
+            if args.max_slowdown and new_over_old \
+                    and new_over_old > args.max_slowdown:
+                slowdowns.append(row)
+        if slowdowns:
+            print("%s stages slower than %sx"
+                  % (len(slowdowns), args.max_slowdown))
+            raise SystemExit(1)
@@ -0,0 +1,271 @@
+"""Fns for saving and loading datasets with precomputed app data.
+
+A bundle is a dir with the files of a dataset, and the
+``get_unfiltered_app_data`` ret vals the viz first needs for them.
+Loading a bundle stores its files like uploaded files, and caches its
+app data, so the viz opens without recomputing it.
+
+Running this script saves a bundle.
+"""
+
+from argparse import ArgumentParser
+from base64 import b64encode
+from os import environ, replace
+from pathlib import Path
+import pickle
+from re import fullmatch
+from shutil import rmtree
+
+from dataset_store import DATASET_FILE_NAMES, add_dataset
+from data_parser import get_unfiltered_app_data
+from jobs import get_unfiltered_app_data_key
+from main_fig_generator import is_zoomed_out_lod_needed
+
+# Where bundles are saved and loaded from
+BUNDLE_DIR = Path(environ.get("AMR_TV_BUNDLE_DIR",
+                              Path(__file__).parent / "bundles"))
+
+# Name of the file with precomputed app data in each bundle
+BUNDLE_APP_DATA_FILE_NAME = "app_data.pickle"
+
+# Changed whenever ``get_unfiltered_app_data`` ret vals change, so
+# older bundles are not used for them.
+BUNDLE_FORMAT_VERSION = 2
+
+# ``get_unfiltered_app_data`` keyword args when a dataset is first
+# vized. Weight filters and node states are applied to its ret val
+# later, so bundles are used whatever the user selects or filters.
+INITIAL_APP_DATA_KWARGS = {
+    "filtered_link_types": {}
+}
+
+
+def get_bundle_ids(bundle_dir=BUNDLE_DIR):
+    """Get ids of saved bundles.
+
+    :param bundle_dir: Dir bundles are saved in
+    :type bundle_dir: Path
+    :return: Sorted names of bundle dirs
+    :rtype: list[str]
+    """
+    if not bundle_dir.is_dir():
+        return []
+    return sorted(e.name for e in bundle_dir.iterdir()
+                  if e.is_dir() and is_valid_bundle_id(e.name)
+                  and not e.name.endswith(".tmp"))
+
+
+def is_valid_bundle_id(bundle_id):
+    """Check whether a bundle id can be used as a dir name.
+
+    :param bundle_id: Id of bundle
+    :type bundle_id: str
+    :return: Whether ``bundle_id`` is only letters, digits, ``_``,
+        ``-`` and ``.``, and does not start with ``.``.
+    :rtype: bool
+    """
+    return isinstance(bundle_id, str) \
+        and fullmatch(r"\w[\w.-]*", bundle_id) is not None
+
+
+def save_bundle(bundle_id, sample_file_path, config_file_path,
+                matrix_file_path=None, bundle_dir=BUNDLE_DIR):
+    """Precompute app data for files, and save it with them.
+
+    :param bundle_id: Id of bundle, used as its dir name
+    :type bundle_id: str
+    :param sample_file_path: Path of sample file
+    :type sample_file_path: str|Path
+    :param config_file_path: Path of config file
+    :type config_file_path: str|Path
+    :param matrix_file_path: Path of matrix file
+    :type matrix_file_path: str|Path
+    :param bundle_dir: Dir bundles are saved in
+    :type bundle_dir: Path
+    :raise ValueError: Invalid bundle id
+    """
+    if not is_valid_bundle_id(bundle_id):
+        raise ValueError("Invalid bundle id: %s" % bundle_id)
+    file_strs = read_dataset_files(sample_file_path,
+                                   config_file_path,
+                                   matrix_file_path=matrix_file_path)
+    unfiltered_app_data_dict = get_initial_unfiltered_app_data_dict(*file_strs)
+    write_bundle(bundle_id,
+                 file_strs,
+                 unfiltered_app_data_dict,
+                 bundle_dir=bundle_dir)
+
+
+def read_dataset_files(sample_file_path, config_file_path,
+                       matrix_file_path=None):
+    """Read files of a dataset, the way they are uploaded.
+
+    Files are base64 encoded, like files uploaded in the browser. So
+    uploading the same files gives the same dataset id.
+
+    :param sample_file_path: Path of sample file
+    :type sample_file_path: str|Path
+    :param config_file_path: Path of config file
+    :type config_file_path: str|Path
+    :param matrix_file_path: Path of matrix file
+    :type matrix_file_path: str|Path
+    :return: Base64 encoded files, in the order of
+        ``DATASET_FILE_NAMES``. The matrix file is ``None`` if there is
+        no ``matrix_file_path``.
+    :rtype: list[str|None]
+    """
+    file_paths = [sample_file_path, config_file_path, matrix_file_path]
+    return [None if e is None
+            else b64encode(Path(e).read_bytes()).decode("utf-8")
+            for e in file_paths]
+
+
+def get_initial_unfiltered_app_data_dict(sample_file_base64_str,
+                                         config_file_base64_str,
+                                         matrix_file_base64_str=None,
+                                         stage_callback=None):
+    """Get app data the viz first needs for files.
+
+    App data is computed for the main fig, and for the zoomed-out main
+    fig if it needs node overlap removal.
+
+    :param sample_file_base64_str: Base64 encoded sample file
+    :type sample_file_base64_str: str
+    :param config_file_base64_str: Base64 encoded config file
+    :type config_file_base64_str: str
+    :param matrix_file_base64_str: Base64 encoded matrix file
+    :type matrix_file_base64_str: str
+    :param stage_callback: Passed to ``get_unfiltered_app_data``
+    :type stage_callback: (str) -> None
+    :return: Dict mapping ``vpsc`` vals to ``get_unfiltered_app_data``
+        ret vals with ``INITIAL_APP_DATA_KWARGS``.
+    :rtype: dict[bool, dict]
+    """
+    ret = {}
+    for vpsc in [False, True]:
+        unfiltered_app_data = \
+            get_unfiltered_app_data(
+                sample_file_base64_str,
+                config_file_base64_str,
+                matrix_file_base64_str=matrix_file_base64_str,
+                vpsc=vpsc,
+                stage_callback=stage_callback,
+                **INITIAL_APP_DATA_KWARGS
+            )
+        ret[vpsc] = unfiltered_app_data
+        # Aggregated cells do not need node overlap removal
+        if is_zoomed_out_lod_needed(unfiltered_app_data["app_data"]):
+            break
+    return ret
+
+
+def write_bundle(bundle_id, file_strs, unfiltered_app_data_dict,
+                 bundle_dir=BUNDLE_DIR):
+    """Save files of a dataset, with app data precomputed for them.
+
+    :param bundle_id: Id of bundle, used as its dir name
+    :type bundle_id: str
+    :param file_strs: ``read_dataset_files`` ret val
+    :type file_strs: list[str|None]
+    :param unfiltered_app_data_dict:
+        ``get_initial_unfiltered_app_data_dict`` ret val for
+        ``file_strs``.
+    :type unfiltered_app_data_dict: dict[bool, dict]
+    :param bundle_dir: Dir bundles are saved in
+    :type bundle_dir: Path
+    """
+    # Bundles are written to a temporary dir that is renamed once
+    # complete, so they are never loaded partially written.
+    tmp_dir = bundle_dir / ("%s.tmp" % bundle_id)
+    rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    for file_name, file_str in zip(DATASET_FILE_NAMES, file_strs):
+        if file_str is not None:
+            (tmp_dir / file_name).write_text(file_str)
+    with open(tmp_dir / BUNDLE_APP_DATA_FILE_NAME, "wb") as fp:
+        pickle.dump({"version": BUNDLE_FORMAT_VERSION,
+                     "unfiltered_app_data_dict": unfiltered_app_data_dict},
+                    fp,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    rmtree(bundle_dir / bundle_id, ignore_errors=True)
+    replace(tmp_dir, bundle_dir / bundle_id)
+
+
+def load_bundle(bundle_id, app_data_cache, bundle_dir=BUNDLE_DIR):
+    """Store files of a bundle, and cache its precomputed app data.
+
+    App data is not cached if it was precomputed by an older version of
+    ``get_unfiltered_app_data``, so it is computed when the viz needs
+    it instead.
+
+    :param bundle_id: ``get_bundle_ids`` ret val element
+    :type bundle_id: str
+    :param app_data_cache: Cache with ``get`` and ``set`` methods
+    :type app_data_cache: LRUCache|TieredCache|DiskCache|RedisCache
+    :param bundle_dir: Dir bundles are saved in
+    :type bundle_dir: Path
+    :return: ``dataset_store.add_dataset`` ret val for files of
+        bundle, or ``None`` if there is no bundle with ``bundle_id``.
+    :rtype: str|None
+    """
+    # Ids come from the browser, so they are checked before being used
+    # in paths.
+    if not is_valid_bundle_id(bundle_id):
+        return None
+    bundle_path = bundle_dir / bundle_id
+    if not bundle_path.is_dir():
+        return None
+
+    file_strs = []
+    for file_name in DATASET_FILE_NAMES:
+        file_path = bundle_path / file_name
+        file_strs.append(file_path.read_text() if file_path.is_file()
+                         else None)
+    dataset_id = add_dataset(*file_strs)
+
+    with open(bundle_path / BUNDLE_APP_DATA_FILE_NAME, "rb") as fp:
+        bundle_app_data = pickle.load(fp)
+    if bundle_app_data["version"] != BUNDLE_FORMAT_VERSION:
+        return dataset_id
+    unfiltered_app_data_dict = bundle_app_data["unfiltered_app_data_dict"]
+    for vpsc, unfiltered_app_data in unfiltered_app_data_dict.items():
+        app_data_kwargs = dict(INITIAL_APP_DATA_KWARGS)
+        if vpsc:
+            app_data_kwargs["vpsc"] = True
+        key = get_unfiltered_app_data_key(dataset_id, app_data_kwargs)
+        if app_data_cache.get(key) is None:
+            app_data_cache.set(key, unfiltered_app_data)
+    return dataset_id
+
+
+def load_bundles(app_data_cache, bundle_dir=BUNDLE_DIR):
+    """Load all saved bundles.
+
+    :param app_data_cache: Cache with ``get`` and ``set`` methods
+    :type app_data_cache: LRUCache|TieredCache|DiskCache|RedisCache
+    :param bundle_dir: Dir bundles are saved in
+    :type bundle_dir: Path
+    :return: Dict mapping bundle ids to ``load_bundle`` ret vals
+    :rtype: dict[str, str]
+    """
+    return {e: load_bundle(e, app_data_cache, bundle_dir=bundle_dir)
+            for e in get_bundle_ids(bundle_dir=bundle_dir)}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Save a bundle of files, with "
+                                        "precomputed app data.")
+    parser.add_argument("bundle_id", help="Id of bundle")
+    parser.add_argument("sample_file", help="Path of sample file")
+    parser.add_argument("config_file", help="Path of config file")
+    parser.add_argument("--matrix-file", help="Path of matrix file")
+    parser.add_argument("--bundle-dir",
+                        type=Path,
+                        default=BUNDLE_DIR,
+                        help="Dir bundles are saved in")
+    args = parser.parse_args()
+    save_bundle(args.bundle_id,
+                args.sample_file,
+                args.config_file,
+                matrix_file_path=args.matrix_file,
+                bundle_dir=args.bundle_dir)
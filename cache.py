@@ -0,0 +1,341 @@
+"""Fns and classes for caching expensive vals b/w callbacks in viz.
+
+Gunicorn runs several worker processes, and a callback may be handled
+by a different worker than the previous one. So besides an in-process
+LRU cache, there are backends that share vals across workers: a
+directory on disk, and a Redis-compatible server.
+"""
+
+from collections import OrderedDict
+from hashlib import sha256
+from json import dumps
+from mmap import ACCESS_READ, mmap
+from os import getpid, replace, utime
+from pathlib import Path
+import pickle
+from struct import Struct
+from tempfile import gettempdir
+
+try:
+    import redis
+except ImportError:
+    # Only needed by ``RedisCache``
+    redis = None
+
+# Where ``DiskCache`` stores vals by default
+DISK_CACHE_DIR = Path(gettempdir()) / "amr_tv_cache"
+
+# Where ``get_fig_cache`` stores figs, if the disk backend is used
+FIG_CACHE_DIR = Path(gettempdir()) / "amr_tv_figs"
+
+# Max number of figs kept by ``get_fig_cache`` in shared backends.
+# Browsers may still show a fig that a newer one superseded, so this
+# should fit a few figs for each concurrent session.
+MAX_CACHED_FIGS = 64
+
+# Where ``RedisCache`` connects by default
+REDIS_URL = "redis://localhost:6379/0"
+
+# Lengths at the start of ``DiskCache`` files
+DISK_CACHE_HEADER = Struct("<Q")
+
+# Out-of-band buffers in ``DiskCache`` files start at multiples of
+# this, so numpy arrays are aligned.
+DISK_CACHE_ALIGNMENT = 64
+
+
+def get_cache_key(*args):
+    """Get a key identifying a combination of vals.
+
+    :param args: JSON-serializable vals
+    :return: Hash of ``args``
+    :rtype: str
+    """
+    args_str = dumps(args, sort_keys=True, default=str)
+    return sha256(args_str.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """In-process cache that evicts the least recently used entries."""
+
+    def __init__(self, max_size=4):
+        """Create empty cache.
+
+        :param max_size: Max number of entries kept in cache
+        :type max_size: int
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        """Get cached val.
+
+        :param key: ``get_cache_key`` ret val
+        :type key: str
+        :return: Cached val, or ``None`` if there is no entry for
+            ``key``.
+        """
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def set(self, key, val):
+        """Cache val, evicting the least recently used entry if full.
+
+        :param key: ``get_cache_key`` ret val
+        :type key: str
+        :param val: Val to cache
+        """
+        self.entries[key] = val
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+class DiskCache:
+    """Cache shared by processes, that stores vals in a directory.
+
+    Vals are pickled, with the contents of numpy arrays written after
+    the pickle. Those contents are memory-mapped when vals are read,
+    instead of copied into each process.
+
+    Memory-mapped numpy arrays are read-only, so cached vals should not
+    be modified.
+    """
+
+    def __init__(self, cache_dir=DISK_CACHE_DIR, max_size=16):
+        """Create cache, reusing entries already in ``cache_dir``.
+
+        :param cache_dir: Directory entries are stored in
+        :type cache_dir: pathlib.Path
+        :param max_size: Max number of entries kept in cache
+        :type max_size: int
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key):
+        """Get cached val.
+
+        :param key: ``get_cache_key`` ret val
+        :type key: str
+        :return: Cached val, or ``None`` if there is no entry for
+            ``key``.
+        """
+        path = self.cache_dir / key
+        try:
+            with open(path, "rb") as f:
+                contents = mmap(f.fileno(), 0, access=ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Mark as recently used, so it is not evicted soon
+        try:
+            utime(path)
+        except FileNotFoundError:
+            pass
+
+        contents = memoryview(contents)
+        offset = 0
+        lengths = []
+        for _ in range(2):
+            (length,) = DISK_CACHE_HEADER.unpack_from(contents, offset)
+            offset += DISK_CACHE_HEADER.size
+            lengths.append(length)
+        [header_length, pickle_length] = lengths
+        buffer_lengths = \
+            pickle.loads(contents[offset:offset+header_length])
+        offset += header_length
+        pickle_contents = contents[offset:offset+pickle_length]
+        offset += pickle_length
+        buffers = []
+        for buffer_length in buffer_lengths:
+            offset = -(-offset // DISK_CACHE_ALIGNMENT) * DISK_CACHE_ALIGNMENT
+            buffers.append(contents[offset:offset+buffer_length])
+            offset += buffer_length
+        return pickle.loads(pickle_contents, buffers=buffers)
+
+    def set(self, key, val):
+        """Cache val, evicting the least recently used entries if full.
+
+        :param key: ``get_cache_key`` ret val
+        :type key: str
+        :param val: Picklable val to cache
+        """
+        buffers = []
+        pickle_contents = pickle.dumps(val,
+                                       protocol=5,
+                                       buffer_callback=buffers.append)
+        buffers = [e.raw() for e in buffers]
+        header = pickle.dumps([len(e) for e in buffers])
+
+        # Written to a temporary file that is renamed once complete, so
+        # other processes never read partially written entries.
+        tmp_path = self.cache_dir / ("%s.%s.tmp" % (key, getpid()))
+        with open(tmp_path, "wb") as f:
+            f.write(DISK_CACHE_HEADER.pack(len(header)))
+            f.write(DISK_CACHE_HEADER.pack(len(pickle_contents)))
+            f.write(header)
+            f.write(pickle_contents)
+            for buffer in buffers:
+                padding = -f.tell() % DISK_CACHE_ALIGNMENT
+                f.write(b"\0" * padding)
+                f.write(buffer)
+        replace(tmp_path, self.cache_dir / key)
+
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries above ``max_size``."""
+        entries = []
+        for path in self.cache_dir.iterdir():
+            if path.suffix == ".tmp":
+                continue
+            # Other processes may evict entries at the same time
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        entries.sort(reverse=True)
+        for (_, path) in entries[self.max_size:]:
+            path.unlink(missing_ok=True)
+
+
+class RedisCache:
+    """Cache shared by processes, that stores vals in a Redis server.
+
+    Any server compatible with Redis works, as long as the ``redis``
+    package is installed. Entries expire after ``max_age`` seconds,
+    and the server may evict them sooner if it runs out of memory.
+    """
+
+    def __init__(self, url=REDIS_URL, max_age=3600, prefix="amr_tv:"):
+        """Connect to server.
+
+        :param url: URL of server
+        :type url: str
+        :param max_age: Seconds after which entries expire
+        :type max_age: int
+        :param prefix: Prefix of keys stored on server
+        :type prefix: str
+        :raises ImportError: If the ``redis`` package is not installed
+        """
+        if redis is None:
+            raise ImportError("RedisCache requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.max_age = max_age
+        self.prefix = prefix
+
+    def get(self, key):
+        """Get cached val.
+
+        :param key: ``get_cache_key`` ret val
+        :type key: str
+        :return: Cached val, or ``None`` if there is no entry for
+            ``key``.
+        """
+        contents = self.client.get(self.prefix + key)
+        if contents is None:
+            return None
+        return pickle.loads(contents)
+
+    def set(self, key, val):
+        """Cache val.
+
+        :param key: ``get_cache_key`` ret val
+        :type key: str
+        :param val: Picklable val to cache
+        """
+        self.client.set(self.prefix + key,
+                        pickle.dumps(val, protocol=5),
+                        ex=self.max_age)
+
+
+class TieredCache:
+    """Cache that checks several caches in order.
+
+    This is used to put an in-process cache in front of a shared one,
+    so vals are only read from the shared cache once per process.
+    """
+
+    def __init__(self, caches):
+        """Create cache.
+
+        :param caches: Caches to check, fastest first
+        :type caches: list
+        """
+        self.caches = caches
+
+    def get(self, key):
+        """Get cached val from the first cache that has it.
+
+        The val is also cached in the caches before that one.
+
+        :param key: ``get_cache_key`` ret val
+        :type key: str
+        :return: Cached val, or ``None`` if there is no entry for
+            ``key``.
+        """
+        for i, cache in enumerate(self.caches):
+            val = cache.get(key)
+            if val is not None:
+                for faster_cache in self.caches[:i]:
+                    faster_cache.set(key, val)
+                return val
+        return None
+
+    def set(self, key, val):
+        """Cache val in every cache.
+
+        :param key: ``get_cache_key`` ret val
+        :type key: str
+        :param val: Val to cache
+        """
+        for cache in self.caches:
+            cache.set(key, val)
+
+
+def get_cache(backend):
+    """Get cache using a backend.
+
+    Shared backends are put behind an in-process ``LRUCache``.
+
+    :param backend: ``"lru"``, ``"disk"`` or ``"redis"``
+    :type backend: str
+    :return: Cache with ``get`` and ``set`` methods
+    :rtype: LRUCache|TieredCache
+    :raises ValueError: If ``backend`` is not recognized
+    """
+    if backend == "lru":
+        return LRUCache()
+    elif backend == "disk":
+        return TieredCache([LRUCache(), DiskCache()])
+    elif backend == "redis":
+        return TieredCache([LRUCache(), RedisCache()])
+    else:
+        raise ValueError("Unrecognized cache backend: %s" % backend)
+
+
+def get_fig_cache(backend):
+    """Get cache storing figs last sent to browsers.
+
+    Each fig is stored under a new key and never changed, so shared
+    backends can be put behind an in-process ``LRUCache`` as well.
+
+    :param backend: ``"lru"``, ``"disk"`` or ``"redis"``
+    :type backend: str
+    :return: Cache with ``get`` and ``set`` methods
+    :rtype: LRUCache|TieredCache
+    :raises ValueError: If ``backend`` is not recognized
+    """
+    if backend == "lru":
+        return LRUCache(max_size=MAX_CACHED_FIGS)
+    elif backend == "disk":
+        return TieredCache([LRUCache(),
+                            DiskCache(FIG_CACHE_DIR,
+                                      max_size=MAX_CACHED_FIGS)])
+    elif backend == "redis":
+        return TieredCache([LRUCache(), RedisCache(prefix="amr_tv_fig:")])
+    else:
+        raise ValueError("Unrecognized cache backend: %s" % backend)
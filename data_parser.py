@@ -1,20 +1,32 @@
 """Parses sample file for data used in viz."""
 
 from base64 import b64decode
+from bisect import bisect_left, bisect_right
 from collections import Counter
 import csv
 from datetime import datetime
+from hashlib import sha256
+from heapq import merge
 from io import StringIO
-from itertools import groupby
-from json import loads
+from itertools import compress, groupby
+from json import dumps, loads
 from math import atan, ceil, degrees, floor, radians, sqrt, tan
 from re import compile
+from uuid import uuid4
 
-import networkx as nx
+import numpy as np
 import pandas as pd
 
 from adaptagrams.cola import adaptagrams as ag
 from expression_evaluator import eval_expr
+from spatial_index import GridIndex
+
+# Sliders only stop at marks, so each distinct weight needs one. But
+# sliders are slow to render with many marks.
+MAX_WEIGHT_SLIDER_MARKS = 100
+
+# Stages of ``get_app_data``, in the order they start
+APP_DATA_STAGES = ["parse", "links", "ordering", "vpsc"]
 
 
 def parse_fields_from_example_file(example_file_base64_str, delimiter):
@@ -40,7 +52,7 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
                  matrix_file_base64_str=None, selected_nodes=None,
                  filtered_node_symbols=None, filtered_node_colors=None,
                  filtered_link_types=None, link_slider_vals_dict=None,
-                 link_neq_dict=None, vpsc=False):
+                 link_neq_dict=None, vpsc=False, stage_callback=None):
     """Get data from uploaded file that is used to generate viz.
 
     :param sample_file_base64_str: Base64 encoded str corresponding to
@@ -68,46 +80,86 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
     :type link_neq_dict: dict[str[list[int]]]
     :param vpsc: Run vpsc nodal overlap removal algorithm
     :type vpsc: bool
+    :param stage_callback: Called with each ``APP_DATA_STAGES`` val as
+        that stage starts. The vpsc stage is skipped if ``vpsc`` is
+        False.
+    :type stage_callback: (str) -> None
     :return: Data derived from sample data, used to generate viz
     :rtype: dict
     """
-    if selected_nodes is None:
-        selected_nodes = {}
-    if filtered_node_symbols is None:
-        filtered_node_symbols = {}
-    if filtered_node_colors is None:
-        filtered_node_colors = {}
+    unfiltered_app_data = get_unfiltered_app_data(
+        sample_file_base64_str,
+        config_file_base64_str,
+        matrix_file_base64_str=matrix_file_base64_str,
+        filtered_link_types=filtered_link_types,
+        vpsc=vpsc,
+        stage_callback=stage_callback
+    )
+    weight_filtered_app_data = get_weight_filtered_app_data(
+        unfiltered_app_data,
+        link_slider_vals_dict=link_slider_vals_dict,
+        link_neq_dict=link_neq_dict
+    )
+    return get_node_filtered_app_data(
+        weight_filtered_app_data,
+        selected_nodes=selected_nodes,
+        filtered_node_symbols=filtered_node_symbols,
+        filtered_node_colors=filtered_node_colors
+    )
+
+
+def get_unfiltered_app_data(sample_file_base64_str, config_file_base64_str,
+                            matrix_file_base64_str=None,
+                            filtered_link_types=None, vpsc=False,
+                            stage_callback=None,
+                            prev_unfiltered_app_data=None):
+    """Get data used to generate viz, before applying weight filters.
+
+    Weight filters, selected nodes and filtered nodes set through the
+    ui do not change the positions of nodes, or which links are
+    generated. So this ret val can be reused while the user only
+    changes those.
+
+    If the sample file appends samples to one this was called with
+    before, links b/w earlier samples are taken from that ret val.
+
+    :param sample_file_base64_str: Base64 encoded str corresponding to
+        contents of user uploaded sample file.
+    :type sample_file_base64_str: str
+    :param config_file_base64_str: Base64 encoded str corresponding to
+        contents of user uploaded config file.
+    :type config_file_base64_str: str
+    :param matrix_file_base64_str: Base64 encoded str corresponding to
+        contents of user uploaded matrix file.
+    :type matrix_file_base64_str: str
+    :param filtered_link_types: Link types filtered by user
+    :type filtered_link_types: dict
+    :param vpsc: Run vpsc nodal overlap removal algorithm
+    :type vpsc: bool
+    :param stage_callback: Called with each ``APP_DATA_STAGES`` val as
+        that stage starts. The vpsc stage is skipped if ``vpsc`` is
+        False.
+    :type stage_callback: (str) -> None
+    :param prev_unfiltered_app_data: Ret val of this fn for a sample
+        file these samples were appended to, with the same config file
+        and other args.
+    :type prev_unfiltered_app_data: dict
+    :return: ``get_app_data`` vals that do not depend on links or node
+        states under ``app_data``, and vals used to generate the rest.
+    :rtype: dict
+    """
+    if stage_callback is None:
+        def stage_callback(_):
+            pass
     if filtered_link_types is None:
         filtered_link_types = {}
-    if link_slider_vals_dict is None:
-        link_slider_vals_dict = {}
-    if link_neq_dict is None:
-        link_neq_dict = {}
 
+    stage_callback("parse")
     sample_file_str = b64decode(sample_file_base64_str).decode("utf-8")
 
     config_file_str = b64decode(config_file_base64_str).decode("utf-8")
     config_file_dict = loads(config_file_str)
 
-
-    links_config_dict = config_file_dict["links_config"]
-    # Adjust filters if slider vals set by user through ui
-    for link in link_slider_vals_dict:
-        weight_filters = links_config_dict[link]["weight_filters"]
-        [less_than, greater_than] = link_slider_vals_dict[link]
-        weight_filters["less_than"] = less_than
-        weight_filters["greater_than"] = greater_than
-        # Edge case: slider [x, x] but x in neq vals
-        if less_than == greater_than and less_than in link_neq_dict[link]:
-            # Reset slider
-            del weight_filters["less_than"]
-            del weight_filters["greater_than"]
-    # Adjust filters if filter form unchecked vals set
-    for link in link_neq_dict:
-        weight_filters = links_config_dict[link]["weight_filters"]
-        not_equal = link_neq_dict[link]
-        weight_filters["not_equal"] = not_equal
-
     y_axis_attributes = [config_file_dict["primary_y_axis"]]
     y_axis_attributes += \
         [";".join(e) for e in config_file_dict["secondary_y_axes"]]
@@ -177,32 +229,6 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
         node_color_attr_dict = {}
         main_fig_nodes_marker_color = "lightgrey"
 
-    # Avoid selection of filtered nodes
-    filtered_node_indices_set = set()
-    for i, _ in enumerate(main_fig_nodes_marker_symbol):
-        filter_cond_1 = \
-            main_fig_nodes_marker_symbol[i] in filtered_node_symbols
-        filter_cond_2 = \
-            main_fig_nodes_marker_color[i] in filtered_node_colors
-        if filter_cond_1 or filter_cond_2:
-            filtered_node_indices_set.add(i)
-    selected_nodes = \
-        {int(k): v for k, v in selected_nodes.items()
-         if int(k) not in filtered_node_indices_set}
-
-    main_fig_nodes_marker_opacity = []
-    partially_hidden_samples = set()
-    fully_hidden_samples = set()
-    for node_index, sample in enumerate(sample_data_dict):
-        if node_index in filtered_node_indices_set:
-            main_fig_nodes_marker_opacity.append(0)
-            fully_hidden_samples.add(sample)
-        elif selected_nodes and node_index not in selected_nodes:
-            main_fig_nodes_marker_opacity.append(0.5)
-            partially_hidden_samples.add(sample)
-        else:
-            main_fig_nodes_marker_opacity.append(1)
-
     label_attr = config_file_dict["label_attr"]
     main_fig_nodes_text = \
         ["<br>".join(["<b>%s</b>" % v[e] for e in label_attr])
@@ -216,6 +242,22 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
     main_fig_height = get_main_fig_height(max_node_count_at_track_dict)
     main_fig_width = len(date_x_vals_dict) * 144
 
+    stage_callback("links")
+    prev_sample_links_dict = None
+    num_of_prev_samples = 0
+    if prev_unfiltered_app_data is not None:
+        prev_sample_list = list(prev_unfiltered_app_data["node_index_dict"])
+        prev_filtered_link_types = \
+            prev_unfiltered_app_data["app_data"]["filtered_link_types"]
+        # Samples were only appended if earlier ones are in the same
+        # order.
+        prev_samples_kept = \
+            list(sample_data_dict)[:len(prev_sample_list)] == prev_sample_list
+        if prev_samples_kept \
+                and prev_filtered_link_types == filtered_link_types:
+            prev_sample_links_dict = \
+                prev_unfiltered_app_data["sample_links_dict"]
+            num_of_prev_samples = len(prev_sample_list)
     sample_links_dict = get_sample_links_dict(
         sample_data_dict=sample_data_dict,
         links_config=config_file_dict["links_config"],
@@ -223,9 +265,12 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
         links_across_primary_y=config_file_dict["links_across_primary_y"],
         max_day_range=config_file_dict["max_day_range"],
         matrix_file_df=matrix_file_df,
-        filtered_link_types=filtered_link_types
+        filtered_link_types=filtered_link_types,
+        prev_sample_links_dict=prev_sample_links_dict,
+        num_of_prev_samples=num_of_prev_samples
     )
 
+    stage_callback("ordering")
     main_fig_nodes_y_dict = get_main_fig_nodes_y_dict(
         sample_data_dict=sample_data_dict,
         sample_links_dict=sample_links_dict,
@@ -237,6 +282,7 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
     )
 
     if vpsc:
+        stage_callback("vpsc")
         node_overlap_dict = \
             remove_node_overlap(main_fig_nodes_x_dict,
                                 main_fig_nodes_y_dict,
@@ -249,84 +295,7 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
         get_zoomed_out_main_fig_x_axis_dict(datetime_list,
                                             main_fig_nodes_x_dict)
 
-    # Order of next few calls is important:
-    # * Get weight slider info
-    # * Get weight filter form info
-    # * Filter links by weight
-    # * Filter link loops
-    weight_slider_info_dict = get_weight_slider_info_dict(sample_links_dict)
-    weight_filter_form_dict = get_weight_filter_form_dict(sample_links_dict)
-    sample_links_dict = filter_links_by_weight(sample_links_dict)
-    sample_links_dict = \
-        filter_link_loops(sample_links_dict=sample_links_dict,
-                          links_config=config_file_dict["links_config"],
-                          main_fig_nodes_x_dict=main_fig_nodes_x_dict,
-                          main_fig_nodes_y_dict=main_fig_nodes_y_dict)
-
-    link_color_dict = get_link_color_dict(sample_links_dict)
-
-    main_fig_links_dict = get_main_fig_links_dict(
-        sample_links_dict=sample_links_dict,
-        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
-        main_fig_nodes_y_dict=main_fig_nodes_y_dict,
-        partially_hidden_samples=partially_hidden_samples,
-        fully_hidden_samples=fully_hidden_samples,
-        main_fig_height=main_fig_height,
-        main_fig_width=main_fig_width,
-        xaxis_range=xaxis_range,
-        yaxis_range=yaxis_range
-    )
-
-    main_fig_arcs_dict = get_main_fig_arcs_dict(
-        sample_links_dict=sample_links_dict,
-        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
-        main_fig_nodes_y_dict=main_fig_nodes_y_dict,
-        partially_hidden_samples=partially_hidden_samples,
-        fully_hidden_samples=fully_hidden_samples
-    )
-
-    main_fig_link_arrowheads_dict = get_main_fig_link_arrowheads_dict(
-        main_fig_links_dict=main_fig_links_dict,
-        links_config=config_file_dict["links_config"],
-        main_fig_height=main_fig_height,
-        yaxis_range=yaxis_range
-    )
-
-    main_fig_arc_arrowheads_dict = get_main_fig_arc_arrowheads_dict(
-        main_fig_arcs_dict=main_fig_arcs_dict,
-        links_config=config_file_dict["links_config"],
-        main_fig_height=main_fig_height,
-        yaxis_range=yaxis_range
-    )
-
-    main_fig_link_labels_dict = get_main_fig_link_labels_dict(
-        sample_links_dict=sample_links_dict,
-        links_config=config_file_dict["links_config"],
-        main_fig_links_dict=main_fig_links_dict,
-        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
-        partially_hidden_samples=partially_hidden_samples,
-        fully_hidden_samples=fully_hidden_samples,
-        main_fig_height=main_fig_height,
-        main_fig_width=main_fig_width,
-        xaxis_range=xaxis_range,
-        yaxis_range=yaxis_range
-    )
-
-    main_fig_arc_labels_dict = get_main_fig_arc_labels_dict(
-        sample_links_dict=sample_links_dict,
-        links_config=config_file_dict["links_config"],
-        main_fig_arcs_dict=main_fig_arcs_dict,
-        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
-        partially_hidden_samples=partially_hidden_samples,
-        fully_hidden_samples=fully_hidden_samples
-    )
-
-    if partially_hidden_samples or fully_hidden_samples:
-        phs = partially_hidden_samples
-        main_fig_nodes_textfont_color = \
-            ["grey" if k in phs else "black" for k in sample_data_dict]
-    else:
-        main_fig_nodes_textfont_color = "black"
+    node_index_dict = {k: i for i, k in enumerate(sample_data_dict)}
 
     main_fig_yaxis_ticktext = get_main_fig_yaxis_ticktext(track_y_vals_dict)
     zoomed_out_main_fig_yaxis_tickvals = \
@@ -336,6 +305,9 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
          for i in track_y_vals_dict]
     ))
 
+    # Links are generated wrt the ranges before node overlap removal
+    links_xaxis_range = xaxis_range
+    links_yaxis_range = yaxis_range
     if vpsc:
         xaxis_range = node_overlap_dict["xaxis_range"]
         yaxis_range = node_overlap_dict["yaxis_range"]
@@ -345,20 +317,8 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
             list(range(len(node_symbol_attr_dict))),
         "node_shape_legend_fig_nodes_marker_symbol":
             list(node_symbol_attr_dict.values()),
-        "node_shape_legend_fig_nodes_marker_opacity":
-            [0.5 if e in filtered_node_symbols else 1
-             for e in node_symbol_attr_dict.values()],
         "node_shape_legend_fig_nodes_text":
             ["<b>%s</b>" % k for k in node_symbol_attr_dict.keys()],
-        "node_shape_legend_fig_nodes_textfont_color":
-            ["grey" if e in filtered_node_symbols else "black"
-             for e in node_symbol_attr_dict.values()],
-        "node_color_legend_fig_nodes_marker_opacity":
-            [0.5 if e in filtered_node_colors else 1
-             for e in node_color_attr_dict.values()],
-        "node_color_legend_fig_nodes_textfont_color":
-            ["grey" if e in filtered_node_colors else "black"
-             for e in node_color_attr_dict.values()],
         "filtered_link_types": filtered_link_types,
         "main_fig_xaxis_range":
             xaxis_range,
@@ -376,28 +336,17 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
             [main_fig_nodes_x_dict["staggered"][k] for k in sample_data_dict],
         "main_fig_nodes_y":
             [main_fig_nodes_y_dict[k] for k in sample_data_dict],
+        "main_fig_nodes_index":
+            list(range(len(sample_data_dict))),
         "main_fig_nodes_marker_symbol":
             main_fig_nodes_marker_symbol,
         "main_fig_nodes_marker_color":
             main_fig_nodes_marker_color,
-        "main_fig_nodes_marker_opacity":
-            main_fig_nodes_marker_opacity,
         "main_fig_nodes_text":
             main_fig_nodes_text,
-        "main_fig_nodes_textfont_color":
-            main_fig_nodes_textfont_color,
         "main_fig_nodes_hovertext":
             main_fig_nodes_hovertext,
         "node_color_attr_dict": node_color_attr_dict,
-        "main_fig_links_dict": main_fig_links_dict,
-        "main_fig_arcs_dict": main_fig_arcs_dict,
-        "main_fig_link_arrowheads_dict": main_fig_link_arrowheads_dict,
-        "main_fig_arc_arrowheads_dict": main_fig_arc_arrowheads_dict,
-        "main_fig_link_labels_dict": main_fig_link_labels_dict,
-        "main_fig_arc_labels_dict": main_fig_arc_labels_dict,
-        "link_color_dict": link_color_dict,
-        "weight_slider_info_dict": weight_slider_info_dict,
-        "weight_filter_form_dict": weight_filter_form_dict,
         "main_fig_primary_facet_x":
             get_main_fig_primary_facet_x(xaxis_range, num_of_primary_facets),
         "main_fig_primary_facet_y":
@@ -425,33 +374,659 @@ def get_app_data(sample_file_base64_str, config_file_base64_str,
         "node_color_attr": node_color_attr,
     }
 
+    link_weight_index_dict = get_link_weight_index_dict(sample_links_dict)
+    link_loop_order_dict = get_link_loop_order_dict(
+        sample_links_dict=sample_links_dict,
+        links_config=config_file_dict["links_config"],
+        link_weight_index_dict=link_weight_index_dict,
+        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
+        main_fig_nodes_y_dict=main_fig_nodes_y_dict
+    )
+
+    return {
+        "app_data": app_data,
+        # Figs drawn from app data with another layout id are redrawn
+        # instead of updated.
+        "layout_id": uuid4().hex,
+        "links_config": config_file_dict["links_config"],
+        "sample_links_dict": sample_links_dict,
+        "link_weight_index_dict": link_weight_index_dict,
+        "link_loop_order_dict": link_loop_order_dict,
+        "link_weight_summary_dict":
+            get_link_weight_summary_dict(sample_links_dict,
+                                         link_weight_index_dict),
+        "node_index_dict": node_index_dict,
+        "main_fig_nodes_x_dict": main_fig_nodes_x_dict,
+        "main_fig_nodes_y_dict": main_fig_nodes_y_dict,
+        "xaxis_range": links_xaxis_range,
+        "yaxis_range": links_yaxis_range,
+        "track_list": track_list,
+        "track_y_vals_dict": track_y_vals_dict
+    }
+
+
+def get_weight_filtered_app_data(unfiltered_app_data,
+                                 link_slider_vals_dict=None,
+                                 link_neq_dict=None):
+    """Get data used to generate viz, after applying weight filters.
+
+    ``unfiltered_app_data`` is not modified, so it can be cached and
+    reused with other weight filters.
+
+    Links, arcs, arrowheads and weight labels are generated for every
+    link kept by weight filters, as if no nodes were selected or
+    filtered. ``get_node_filtered_app_data`` then only removes those of
+    hidden nodes, so this ret val can be reused while the user only
+    selects or filters nodes.
+
+    :param unfiltered_app_data: ``get_unfiltered_app_data`` ret val
+    :type unfiltered_app_data: dict
+    :param link_slider_vals_dict: Dict mapping link types to slider
+        vals.
+    :type link_slider_vals_dict: dict[str[list[int]]]
+    :param link_neq_dict: Dict mapping link types to unselected filter
+        form vals.
+    :type link_neq_dict: dict[str[list[int]]]
+    :return: ``get_app_data`` vals that do not depend on node states
+        under ``app_data``, and vals used to generate the rest.
+    :rtype: dict
+    """
+    if link_slider_vals_dict is None:
+        link_slider_vals_dict = {}
+    if link_neq_dict is None:
+        link_neq_dict = {}
+
+    links_config = unfiltered_app_data["links_config"]
+    main_fig_nodes_x_dict = unfiltered_app_data["main_fig_nodes_x_dict"]
+    main_fig_nodes_y_dict = unfiltered_app_data["main_fig_nodes_y_dict"]
+    main_fig_height = unfiltered_app_data["app_data"]["main_fig_height"]
+    main_fig_width = unfiltered_app_data["app_data"]["main_fig_width"]
+    xaxis_range = unfiltered_app_data["xaxis_range"]
+    yaxis_range = unfiltered_app_data["yaxis_range"]
+
+    link_weight_filters_dict = \
+        get_link_weight_filters_dict(links_config,
+                                     link_slider_vals_dict,
+                                     link_neq_dict)
+    link_weight_summary_dict = unfiltered_app_data["link_weight_summary_dict"]
+    weight_slider_info_dict = \
+        get_weight_slider_info_dict(link_weight_summary_dict,
+                                    link_weight_filters_dict)
+    weight_filter_form_dict = \
+        get_weight_filter_form_dict(link_weight_summary_dict,
+                                    link_weight_filters_dict)
+
+    # Order of next few calls is important:
+    # * Filter links by weight
+    # * Filter link loops
+    sample_links_dict = \
+        filter_links_by_weight(unfiltered_app_data["sample_links_dict"],
+                               unfiltered_app_data["link_weight_index_dict"],
+                               link_weight_filters_dict)
+    sample_links_dict = \
+        filter_link_loops(
+            sample_links_dict=sample_links_dict,
+            link_loop_order_dict=unfiltered_app_data["link_loop_order_dict"]
+        )
+
+    link_color_dict = get_link_color_dict(sample_links_dict)
+
+    node_index_dict = unfiltered_app_data["node_index_dict"]
+    link_node_indices_dict = \
+        get_link_node_indices_dict(sample_links_dict, node_index_dict)
+    rendered_links_mask_dict = \
+        {k: np.ones(len(v), dtype=bool)
+         for k, v in link_node_indices_dict.items()}
+
+    main_fig_links_dict = get_main_fig_links_dict(
+        sample_links_dict=sample_links_dict,
+        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
+        main_fig_nodes_y_dict=main_fig_nodes_y_dict,
+        rendered_links_mask_dict=rendered_links_mask_dict,
+        main_fig_height=main_fig_height,
+        main_fig_width=main_fig_width,
+        xaxis_range=xaxis_range,
+        yaxis_range=yaxis_range
+    )
+
+    main_fig_arcs_dict = get_main_fig_arcs_dict(
+        sample_links_dict=sample_links_dict,
+        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
+        main_fig_nodes_y_dict=main_fig_nodes_y_dict,
+        rendered_links_mask_dict=rendered_links_mask_dict
+    )
+
+    main_fig_link_arrowheads_dict = get_main_fig_link_arrowheads_dict(
+        main_fig_links_dict=main_fig_links_dict,
+        links_config=links_config,
+        main_fig_height=main_fig_height,
+        yaxis_range=yaxis_range
+    )
+
+    main_fig_arc_arrowheads_dict = get_main_fig_arc_arrowheads_dict(
+        main_fig_arcs_dict=main_fig_arcs_dict,
+        links_config=links_config,
+        main_fig_height=main_fig_height,
+        yaxis_range=yaxis_range
+    )
+
+    main_fig_link_labels_dict = get_main_fig_link_labels_dict(
+        sample_links_dict=sample_links_dict,
+        links_config=links_config,
+        main_fig_links_dict=main_fig_links_dict,
+        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
+        rendered_links_mask_dict=rendered_links_mask_dict,
+        main_fig_height=main_fig_height,
+        main_fig_width=main_fig_width,
+        xaxis_range=xaxis_range,
+        yaxis_range=yaxis_range
+    )
+
+    main_fig_arc_labels_dict = get_main_fig_arc_labels_dict(
+        sample_links_dict=sample_links_dict,
+        links_config=links_config,
+        main_fig_arcs_dict=main_fig_arcs_dict,
+        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
+        rendered_links_mask_dict=rendered_links_mask_dict
+    )
+
+    app_data = dict(unfiltered_app_data["app_data"])
+    app_data.update({
+        "main_fig_links_dict": main_fig_links_dict,
+        "main_fig_arcs_dict": main_fig_arcs_dict,
+        "main_fig_link_arrowheads_dict": main_fig_link_arrowheads_dict,
+        "main_fig_arc_arrowheads_dict": main_fig_arc_arrowheads_dict,
+        "main_fig_link_labels_dict": main_fig_link_labels_dict,
+        "main_fig_arc_labels_dict": main_fig_arc_labels_dict,
+        "link_color_dict": link_color_dict,
+        "weight_slider_info_dict": weight_slider_info_dict,
+        "weight_filter_form_dict": weight_filter_form_dict
+    })
+
+    # Links of a type are drawn the same way, unless weight filters or
+    # node states change which of them are kept.
+    link_weight_filters_id_dict = \
+        {k: dumps(v, sort_keys=True, default=str)
+         for k, v in link_weight_filters_dict.items()}
+
+    return {
+        "app_data": app_data,
+        "layout_id": unfiltered_app_data["layout_id"],
+        "link_weight_filters_id_dict": link_weight_filters_id_dict,
+        "link_node_indices_dict": link_node_indices_dict,
+        "element_link_positions_dict": get_element_link_positions_dict(
+            sample_links_dict=sample_links_dict,
+            links_config=links_config,
+            link_node_indices_dict=link_node_indices_dict,
+            main_fig_nodes_x_dict=main_fig_nodes_x_dict,
+            node_index_dict=node_index_dict
+        ),
+        "node_index_dict": node_index_dict,
+        "main_fig_nodes_x_dict": main_fig_nodes_x_dict,
+        "track_list": unfiltered_app_data["track_list"],
+        "track_y_vals_dict": unfiltered_app_data["track_y_vals_dict"]
+    }
+
+
+def get_node_filtered_app_data(weight_filtered_app_data, selected_nodes=None,
+                               filtered_node_symbols=None,
+                               filtered_node_colors=None):
+    """Get data used to generate viz, after applying node states.
+
+    Nodes are semi-transparent if other nodes are selected, and fully
+    transparent if their symbols or colors are filtered. Links, arcs,
+    arrowheads and weight labels of hidden nodes are removed from the
+    ones generated by ``get_weight_filtered_app_data``, which takes
+    time proportional to the number of nodes and links, without
+    recalculating any geometry.
+
+    ``weight_filtered_app_data`` is not modified, so it can be cached
+    and reused with other node states.
+
+    :param weight_filtered_app_data: ``get_weight_filtered_app_data``
+        ret val.
+    :type weight_filtered_app_data: dict
+    :param selected_nodes: Nodes selected by user
+    :type selected_nodes: dict
+    :param filtered_node_symbols: Node symbols filtered by user
+    :type filtered_node_symbols: dict
+    :param filtered_node_colors: Node colors filtered by user
+    :type filtered_node_colors: dict
+    :return: ``get_app_data`` ret val
+    :rtype: dict
+    """
+    if selected_nodes is None:
+        selected_nodes = {}
+    if filtered_node_symbols is None:
+        filtered_node_symbols = {}
+    if filtered_node_colors is None:
+        filtered_node_colors = {}
+
+    app_data = dict(weight_filtered_app_data["app_data"])
+    num_of_nodes = len(app_data["main_fig_nodes_index"])
+    main_fig_nodes_marker_symbol = app_data["main_fig_nodes_marker_symbol"]
+    main_fig_nodes_marker_color = app_data["main_fig_nodes_marker_color"]
+    if isinstance(main_fig_nodes_marker_symbol, str):
+        main_fig_nodes_marker_symbol = \
+            [main_fig_nodes_marker_symbol] * num_of_nodes
+    if isinstance(main_fig_nodes_marker_color, str):
+        main_fig_nodes_marker_color = \
+            [main_fig_nodes_marker_color] * num_of_nodes
+
+    # Avoid selection of filtered nodes
+    filtered_node_indices_set = set()
+    for i, _ in enumerate(main_fig_nodes_marker_symbol):
+        filter_cond_1 = \
+            main_fig_nodes_marker_symbol[i] in filtered_node_symbols
+        filter_cond_2 = \
+            main_fig_nodes_marker_color[i] in filtered_node_colors
+        if filter_cond_1 or filter_cond_2:
+            filtered_node_indices_set.add(i)
+    selected_nodes = \
+        {int(k): v for k, v in selected_nodes.items()
+         if int(k) not in filtered_node_indices_set}
+
+    main_fig_nodes_marker_opacity = []
+    # Hidden states are tracked per node index, in the same order as
+    # ``sample_data_dict``.
+    partially_hidden_nodes = np.zeros(num_of_nodes, dtype=bool)
+    fully_hidden_nodes = np.zeros(num_of_nodes, dtype=bool)
+    for node_index in range(num_of_nodes):
+        if node_index in filtered_node_indices_set:
+            main_fig_nodes_marker_opacity.append(0)
+            fully_hidden_nodes[node_index] = True
+        elif selected_nodes and node_index not in selected_nodes:
+            main_fig_nodes_marker_opacity.append(0.5)
+            partially_hidden_nodes[node_index] = True
+        else:
+            main_fig_nodes_marker_opacity.append(1)
+
+    if partially_hidden_nodes.any() or fully_hidden_nodes.any():
+        main_fig_nodes_textfont_color = \
+            ["grey" if e else "black" for e in partially_hidden_nodes]
+    else:
+        main_fig_nodes_textfont_color = "black"
+
+    node_symbols = app_data["node_shape_legend_fig_nodes_marker_symbol"]
+    node_colors = app_data["node_color_attr_dict"].values()
+    app_data.update({
+        "node_shape_legend_fig_nodes_marker_opacity":
+            [0.5 if e in filtered_node_symbols else 1 for e in node_symbols],
+        "node_shape_legend_fig_nodes_textfont_color":
+            ["grey" if e in filtered_node_symbols else "black"
+             for e in node_symbols],
+        "node_color_legend_fig_nodes_marker_opacity":
+            [0.5 if e in filtered_node_colors else 1 for e in node_colors],
+        "node_color_legend_fig_nodes_textfont_color":
+            ["grey" if e in filtered_node_colors else "black"
+             for e in node_colors],
+        "main_fig_nodes_marker_opacity": main_fig_nodes_marker_opacity,
+        "main_fig_nodes_textfont_color": main_fig_nodes_textfont_color
+    })
+
+    link_node_indices_dict = weight_filtered_app_data["link_node_indices_dict"]
+    rendered_links_mask_dict = get_rendered_links_mask_dict(
+        link_node_indices_dict=link_node_indices_dict,
+        partially_hidden_nodes=partially_hidden_nodes,
+        fully_hidden_nodes=fully_hidden_nodes
+    )
+    element_link_positions_dict = \
+        weight_filtered_app_data["element_link_positions_dict"]
+    for element_dict_key, link_positions_dict in \
+            element_link_positions_dict.items():
+        # Links are drawn as two vals and a ``None``
+        if element_dict_key == "main_fig_links_dict":
+            vals_per_element = 3
+        else:
+            vals_per_element = 1
+        app_data[element_dict_key] = get_rendered_elements_dict(
+            elements_dict=app_data[element_dict_key],
+            link_positions_dict=link_positions_dict,
+            rendered_links_mask_dict=rendered_links_mask_dict,
+            vals_per_element=vals_per_element
+        )
+
+    main_fig_nodes_x_dict = weight_filtered_app_data["main_fig_nodes_x_dict"]
+    zoomed_out_main_fig_lod_dict = get_zoomed_out_main_fig_lod_dict(
+        link_node_indices_dict=link_node_indices_dict,
+        node_index_dict=weight_filtered_app_data["node_index_dict"],
+        rendered_links_mask_dict=rendered_links_mask_dict,
+        track_list=weight_filtered_app_data["track_list"],
+        track_y_vals_dict=weight_filtered_app_data["track_y_vals_dict"],
+        main_fig_nodes_x_dict=main_fig_nodes_x_dict,
+        main_fig_nodes_x=app_data["main_fig_nodes_x"],
+        main_fig_nodes_y=app_data["main_fig_nodes_y"],
+        main_fig_nodes_marker_color=app_data["main_fig_nodes_marker_color"],
+        main_fig_nodes_marker_opacity=main_fig_nodes_marker_opacity
+    )
+    app_data["zoomed_out_main_fig_lod_dict"] = zoomed_out_main_fig_lod_dict
+
+    # Figs keep the versions they were drawn with, so updating them
+    # only redraws the traces of nodes and link types that changed.
+    link_weight_filters_id_dict = \
+        weight_filtered_app_data["link_weight_filters_id_dict"]
+    app_data["version_dict"] = {
+        "layout": weight_filtered_app_data["layout_id"],
+        "nodes": get_array_digest(np.array(main_fig_nodes_marker_opacity)),
+        "links": {k: get_array_digest(v, link_weight_filters_id_dict[k])
+                  for k, v in rendered_links_mask_dict.items()}
+    }
+
     return app_data
 
 
-def is_link_rendered(sample, other_sample, partially_hidden_samples,
-                     fully_hidden_samples):
-    """Determines whether links b/w samples should be rendered in viz.
+def get_array_digest(array, salt=""):
+    """Get a short digest of the vals in an array.
+
+    :param array: Array to digest
+    :type array: np.ndarray
+    :param salt: Str digested before the array
+    :type salt: str
+    :return: Hex digest
+    :rtype: str
+    """
+    digest = sha256(salt.encode("utf-8"))
+    digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def get_link_node_indices_dict(sample_links_dict, node_index_dict):
+    """Get indices of the nodes each link is b/w.
+
+    :param sample_links_dict: ``get_sample_links_dict`` ret val
+    :type sample_links_dict: dict
+    :param node_index_dict: Dict mapping samples to node indices
+    :type node_index_dict: dict[str, int]
+    :return: Dict mapping links to arrays with one row per link, in the
+        same order as the links in ``sample_links_dict``, and the
+        indices of both nodes as cols.
+    :rtype: dict[str, np.ndarray]
+    """
+    ret = {}
+    for link in sample_links_dict:
+        ret[link] = np.array(
+            [[node_index_dict[sample], node_index_dict[other_sample]]
+             for (sample, other_sample) in sample_links_dict[link]],
+            dtype=int
+        ).reshape(-1, 2)
+    return ret
+
+
+def get_element_link_positions_dict(sample_links_dict, links_config,
+                                    link_node_indices_dict,
+                                    main_fig_nodes_x_dict, node_index_dict):
+    """Get the link each main fig element was generated for.
+
+    Links b/w nodes with the same x val are drawn as arcs, and the rest
+    as straight links. Arrowheads are generated for every link or arc
+    of link types that show them, and weight labels for every link or
+    arc with a weight.
+
+    :param sample_links_dict: ``get_sample_links_dict`` ret val
+    :type sample_links_dict: dict
+    :param links_config: dict of criteria for different user-specified
+        links.
+    :type links_config: dict
+    :param link_node_indices_dict: ``get_link_node_indices_dict`` ret
+        val for ``sample_links_dict``.
+    :type link_node_indices_dict: dict[str, np.ndarray]
+    :param main_fig_nodes_x_dict: ``get_main_fig_nodes_x_dict`` ret val
+    :type main_fig_nodes_x_dict: dict
+    :param node_index_dict: Dict mapping samples to node indices
+    :type node_index_dict: dict[str, int]
+    :return: Dict mapping ``app_data`` keys of dicts of elements to
+        dicts mapping links to the positions of the links in
+        ``sample_links_dict`` that each element was generated for.
+    :rtype: dict[str, dict[str, np.ndarray]]
+    """
+    unstaggered_x = np.array(
+        [main_fig_nodes_x_dict["unstaggered"][k] for k in node_index_dict]
+    )
+    ret = {
+        "main_fig_links_dict": {},
+        "main_fig_arcs_dict": {},
+        "main_fig_link_arrowheads_dict": {},
+        "main_fig_arc_arrowheads_dict": {},
+        "main_fig_link_labels_dict": {},
+        "main_fig_arc_labels_dict": {}
+    }
+    for link, link_node_indices in link_node_indices_dict.items():
+        link_x = unstaggered_x[link_node_indices]
+        is_arc = link_x[:, 0] == link_x[:, 1]
+        link_positions = np.flatnonzero(~is_arc)
+        arc_positions = np.flatnonzero(is_arc)
+        ret["main_fig_links_dict"][link] = link_positions
+        ret["main_fig_arcs_dict"][link] = arc_positions
+        if links_config[link]["show_arrowheads"]:
+            ret["main_fig_link_arrowheads_dict"][link] = link_positions
+            ret["main_fig_arc_arrowheads_dict"][link] = arc_positions
+        if links_config[link]["show_weights"]:
+            is_labelled = np.array(
+                [not (e is None
+                      or e["filtered_by_neq"]
+                      or e["filtered_by_range"])
+                 for e in sample_links_dict[link].values()],
+                dtype=bool
+            )
+            ret["main_fig_link_labels_dict"][link] = \
+                np.flatnonzero(~is_arc & is_labelled)
+            ret["main_fig_arc_labels_dict"][link] = \
+                np.flatnonzero(is_arc & is_labelled)
+    return ret
+
+
+def get_rendered_links_mask_dict(link_node_indices_dict,
+                                 partially_hidden_nodes, fully_hidden_nodes):
+    """Get masks identifying links that should be rendered in viz.
 
     We do not render links where both samples are partially hidden, or
     one sample is fully hidden.
 
-    :param sample: One sample in link
-    :type sample: str
-    :param other_sample: Other sample in link
-    :type other_sample: str
-    :param partially_hidden_samples: Semi-transparent samples
-    :type partially_hidden_samples: set[str]
-    :param fully_hidden_samples: Fully-transparent samples
-    :type fully_hidden_samples: set[str]
-    :return: True if link b/w samples should be fully rendered, False
-        otherwise.
-    :rtype: bool
+    :param link_node_indices_dict: ``get_link_node_indices_dict`` ret
+        val.
+    :type link_node_indices_dict: dict[str, np.ndarray]
+    :param partially_hidden_nodes: Whether each node is semi-transparent
+    :type partially_hidden_nodes: np.ndarray
+    :param fully_hidden_nodes: Whether each node is fully-transparent
+    :type fully_hidden_nodes: np.ndarray
+    :return: Dict mapping links to bool arrays, which are True for
+        links that should be rendered, in the same order as the rows in
+        ``link_node_indices_dict``.
+    :rtype: dict[str, np.ndarray]
+    """
+    ret = {}
+    for link, link_node_indices in link_node_indices_dict.items():
+        hidden_cond_1 = fully_hidden_nodes[link_node_indices].any(axis=1)
+        hidden_cond_2 = partially_hidden_nodes[link_node_indices].all(axis=1)
+        ret[link] = ~(hidden_cond_1 | hidden_cond_2)
+    return ret
+
+
+def get_rendered_elements_dict(elements_dict, link_positions_dict,
+                               rendered_links_mask_dict, vals_per_element=1):
+    """Get main fig elements of links that should be rendered in viz.
+
+    :param elements_dict: Dict mapping links to dicts with lists of
+        x vals, y vals and other vals of elements.
+    :type elements_dict: dict
+    :param link_positions_dict: ``get_element_link_positions_dict`` ret
+        val for ``elements_dict``.
+    :type link_positions_dict: dict[str, np.ndarray]
+    :param rendered_links_mask_dict: ``get_rendered_links_mask_dict``
+        ret val.
+    :type rendered_links_mask_dict: dict[str, np.ndarray]
+    :param vals_per_element: Number of vals of each element in lists
+    :type vals_per_element: int
+    :return: ``elements_dict`` without elements of links that should
+        not be rendered. Lists of links where every element is kept are
+        not copied.
+    :rtype: dict
+    """
+    ret = {}
+    for link, element_dict in elements_dict.items():
+        rendered_links_mask = rendered_links_mask_dict[link]
+        if rendered_links_mask.all():
+            ret[link] = element_dict
+            continue
+        kept = rendered_links_mask[link_positions_dict[link]]
+        kept = np.repeat(kept, vals_per_element)
+        ret[link] = {k: list(compress(v, kept))
+                     for k, v in element_dict.items()}
+    return ret
+
+
+def get_main_fig_viewport(xaxis_range, yaxis_range, margin=0.5):
+    """Get the region of main fig elements sent for a visible range.
+
+    The region is the visible range, extended by a margin on every
+    side, so users can pan a little before elements must be refetched.
+    The ``updateMainVizFigs`` clientside callback requests elements for
+    a new viewport once that happens.
+
+    :param xaxis_range: Visible x-axis range
+    :type xaxis_range: list[float]
+    :param yaxis_range: Visible y-axis range
+    :type yaxis_range: list[float]
+    :param margin: Margin on each side, as a fraction of the visible
+        range.
+    :type margin: float
+    :return: x-axis and y-axis ranges of viewport
+    :rtype: list[list[float]]
+    """
+    x_margin = (xaxis_range[1] - xaxis_range[0]) * margin
+    y_margin = (yaxis_range[1] - yaxis_range[0]) * margin
+    return [[xaxis_range[0] - x_margin, xaxis_range[1] + x_margin],
+            [yaxis_range[0] - y_margin, yaxis_range[1] + y_margin]]
+
+
+def get_element_bboxes(element_dict_key, element_dict):
+    """Get bounding boxes of main fig elements of a single link.
+
+    For curves, the bounding boxes are of their control points.
+
+    :param element_dict_key: ``app_data`` key of dict with elements
+    :type element_dict_key: str
+    :param element_dict: Dict with x and y vals of elements
+    :type element_dict: dict
+    :return: Min x, max x, min y and max y vals of each element
+    :rtype: tuple[np.ndarray]
+    """
+    if not element_dict["x"]:
+        return tuple(np.array([]) for _ in range(4))
+    if element_dict_key == "main_fig_links_dict":
+        # Links are separated by ``None``
+        elements_x = \
+            np.array(element_dict["x"], dtype=float).reshape(-1, 3)[:, :2]
+        elements_y = \
+            np.array(element_dict["y"], dtype=float).reshape(-1, 3)[:, :2]
+    else:
+        # Elements are single points, or lists of points
+        num_of_elements = len(element_dict["x"])
+        elements_x = np.array(element_dict["x"], dtype=float)
+        elements_x = elements_x.reshape(num_of_elements, -1)
+        elements_y = np.array(element_dict["y"], dtype=float)
+        elements_y = elements_y.reshape(num_of_elements, -1)
+    return (elements_x.min(axis=1), elements_x.max(axis=1),
+            elements_y.min(axis=1), elements_y.max(axis=1))
+
+
+def get_main_fig_spatial_index_dict(app_data):
+    """Get spatial indices over the elements of main fig.
+
+    There is one index over nodes, and one index for each link over
+    links, arcs, arrowheads and weight labels.
+
+    :param app_data: ``get_app_data`` ret val
+    :type app_data: dict
+    :return: Dict mapping ``app_data`` keys of nodes and dicts of
+        elements to spatial indices. Indices of dicts of elements are
+        further mapped by link.
+    :rtype: dict
+    """
+    nodes_x = np.array(app_data["main_fig_nodes_x"], dtype=float)
+    nodes_y = np.array(app_data["main_fig_nodes_y"], dtype=float)
+    ret = {"main_fig_nodes": GridIndex(nodes_x, nodes_x, nodes_y, nodes_y)}
+    element_dict_keys = ["main_fig_links_dict",
+                         "main_fig_arcs_dict",
+                         "main_fig_link_arrowheads_dict",
+                         "main_fig_arc_arrowheads_dict",
+                         "main_fig_link_labels_dict",
+                         "main_fig_arc_labels_dict"]
+    for element_dict_key in element_dict_keys:
+        ret[element_dict_key] = {}
+        for link, element_dict in app_data[element_dict_key].items():
+            ret[element_dict_key][link] = \
+                GridIndex(*get_element_bboxes(element_dict_key, element_dict))
+    return ret
+
+
+def get_viewport_app_data(app_data, viewport):
+    """Get ``app_data`` with only the main fig elements in a viewport.
+
+    Nodes, links, arcs, arrowheads and weight labels outside the
+    viewport are removed. Everything else is unchanged.
+
+    Elements are found using ``main_fig_spatial_index_dict`` in
+    ``app_data``, if it was added by ``get_main_fig_spatial_index_dict``.
+    Otherwise, spatial indices are built here.
+
+    :param app_data: ``get_app_data`` ret val
+    :type app_data: dict
+    :param viewport: ``get_main_fig_viewport`` ret val
+    :type viewport: list[list[float]]
+    :return: ``app_data`` with only elements in viewport
+    :rtype: dict
     """
-    hidden_cond_1 = \
-        {sample, other_sample}.intersection(fully_hidden_samples)
-    hidden_cond_2 = \
-        {sample, other_sample}.issubset(partially_hidden_samples)
-    return not (hidden_cond_1 or hidden_cond_2)
+    ret = dict(app_data)
+    if "main_fig_spatial_index_dict" in app_data:
+        spatial_index_dict = app_data["main_fig_spatial_index_dict"]
+    else:
+        spatial_index_dict = get_main_fig_spatial_index_dict(app_data)
+
+    node_indices = \
+        spatial_index_dict["main_fig_nodes"].query_range(*viewport).tolist()
+    node_keys = ["main_fig_nodes_x",
+                 "main_fig_nodes_y",
+                 "main_fig_nodes_index",
+                 "main_fig_nodes_marker_symbol",
+                 "main_fig_nodes_marker_color",
+                 "main_fig_nodes_marker_opacity",
+                 "main_fig_nodes_text",
+                 "main_fig_nodes_textfont_color",
+                 "main_fig_nodes_hovertext"]
+    for key in node_keys:
+        # Some vals are shared by all nodes
+        if isinstance(app_data[key], list):
+            ret[key] = [app_data[key][i] for i in node_indices]
+
+    ret["main_fig_links_dict"] = {}
+    for link, links_dict in app_data["main_fig_links_dict"].items():
+        link_indices = \
+            spatial_index_dict["main_fig_links_dict"][link].query_range(
+                *viewport)
+        # Links are separated by ``None``, so every link takes 3 vals
+        point_indices = (3 * link_indices[:, None] + np.arange(3)).ravel()
+        ret["main_fig_links_dict"][link] = {
+            "x": [links_dict["x"][i] for i in point_indices],
+            "y": [links_dict["y"][i] for i in point_indices]
+        }
+
+    element_dict_keys = ["main_fig_arcs_dict",
+                         "main_fig_link_arrowheads_dict",
+                         "main_fig_arc_arrowheads_dict",
+                         "main_fig_link_labels_dict",
+                         "main_fig_arc_labels_dict"]
+    for element_dict_key in element_dict_keys:
+        ret[element_dict_key] = {}
+        for link, element_dict in app_data[element_dict_key].items():
+            element_indices = \
+                spatial_index_dict[element_dict_key][link].query_range(
+                    *viewport).tolist()
+            ret[element_dict_key][link] = \
+                {k: [v[i] for i in element_indices]
+                 for k, v in element_dict.items()}
+
+    return ret
 
 
 def get_unsorted_track_list(sample_data_dict, primary_y_axis,
@@ -654,7 +1229,9 @@ def get_node_color_attr_dict(node_color_attr_list):
 
 def get_sample_links_dict(sample_data_dict, links_config, primary_y,
                           links_across_primary_y, max_day_range,
-                          matrix_file_df, filtered_link_types):
+                          matrix_file_df, filtered_link_types,
+                          prev_sample_links_dict=None,
+                          num_of_prev_samples=0):
     """Get a dict of all links to viz in main graph.
 
     The keys in the dict are different link labels. The values are a
@@ -667,6 +1244,11 @@ def get_sample_links_dict(sample_data_dict, links_config, primary_y,
     We filter out certain links using ``weight_filters`` and
     ``attr_val_filters``.
 
+    If ``prev_sample_links_dict`` is provided, only pairs with samples
+    after the first ``num_of_prev_samples`` are checked for links. So
+    appending samples takes time proportional to the number of new
+    samples times all samples, instead of all samples squared.
+
     :param sample_data_dict: ``get_sample_data_dict`` ret val
     :type sample_data_dict: dict
     :param links_config: dict of criteria for different user-specified
@@ -683,9 +1265,18 @@ def get_sample_links_dict(sample_data_dict, links_config, primary_y,
     :type matrix_file_df: pd.DataFrame | None
     :param filtered_link_types: Link types filtered by user
     :type filtered_link_types: dict
+    :param prev_sample_links_dict: Ret val of this fn for the first
+        ``num_of_prev_samples`` samples, with the same other args.
+    :type prev_sample_links_dict: dict
+    :param num_of_prev_samples: Number of samples at the start of
+        ``sample_data_dict`` that ``prev_sample_links_dict`` has links
+        for.
+    :type num_of_prev_samples: int
     :return: Dict detailing links to viz in main graph
     :rtype: dict
     """
+    if prev_sample_links_dict is None:
+        num_of_prev_samples = 0
     sample_links_dict = {k: {} for k in links_config}
     sample_list = list(sample_data_dict.keys())
     regex_obj = compile("!.*?!|@.*?@|{{matrix}}")
@@ -722,7 +1313,7 @@ def get_sample_links_dict(sample_data_dict, links_config, primary_y,
                                                         any_eq_list,
                                                         attr_filters)
 
-            for j in range(i + 1, len(sample_list)):
+            for j in range(max(i + 1, num_of_prev_samples), len(sample_list)):
                 sample_j = sample_list[j]
                 sample_j_data = sample_data_dict[sample_j]
 
@@ -796,23 +1387,9 @@ def get_sample_links_dict(sample_data_dict, links_config, primary_y,
                                 raise RuntimeError(msg)
 
                         subbed_exp = regex_obj.sub(repl_fn, weight_exp)
-                        link_weight = eval_expr(subbed_exp)
-
-                        filtered_by_neq = False
-                        filtered_by_range = False
-                        if "not_equal" in weight_filters:
-                            neq = weight_filters["not_equal"]
-                            filtered_by_neq = link_weight in neq
-                        if "less_than" in weight_filters:
-                            le = weight_filters["less_than"]
-                            filtered_by_range = link_weight < le
-                        if not filtered_by_range:
-                            if "greater_than" in weight_filters:
-                                ge = weight_filters["greater_than"]
-                                filtered_by_range = link_weight > ge
-                        link_weight = {"weight": link_weight,
-                                       "filtered_by_neq": filtered_by_neq,
-                                       "filtered_by_range": filtered_by_range}
+                        link_weight = \
+                            get_link_weight_info(eval_expr(subbed_exp),
+                                                 weight_filters)
                     else:
                         link_weight = None
 
@@ -823,88 +1400,272 @@ def get_sample_links_dict(sample_data_dict, links_config, primary_y,
                         sample_links_dict[link][(sample_j, sample_i)] = \
                             link_weight
 
+    if prev_sample_links_dict is not None:
+        sample_index_dict = {k: i for i, k in enumerate(sample_list)}
+
+        def get_first_sample_index(link_item):
+            ((sample, other_sample), _) = link_item
+            return min(sample_index_dict[sample],
+                       sample_index_dict[other_sample])
+
+        # Links are in the same order as if all pairs were checked, as
+        # both are already sorted by the first sample of each pair.
+        for link in sample_links_dict:
+            sample_links_dict[link] = dict(merge(
+                prev_sample_links_dict[link].items(),
+                sample_links_dict[link].items(),
+                key=get_first_sample_index
+            ))
+
     return sample_links_dict
 
 
-def filter_links_by_weight(sample_links_dict):
-    """Remove links filtered by weight.
+def get_link_weight_info(weight, weight_filters):
+    """Get dict describing weight val, and whether it is filtered.
+
+    :param weight: Weight of link
+    :type weight: float
+    :param weight_filters: ``weight_filters`` of link in config file
+    :type weight_filters: dict
+    :return: Weight val, and whether it is filtered by ``not_equal``,
+        or by ``less_than`` and ``greater_than``.
+    :rtype: dict
+    """
+    filtered_by_neq = False
+    filtered_by_range = False
+    if "not_equal" in weight_filters:
+        neq = weight_filters["not_equal"]
+        filtered_by_neq = weight in neq
+    if "less_than" in weight_filters:
+        le = weight_filters["less_than"]
+        filtered_by_range = weight < le
+    if not filtered_by_range:
+        if "greater_than" in weight_filters:
+            ge = weight_filters["greater_than"]
+            filtered_by_range = weight > ge
+    return {"weight": weight,
+            "filtered_by_neq": filtered_by_neq,
+            "filtered_by_range": filtered_by_range}
+
+
+def get_link_weight_filters_dict(links_config, link_slider_vals_dict,
+                                 link_neq_dict):
+    """Get weight filters of links, adjusted by vals set through ui.
+
+    :param links_config: dict of criteria for different user-specified
+        links.
+    :type links_config: dict
+    :param link_slider_vals_dict: Dict mapping link types to slider
+        vals.
+    :type link_slider_vals_dict: dict[str[list[int]]]
+    :param link_neq_dict: Dict mapping link types to unselected filter
+        form vals.
+    :type link_neq_dict: dict[str[list[int]]]
+    :return: Dict mapping link types to copies of their
+        ``weight_filters`` in ``links_config``, with adjusted vals.
+    :rtype: dict[str, dict]
+    """
+    ret = {k: dict(v["weight_filters"]) for k, v in links_config.items()}
+    # Adjust filters if slider vals set by user through ui
+    for link in link_slider_vals_dict:
+        weight_filters = ret[link]
+        [less_than, greater_than] = link_slider_vals_dict[link]
+        weight_filters["less_than"] = less_than
+        weight_filters["greater_than"] = greater_than
+        # Edge case: slider [x, x] but x in neq vals
+        if less_than == greater_than and less_than in link_neq_dict[link]:
+            # Reset slider
+            del weight_filters["less_than"]
+            del weight_filters["greater_than"]
+    # Adjust filters if filter form unchecked vals set
+    for link in link_neq_dict:
+        weight_filters = ret[link]
+        not_equal = link_neq_dict[link]
+        weight_filters["not_equal"] = not_equal
+    return ret
+
+
+def get_link_weight_index_dict(sample_links_dict):
+    """Get links of each link type sorted by weight.
+
+    This lets ``filter_links_by_weight`` find links in a weight range,
+    or with a weight, by binary search.
 
     :param sample_links_dict: ``get_sample_links_dict`` ret val
     :type sample_links_dict: dict
+    :return: Dict mapping link types with weights to sorted
+        ``weights``, and the ``positions`` of their links in
+        ``sample_links_dict``.
+    :rtype: dict[str, dict[str, np.ndarray]]
     """
-    for link in sample_links_dict:
-        for (sample, other_sample) in list(sample_links_dict[link]):
-            weight_info = sample_links_dict[link][(sample, other_sample)]
-            if weight_info is None:
-                # Keep links without weight
-                continue
-            filtered = weight_info["filtered_by_neq"]
-            filtered = filtered or weight_info["filtered_by_range"]
-            if filtered:
-                sample_links_dict[link].pop((sample, other_sample))
-    return sample_links_dict
+    ret = {}
+    for link, link_dict in sample_links_dict.items():
+        # Link is filtered or has no weights
+        if not link_dict or next(iter(link_dict.values())) is None:
+            continue
+        weights = np.array([v["weight"] for v in link_dict.values()],
+                           dtype=float)
+        positions = np.argsort(weights, kind="stable")
+        ret[link] = {"weights": weights[positions], "positions": positions}
+    return ret
 
 
-def filter_link_loops(sample_links_dict, links_config, main_fig_nodes_x_dict,
-                      main_fig_nodes_y_dict):
-    """Remove links forming loops in a network.
+def filter_links_by_weight(sample_links_dict, link_weight_index_dict,
+                           link_weight_filters_dict):
+    """Get copy of links, without links filtered by weight.
 
-    Every group of connected nodes is converted into a minimum spanning
-    tree using Kruskal's algorithm. The weights assigned to each link
-    for this algorithm are equal to the weights calculated for each link, or
-    if a weight expression was not provided, graphic distance b/w nodes in
-    the plot.
+    Links kept by ``less_than`` and ``greater_than`` are a slice of
+    ``link_weight_index_dict``, and links removed by ``not_equal`` are
+    slices of that slice. So this takes time proportional to the
+    number of kept links, not all links.
+
+    :param sample_links_dict: ``get_sample_links_dict`` ret val
+    :type sample_links_dict: dict
+    :param link_weight_index_dict: ``get_link_weight_index_dict`` ret
+        val for ``sample_links_dict``.
+    :type link_weight_index_dict: dict[str, dict[str, np.ndarray]]
+    :param link_weight_filters_dict: ``get_link_weight_filters_dict``
+        ret val.
+    :type link_weight_filters_dict: dict[str, dict]
+    :return: ``sample_links_dict`` without links filtered by weight, in
+        the same order.
+    :rtype: dict
+    """
+    ret = {}
+    for link, link_dict in sample_links_dict.items():
+        if link not in link_weight_index_dict:
+            # Keep links without weight
+            ret[link] = dict(link_dict)
+            continue
+
+        weights = link_weight_index_dict[link]["weights"]
+        positions = link_weight_index_dict[link]["positions"]
+        weight_filters = link_weight_filters_dict[link]
+        start = 0
+        stop = len(weights)
+        if "less_than" in weight_filters:
+            start = np.searchsorted(weights,
+                                    weight_filters["less_than"],
+                                    side="left")
+        if "greater_than" in weight_filters:
+            stop = np.searchsorted(weights,
+                                   weight_filters["greater_than"],
+                                   side="right")
+        kept = np.ones(max(stop - start, 0), dtype=bool)
+        for weight in weight_filters.get("not_equal", []):
+            neq_start = np.searchsorted(weights, weight, side="left")
+            neq_stop = np.searchsorted(weights, weight, side="right")
+            kept[max(neq_start-start, 0):max(neq_stop-start, 0)] = False
+        kept_positions = np.sort(positions[start:stop][kept])
+
+        link_keys = list(link_dict)
+        ret[link] = {}
+        for position in kept_positions:
+            key = link_keys[position]
+            ret[link][key] = {"weight": link_dict[key]["weight"],
+                              "filtered_by_neq": False,
+                              "filtered_by_range": False}
+    return ret
+
+
+def get_link_loop_order_dict(sample_links_dict, links_config,
+                             link_weight_index_dict, main_fig_nodes_x_dict,
+                             main_fig_nodes_y_dict):
+    """Get links that may form loops, in the order Kruskal adds them.
+
+    Links are ordered by their weights, or if a weight expression was
+    not provided, graphic distance b/w nodes in the plot. Neither
+    changes with weight filters, so this is reused by
+    ``filter_link_loops`` after any weight filters are applied.
 
     :param sample_links_dict: ``get_sample_links_dict`` ret val
     :type sample_links_dict: dict
     :param links_config: dict of criteria for different user-specified
         links.
     :type links_config: dict
+    :param link_weight_index_dict: ``get_link_weight_index_dict`` ret
+        val for ``sample_links_dict``.
+    :type link_weight_index_dict: dict[str, dict[str, np.ndarray]]
     :param main_fig_nodes_x_dict: ``get_main_fig_nodes_x_dict`` ret val
     :type main_fig_nodes_x_dict: dict
     :param main_fig_nodes_y_dict: ``get_main_fig_nodes_y_dict`` ret val
     :type main_fig_nodes_y_dict: dict
+    :return: Dict mapping link types that minimize loops to their
+        links, sorted by weight.
+    :rtype: dict[str, list[tuple[str]]]
+    """
+    ret = {}
+    for link, link_dict in sample_links_dict.items():
+        if not bool(links_config[link]["minimize_loops"]):
+            continue
+        link_keys = list(link_dict)
+        if link in link_weight_index_dict:
+            positions = link_weight_index_dict[link]["positions"]
+            ret[link] = [link_keys[e] for e in positions]
+            continue
+
+        def get_graphic_distance(link_key):
+            (sample, other_sample) = link_key
+            x0 = main_fig_nodes_x_dict["staggered"][sample]
+            x1 = main_fig_nodes_x_dict["staggered"][other_sample]
+            y0 = main_fig_nodes_y_dict[sample]
+            y1 = main_fig_nodes_y_dict[other_sample]
+            return sqrt((x1-x0)**2 + (y1-y0)**2)
+
+        ret[link] = sorted(link_keys, key=get_graphic_distance)
+    return ret
+
+
+def filter_link_loops(sample_links_dict, link_loop_order_dict):
+    """Remove links forming loops in a network.
+
+    Every group of connected nodes is converted into a minimum spanning
+    tree using Kruskal's algorithm. The weights assigned to each link
+    for this algorithm are equal to the weights calculated for each link, or
+    if a weight expression was not provided, graphic distance b/w nodes in
+    the plot.
+
+    Links were already sorted by ``get_link_loop_order_dict``, so this
+    is a single pass over them with a disjoint-set forest.
+
+    :param sample_links_dict: ``get_sample_links_dict`` ret val, after
+        links were filtered by weight.
+    :type sample_links_dict: dict
+    :param link_loop_order_dict: ``get_link_loop_order_dict`` ret val
+        for ``sample_links_dict`` before links were filtered by weight.
+    :type link_loop_order_dict: dict[str, list[tuple[str]]]
     :return: ``sample_links_dict`` with certain links removed to
         prevent loops.
     :rtype: dict
     """
-    for link in sample_links_dict:
-        graph = nx.Graph()
-        if not bool(links_config[link]["minimize_loops"]):
-            continue
-        for (sample, other_sample) in sample_links_dict[link]:
-            weight_info = sample_links_dict[link][(sample, other_sample)]
-            if weight_info is None:
-                # nx will use the difference in graphic distance b/w nodes
-                # in the plot as weight, for mst purposes.
-                x0 = main_fig_nodes_x_dict["staggered"][sample]
-                x1 = main_fig_nodes_x_dict["staggered"][other_sample]
-                y0 = main_fig_nodes_y_dict[sample]
-                y1 = main_fig_nodes_y_dict[other_sample]
-                weight_info = {"weight": sqrt((x1-x0)**2 + (y1-y0)**2),
-                               "filtered_by_neq": False,
-                               "filtered_by_range": False}
-
-            # Need to track original order because graph is undirected
-            order = (sample, other_sample)
-
-            graph.add_edge(sample,
-                           other_sample,
-                           weight=weight_info["weight"],
-                           order=order)
-
-        disjoint_subgraphs = \
-            [graph.subgraph(c).copy() for c in nx.connected_components(graph)]
-        disjoint_mst_subgraphs = \
-            [nx.minimum_spanning_tree(g) for g in disjoint_subgraphs]
-        disjoint_mst_subgraph_edgeviews = \
-            [g.edges(data=True) for g in disjoint_mst_subgraphs]
-
-        new_link_dict = {}
-        for edgeview in disjoint_mst_subgraph_edgeviews:
-            for (sample, other_sample, data) in edgeview:
-                new_link_dict[data["order"]] = data["weight"]
-        sample_links_dict[link] = new_link_dict
+    for link in link_loop_order_dict:
+        link_dict = sample_links_dict[link]
+        # Maps samples to other samples in the same tree, until one that
+        # maps to itself.
+        parent_dict = {}
+
+        def get_root(sample):
+            parent_dict.setdefault(sample, sample)
+            while parent_dict[sample] != sample:
+                # Path halving keeps trees shallow
+                parent_dict[sample] = parent_dict[parent_dict[sample]]
+                sample = parent_dict[sample]
+            return sample
+
+        mst_links = set()
+        for (sample, other_sample) in link_loop_order_dict[link]:
+            if (sample, other_sample) not in link_dict:
+                continue
+            root = get_root(sample)
+            other_root = get_root(other_sample)
+            if root == other_root:
+                # Would form a loop
+                continue
+            parent_dict[root] = other_root
+            mst_links.add((sample, other_sample))
+
+        sample_links_dict[link] = \
+            {k: v for k, v in link_dict.items() if k in mst_links}
 
     return sample_links_dict
 
@@ -932,75 +1693,114 @@ def get_link_color_dict(sample_links_dict):
     return ret
 
 
-def get_weight_slider_info_dict(sample_links_dict):
-    """Get information for sliders used in link legend.
+def get_link_weight_summary_dict(sample_links_dict, link_weight_index_dict):
+    """Get distinct weights of each link type, and their counts.
 
-    Each visible link with weight exps gets a nested dict containing
-    `min`, `max`, and `marks` vals used by Dash.
+    Link legend sliders and filter forms are generated from this,
+    instead of from every link.
 
     :param sample_links_dict: ``get_sample_links_dict`` ret val
     :type sample_links_dict: dict
+    :param link_weight_index_dict: ``get_link_weight_index_dict`` ret
+        val for ``sample_links_dict``.
+    :type link_weight_index_dict: dict[str, dict[str, np.ndarray]]
+    :return: Dict mapping link types with weights to sorted distinct
+        ``weights``, the ``counts`` of links with them, and the ``min``
+        and ``max`` weights.
+    :rtype: dict[str, dict]
+    """
+    ret = {}
+    for link, link_weight_index in link_weight_index_dict.items():
+        link_vals = list(sample_links_dict[link].values())
+        positions = link_weight_index["positions"]
+        (_, first_indices, counts) = \
+            np.unique(link_weight_index["weights"],
+                      return_index=True,
+                      return_counts=True)
+        # Weights as calculated, instead of as floats
+        weights = \
+            [link_vals[positions[e]]["weight"] for e in first_indices]
+        ret[link] = {"weights": weights,
+                     "counts": counts.tolist(),
+                     "min": weights[0],
+                     "max": weights[-1]}
+    return ret
+
+
+def get_weight_slider_info_dict(link_weight_summary_dict,
+                                link_weight_filters_dict):
+    """Get information for sliders used in link legend.
+
+    Each visible link with weight exps gets a nested dict containing
+    `min`, `max`, and `marks` vals used by Dash. There are at most
+    ``MAX_WEIGHT_SLIDER_MARKS`` marks for weights, spread evenly over
+    the sorted distinct weights.
+
+    :param link_weight_summary_dict: ``get_link_weight_summary_dict``
+        ret val.
+    :type link_weight_summary_dict: dict[str, dict]
+    :param link_weight_filters_dict: ``get_link_weight_filters_dict``
+        ret val.
+    :type link_weight_filters_dict: dict[str, dict]
     :return: Dict with slider info for visible links with weight exps
     """
     ret = {}
-    for link in sample_links_dict:
-        link_dict = sample_links_dict[link]
-        # Link is filtered or has no weights
-        if not link_dict or next(iter(link_dict.values())) is None:
-            continue
+    for link, link_weight_summary in link_weight_summary_dict.items():
+        weight_filters = link_weight_filters_dict[link]
+        neq = weight_filters.get("not_equal", [])
+        # We do not include neq filtered vals in slider
+        weights = [e for e in link_weight_summary["weights"] if e not in neq]
+        # Dash sliders currently have a bug that prevents typing
+        # whole numbers as floats. See https://bit.ly/3wgwh9p.
+        weights = [int(e) if e % 1 == 0 else e for e in weights]
 
         ret[link] = {"marks": {}}
-        min_weight = None
-        max_weight = None
-        min_unfiltered_weight = None
-        max_unfiltered_weight = None
         marks = ret[link]["marks"]
 
-        for val in link_dict.values():
-            # We do not include neq filtered vals in slider
-            if val["filtered_by_neq"]:
-                continue
+        # All weights filtered
+        if not weights:
+            continue
 
-            weight = val["weight"]
-            filtered_by_range = val["filtered_by_range"]
-
-            # Dash sliders currently have a bug that prevents typing
-            # whole numbers as floats. See https://bit.ly/3wgwh9p.
-            if weight % 1 == 0:
-                weight = int(weight)
-
-            if not min_weight or weight < min_weight:
-                min_weight = weight
-            if not max_weight or weight > max_weight:
-                max_weight = weight
-            if not filtered_by_range:
-                if not min_unfiltered_weight or weight < min_unfiltered_weight:
-                    min_unfiltered_weight = weight
-                if not max_unfiltered_weight or weight > max_unfiltered_weight:
-                    max_unfiltered_weight = weight
+        # Weights not filtered by range are a slice of sorted weights
+        start = 0
+        stop = len(weights)
+        if "less_than" in weight_filters:
+            start = bisect_left(weights, weight_filters["less_than"])
+        if "greater_than" in weight_filters:
+            stop = bisect_right(weights, weight_filters["greater_than"])
+        if start < stop:
+            val = [weights[start], weights[stop-1]]
+        else:
+            val = [None, None]
+
+        if len(weights) > MAX_WEIGHT_SLIDER_MARKS:
+            mark_indices = \
+                np.linspace(0, len(weights)-1, MAX_WEIGHT_SLIDER_MARKS)
+            mark_weights = [weights[round(e)] for e in mark_indices]
+            # Slider vals must be marks
+            mark_weights += [e for e in val if e is not None]
+        else:
+            mark_weights = weights
+        for weight in mark_weights:
             marks[weight] = {
                 "label": str(weight),
                 "style": {"display": "none"}
             }
 
-        # All weights filtered
-        if not marks:
-            continue
-
-        min_mark = floor(min_weight)
+        min_mark = floor(weights[0])
         ret[link]["min"] = min_mark
         marks[min_mark] = {
             "label": "Weight=%s" % min_mark,
             "style": {"display": "none"}
         }
-        max_mark = ceil(max_weight)
+        max_mark = ceil(weights[-1])
         ret[link]["max"] = max_mark
         marks[max_mark] = {
             "label": str(max_mark),
             "style": {"display": "none"}
         }
 
-        ret[link]["value"] = [min_unfiltered_weight, max_unfiltered_weight]
+        ret[link]["value"] = val
 
         if len(marks) > 1:
             marks[min_mark]["style"].pop("display")
@@ -1010,45 +1810,37 @@ def get_weight_slider_info_dict(sample_links_dict):
     return ret
 
 
-def get_weight_filter_form_dict(sample_links_dict):
+def get_weight_filter_form_dict(link_weight_summary_dict,
+                                link_weight_filters_dict):
     """Get information for filter forms used in link legend.
 
     Each visible link with weight exps gets a nested dict containing
     the params expected by dbc checklist.
 
-    :param sample_links_dict: ``get_sample_links_dict`` ret val
-    :type sample_links_dict: dict
+    :param link_weight_summary_dict: ``get_link_weight_summary_dict``
+        ret val.
+    :type link_weight_summary_dict: dict[str, dict]
+    :param link_weight_filters_dict: ``get_link_weight_filters_dict``
+        ret val.
+    :type link_weight_filters_dict: dict[str, dict]
     :return: Dict with filter form info for visible links with weight
         exps.
     """
     ret = {}
-    for link in sample_links_dict:
-        link_dict = sample_links_dict[link]
-        # Link is filtered or has no weights
-        if not link_dict or next(iter(link_dict.values())) is None:
-            continue
-
-        ret[link] = {"options": [], "value": []}
-
-        seen_weights = set()
-        sorted_vals = sorted(link_dict.values(), key=lambda x: x["weight"])
-        for val in sorted_vals:
-            weight = val["weight"]
-            if weight in seen_weights:
-                continue
-            seen_weights.add(weight)
-
-            ret[link]["options"].append({"label": weight, "value": weight})
-
-            if not val["filtered_by_neq"]:
-                ret[link]["value"].append(weight)
+    for link, link_weight_summary in link_weight_summary_dict.items():
+        neq = link_weight_filters_dict[link].get("not_equal", [])
+        weights = link_weight_summary["weights"]
+        ret[link] = {
+            "options": [{"label": e, "value": e} for e in weights],
+            "value": [e for e in weights if e not in neq]
+        }
     return ret
 
 
 def get_main_fig_links_dict(sample_links_dict, main_fig_nodes_x_dict,
-                            main_fig_nodes_y_dict, partially_hidden_samples,
-                            fully_hidden_samples, main_fig_height,
-                            main_fig_width, xaxis_range, yaxis_range):
+                            main_fig_nodes_y_dict, rendered_links_mask_dict,
+                            main_fig_height, main_fig_width, xaxis_range,
+                            yaxis_range):
     """Get dict with info used by Plotly to viz links in main graph.
 
     These are straight links, so this does not include links b/w nodes
@@ -1060,10 +1852,9 @@ def get_main_fig_links_dict(sample_links_dict, main_fig_nodes_x_dict,
     :type main_fig_nodes_x_dict: dict
     :param main_fig_nodes_y_dict: ``get_main_fig_nodes_y_dict`` ret val
     :type main_fig_nodes_y_dict: dict
-    :param partially_hidden_samples: Semi-transparent samples
-    :type partially_hidden_samples: set[str]
-    :param fully_hidden_samples: Fully-transparent samples
-    :type fully_hidden_samples: set[str]
+    :param rendered_links_mask_dict: ``get_rendered_links_mask_dict``
+        ret val.
+    :type rendered_links_mask_dict: dict
     :param main_fig_height: Height for main fig
     :type main_fig_height: int
     :param main_fig_width: Width for main fig
@@ -1094,11 +1885,8 @@ def get_main_fig_links_dict(sample_links_dict, main_fig_nodes_x_dict,
         link_parallel_translation = link_parallel_translation_dict[link]
         ret[link] = {"x": [], "y": []}
 
-        for (sample, other_sample) in sample_links_dict[link]:
-            render_link = is_link_rendered(sample,
-                                           other_sample,
-                                           partially_hidden_samples,
-                                           fully_hidden_samples)
+        zip_obj = zip(sample_links_dict[link], rendered_links_mask_dict[link])
+        for ((sample, other_sample), render_link) in zip_obj:
             if not render_link:
                 continue
 
@@ -1135,8 +1923,7 @@ def get_main_fig_links_dict(sample_links_dict, main_fig_nodes_x_dict,
 
 
 def get_main_fig_arcs_dict(sample_links_dict, main_fig_nodes_x_dict,
-                           main_fig_nodes_y_dict, partially_hidden_samples,
-                           fully_hidden_samples):
+                           main_fig_nodes_y_dict, rendered_links_mask_dict):
     """Get dict with info used by Plotly to viz arcs in main graph.
 
     These are arcs, so this does not include straight links b/w nodes
@@ -1148,10 +1935,9 @@ def get_main_fig_arcs_dict(sample_links_dict, main_fig_nodes_x_dict,
     :type main_fig_nodes_x_dict: dict
     :param main_fig_nodes_y_dict: ``get_main_fig_nodes_y_dict`` ret val
     :type main_fig_nodes_y_dict: dict
-    :param partially_hidden_samples: Semi-transparent samples
-    :type partially_hidden_samples: set[str]
-    :param fully_hidden_samples: Fully-transparent samples
-    :type fully_hidden_samples: set[str]
+    :param rendered_links_mask_dict: ``get_rendered_links_mask_dict``
+        ret val.
+    :type rendered_links_mask_dict: dict
     :return: Dict with info used by Plotly to viz arcs in main graph
     :rtype: dict
     """
@@ -1166,11 +1952,8 @@ def get_main_fig_arcs_dict(sample_links_dict, main_fig_nodes_x_dict,
         arc_degree_translation = arc_degree_translation_dict[link]
         ret[link] = {"x": [], "y": []}
 
-        for (sample, other_sample) in sample_links_dict[link]:
-            render_link = is_link_rendered(sample,
-                                           other_sample,
-                                           partially_hidden_samples,
-                                           fully_hidden_samples)
+        zip_obj = zip(sample_links_dict[link], rendered_links_mask_dict[link])
+        for ((sample, other_sample), render_link) in zip_obj:
             if not render_link:
                 continue
 
@@ -1196,6 +1979,44 @@ def get_main_fig_arcs_dict(sample_links_dict, main_fig_nodes_x_dict,
     return ret
 
 
+def get_main_fig_arc_lines_dict(main_fig_arcs_dict, num_of_points=12):
+    """Get dict with info used by Plotly to viz arcs as line traces.
+
+    Each arc is sampled at a fixed number of points along its quadratic
+    bezier curve, so all arcs of a link type can be drawn by a single
+    line trace, like straight links.
+
+    :param main_fig_arcs_dict: ``get_main_fig_arcs_dict`` ret val
+    :type main_fig_arcs_dict: dict
+    :param num_of_points: Number of points sampled along each arc
+    :type num_of_points: int
+    :return: Dict with info used by Plotly to viz arcs as line traces
+        in main graph.
+    :rtype: dict
+    """
+    ret = {}
+
+    t = np.linspace(0, 1, num_of_points)
+
+    for link in main_fig_arcs_dict:
+        ret[link] = {"x": [], "y": []}
+
+        if not main_fig_arcs_dict[link]["x"]:
+            continue
+
+        for axis in ["x", "y"]:
+            arc_coords = \
+                np.array(main_fig_arcs_dict[link][axis], dtype=float)
+            line_coords = get_quadratic_bezier_coords(arc_coords, t)
+            # Separate arcs with a nan col, which becomes ``None``
+            nan_col = np.full((len(line_coords), 1), np.nan)
+            line_coords = np.hstack([line_coords, nan_col]).ravel()
+            ret[link][axis] = \
+                [None if np.isnan(e) else e for e in line_coords.tolist()]
+
+    return ret
+
+
 def get_main_fig_link_arrowheads_dict(main_fig_links_dict, links_config,
                                       main_fig_height, yaxis_range):
     """Get dict with info used by Plotly to add arrowheads to links.
@@ -1272,50 +2093,81 @@ def get_main_fig_arc_arrowheads_dict(main_fig_arcs_dict, links_config,
 
     y_pixel_per_unit = main_fig_height / (yaxis_range[1] - yaxis_range[0])
 
+    # Fractions along arcs to try as arrowhead points, from furthest to
+    # closest to the endpoint.
+    t1_candidates = 0.90 + 0.01 * np.arange(9)
+    t0_candidates = t1_candidates - 0.05
+
     for link in main_fig_arcs_dict:
         if not links_config[link]["show_arrowheads"]:
             continue
 
         ret[link] = {"x": [], "y": []}
 
-        link_x = main_fig_arcs_dict[link]["x"]
-        link_y = main_fig_arcs_dict[link]["y"]
-
-        for zip_el in zip(link_x, link_y):
-            [x0, cx, x1] = zip_el[0]
-            [y0, cy, y1] = zip_el[1]
+        if not main_fig_arcs_dict[link]["x"]:
+            continue
 
-            # https://stackoverflow.com/a/5634528/11472358
-            # We want to find points along each arc that are a certain
-            # number of pixels away from the endpoint, but calculating
-            # the length of a quadratic bezier curve is not a trivial
-            # task. So we iteratively try some points a certain
-            # fraction towards the end, as calculated by formula in
-            # https://stackoverflow.com/a/5634528/11472358, until we
-            # find a point less than 20 pixels away.
-            t0 = 0.85
-            t1 = 0.90
-            euclidian_px_to_end = 21
-            while euclidian_px_to_end > 20 and t1 <= 0.99:
-                bx0 = ((1-t0)**2 * x0) + (2*(1-t0)*t0*cx) + (t0**2 * x1)
-                bx1 = ((1-t1)**2 * x0) + (2*(1-t1)*t1*cx) + (t1**2 * x1)
-                by0 = ((1-t0)**2 * y0) + (2*(1-t0)*t0*cy) + (t0**2 * y1)
-                by1 = ((1-t1)**2 * y0) + (2*(1-t1)*t1*cy) + (t1**2 * y1)
-                t0 += 0.01
-                t1 += 0.01
-                euclidian_px_to_end = \
-                    sqrt((x1-bx1)**2 + (y1-by1)**2) * y_pixel_per_unit
-
-            ret[link]["x"] += [[bx0, bx1]]
-            ret[link]["y"] += [[by0, by1]]
+        # Columns are start, control and end points of each arc
+        link_x = np.array(main_fig_arcs_dict[link]["x"], dtype=float)
+        link_y = np.array(main_fig_arcs_dict[link]["y"], dtype=float)
+
+        # We want to find points along each arc that are a certain
+        # number of pixels away from the endpoint, but calculating the
+        # length of a quadratic bezier curve is not a trivial task. So
+        # we try some points a certain fraction towards the end, and
+        # keep the first one less than 20 pixels away. Every arc and
+        # every candidate fraction is evaluated at once.
+        bx1 = get_quadratic_bezier_coords(link_x, t1_candidates)
+        by1 = get_quadratic_bezier_coords(link_y, t1_candidates)
+        euclidian_px_to_end = np.hypot(link_x[:, 2:] - bx1,
+                                       link_y[:, 2:] - by1)
+        euclidian_px_to_end *= y_pixel_per_unit
+
+        # Fall back on the last candidate if no point is close enough
+        close_enough = euclidian_px_to_end <= 20
+        candidate_indices = np.where(close_enough.any(axis=1),
+                                     close_enough.argmax(axis=1),
+                                     len(t1_candidates) - 1)
+        t0 = t0_candidates[candidate_indices][:, np.newaxis]
+        arc_indices = np.arange(len(link_x))
+
+        arrowheads_x = np.column_stack([
+            get_quadratic_bezier_coords(link_x, t0)[:, 0],
+            bx1[arc_indices, candidate_indices]
+        ])
+        arrowheads_y = np.column_stack([
+            get_quadratic_bezier_coords(link_y, t0)[:, 0],
+            by1[arc_indices, candidate_indices]
+        ])
+        ret[link]["x"] = arrowheads_x.tolist()
+        ret[link]["y"] = arrowheads_y.tolist()
 
     return ret
 
 
+def get_quadratic_bezier_coords(arc_coords, t):
+    """Get coords of points along quadratic bezier curves.
+
+    See https://stackoverflow.com/a/5634528/11472358.
+
+    :param arc_coords: Array with one row per curve, and the start,
+        control and end coords of each curve as columns.
+    :type arc_coords: np.ndarray
+    :param t: Fractions along the curves to get points at; either a 1D
+        array applied to every curve, or an array with one row per
+        curve.
+    :type t: np.ndarray
+    :return: Array with one row per curve, and one col per val in
+        ``t``.
+    :rtype: np.ndarray
+    """
+    [c0, c1, c2] = [arc_coords[:, [i]] for i in range(3)]
+    return ((1-t)**2 * c0) + (2*(1-t)*t*c1) + (t**2 * c2)
+
+
 def get_main_fig_link_labels_dict(sample_links_dict, links_config,
                                   main_fig_links_dict, main_fig_nodes_x_dict,
-                                  partially_hidden_samples,
-                                  fully_hidden_samples, main_fig_height,
+                                  rendered_links_mask_dict, main_fig_height,
                                   main_fig_width, xaxis_range, yaxis_range):
     """Get dict with info used by Plotly to viz link labels.
 
@@ -1329,10 +2181,9 @@ def get_main_fig_link_labels_dict(sample_links_dict, links_config,
     :type main_fig_links_dict: dict
     :param main_fig_nodes_x_dict: ``get_main_fig_nodes_x_dict`` ret val
     :type main_fig_nodes_x_dict: dict
-    :param partially_hidden_samples: Semi-transparent samples
-    :type partially_hidden_samples: set[str]
-    :param fully_hidden_samples: Fully-transparent samples
-    :type fully_hidden_samples: set[str]
+    :param rendered_links_mask_dict: ``get_rendered_links_mask_dict``
+        ret val.
+    :type rendered_links_mask_dict: dict
     :param main_fig_height: Height for main fig
     :type main_fig_height: int
     :param main_fig_width: Width for main fig
@@ -1358,11 +2209,8 @@ def get_main_fig_link_labels_dict(sample_links_dict, links_config,
         # Keeping a local variable instead of using ``enumerate``,
         # because we do not want to increment i in certain cases.
         i = 0
-        for (sample, other_sample) in sample_links_dict[link]:
-            render_link = is_link_rendered(sample,
-                                           other_sample,
-                                           partially_hidden_samples,
-                                           fully_hidden_samples)
+        zip_obj = zip(sample_links_dict[link], rendered_links_mask_dict[link])
+        for ((sample, other_sample), render_link) in zip_obj:
             if not render_link:
                 continue
 
@@ -1406,7 +2254,7 @@ def get_main_fig_link_labels_dict(sample_links_dict, links_config,
 
 def get_main_fig_arc_labels_dict(sample_links_dict, links_config,
                                  main_fig_arcs_dict, main_fig_nodes_x_dict,
-                                 partially_hidden_samples, fully_hidden_samples):
+                                 rendered_links_mask_dict):
     """Get dict with info used by Plotly to viz arc labels.
 
     :param sample_links_dict: ``get_sample_links_dict`` ret val
@@ -1419,10 +2267,9 @@ def get_main_fig_arc_labels_dict(sample_links_dict, links_config,
     :type main_fig_arcs_dict: dict
     :param main_fig_nodes_x_dict: ``get_main_fig_nodes_x_dict`` ret val
     :type main_fig_nodes_x_dict: dict
-    :param partially_hidden_samples: Semi-transparent samples
-    :type partially_hidden_samples: set[str]
-    :param fully_hidden_samples: Fully-transparent samples
-    :type fully_hidden_samples: set[str]
+    :param rendered_links_mask_dict: ``get_rendered_links_mask_dict``
+        ret val.
+    :type rendered_links_mask_dict: dict
     :return: Dict with info used by Plotly to viz arc labels in main graph
     :rtype: dict
     """
@@ -1436,11 +2283,8 @@ def get_main_fig_arc_labels_dict(sample_links_dict, links_config,
         # Keeping a local variable instead of using ``enumerate``,
         # because we do not want to increment i in certain cases.
         i = 0
-        for (sample, other_sample) in sample_links_dict[link]:
-            render_link = is_link_rendered(sample,
-                                           other_sample,
-                                           partially_hidden_samples,
-                                           fully_hidden_samples)
+        zip_obj = zip(sample_links_dict[link], rendered_links_mask_dict[link])
+        for ((sample, other_sample), render_link) in zip_obj:
             if not render_link:
                 continue
 
@@ -1640,6 +2484,147 @@ def get_zoomed_out_main_fig_yaxis_tickvals(track_y_vals_dict):
     return ret
 
 
+def get_zoomed_out_main_fig_lod_dict(link_node_indices_dict, node_index_dict,
+                                     rendered_links_mask_dict, track_list,
+                                     track_y_vals_dict, main_fig_nodes_x_dict,
+                                     main_fig_nodes_x, main_fig_nodes_y,
+                                     main_fig_nodes_marker_color,
+                                     main_fig_nodes_marker_opacity,
+                                     max_x_bins=200):
+    """Get dict with info used by Plotly to viz aggregated overview.
+
+    This is a level-of-detail alternative to drawing every node and
+    link in the zoomed out main fig. Nodes are aggregated into cells,
+    by primary track and by bins of consecutive dates. Links b/w nodes
+    in different cells are bundled into a single edge b/w those cells,
+    weighted by the number of links bundled.
+
+    Fully hidden nodes are not aggregated. Cells only containing
+    partially hidden nodes are semi-transparent.
+
+    Clicking a cell scrolls to its representative node in the main
+    fig. This is the node nearest to where the cell is drawn, out of
+    the cell nodes with the highest opacity.
+
+    :param link_node_indices_dict: ``get_link_node_indices_dict`` ret
+        val.
+    :type link_node_indices_dict: dict[str, np.ndarray]
+    :param node_index_dict: Dict mapping samples to node indices
+    :type node_index_dict: dict[str, int]
+    :param rendered_links_mask_dict: ``get_rendered_links_mask_dict``
+        ret val.
+    :type rendered_links_mask_dict: dict[str, np.ndarray]
+    :param track_list: List of sample tracks wrt all nodes
+    :type track_list: list[tuple[tuple[str]]]
+    :param track_y_vals_dict: ``get_track_y_vals_dict`` ret val
+    :type track_y_vals_dict: dict
+    :param main_fig_nodes_x_dict: ``get_main_fig_nodes_x_dict`` ret val
+    :type main_fig_nodes_x_dict: dict
+    :param main_fig_nodes_x: x val of each node in main fig
+    :type main_fig_nodes_x: list[float]
+    :param main_fig_nodes_y: y val of each node in main fig
+    :type main_fig_nodes_y: list[float]
+    :param main_fig_nodes_marker_color: Color of each node, or a single
+        color shared by all nodes.
+    :type main_fig_nodes_marker_color: list[str]|str
+    :param main_fig_nodes_marker_opacity: Opacity of each node
+    :type main_fig_nodes_marker_opacity: list[float]
+    :param max_x_bins: Max number of date bins in each primary track
+    :type max_x_bins: int
+    :return: Dict with info on aggregated cells, and a nested dict
+        mapping links to info on bundled edges.
+    :rtype: dict
+    """
+    primary_y_vals_dict = dict(zip(
+        dict.fromkeys([k[0] for k in track_y_vals_dict]),
+        get_zoomed_out_main_fig_yaxis_tickvals(track_y_vals_dict)
+    ))
+
+    unstaggered_x = np.array(
+        [main_fig_nodes_x_dict["unstaggered"][k] for k in node_index_dict]
+    )
+    num_of_dates = int(unstaggered_x.max()) if len(unstaggered_x) else 0
+    bin_width = max(1, -(-num_of_dates // max_x_bins))
+    x_bins = ((unstaggered_x - 1) // bin_width).astype(int)
+
+    if isinstance(main_fig_nodes_marker_color, str):
+        main_fig_nodes_marker_color = \
+            [main_fig_nodes_marker_color] * len(node_index_dict)
+
+    cell_nodes_dict = {}
+    for i, opacity in enumerate(main_fig_nodes_marker_opacity):
+        if not opacity:
+            continue
+        cell = (track_list[i][0], x_bins[i])
+        cell_nodes_dict.setdefault(cell, []).append(i)
+
+    ret = {
+        "x": [],
+        "y": [],
+        "count": [],
+        "marker_color": [],
+        "marker_opacity": [],
+        "representative_nodes": [],
+        "links_dict": {}
+    }
+    # Cell index of each node, or -1 for nodes not in any cell
+    node_cell_indices = np.full(len(node_index_dict), -1, dtype=int)
+    # Nodes with the highest opacity in their cell
+    candidate_nodes = []
+    for cell_index, (cell, cell_nodes) in enumerate(cell_nodes_dict.items()):
+        node_cell_indices[cell_nodes] = cell_index
+        cell_opacities = \
+            [main_fig_nodes_marker_opacity[i] for i in cell_nodes]
+        max_opacity = max(cell_opacities)
+        color_counter = \
+            Counter([main_fig_nodes_marker_color[i] for i in cell_nodes])
+        ret["x"].append(float(unstaggered_x[cell_nodes].mean()))
+        ret["y"].append(primary_y_vals_dict[cell[0]])
+        ret["count"].append(len(cell_nodes))
+        ret["marker_color"].append(color_counter.most_common(1)[0][0])
+        ret["marker_opacity"].append(max_opacity)
+        candidate_nodes += \
+            [i for i, e in zip(cell_nodes, cell_opacities) if e == max_opacity]
+
+    candidate_nodes = np.array(candidate_nodes, dtype=int)
+    candidate_x = np.array(main_fig_nodes_x, dtype=float)[candidate_nodes]
+    candidate_y = np.array(main_fig_nodes_y, dtype=float)[candidate_nodes]
+    candidate_index = \
+        GridIndex(candidate_x, candidate_x, candidate_y, candidate_y)
+    candidate_cell_indices = node_cell_indices[candidate_nodes]
+    for cell_index, (x, y) in enumerate(zip(ret["x"], ret["y"])):
+        node = candidate_nodes[candidate_index.query_nearest(x, y)]
+        # Nearest candidate may be across the border of another cell
+        if node_cell_indices[node] != cell_index:
+            node = candidate_nodes[
+                np.argmax(candidate_cell_indices == cell_index)
+            ]
+        ret["representative_nodes"].append(int(node))
+
+    for link, link_node_indices in link_node_indices_dict.items():
+        link_node_indices = \
+            link_node_indices[rendered_links_mask_dict[link]]
+        link_cell_indices = node_cell_indices[link_node_indices]
+        # Links within a single cell are not drawn
+        link_cell_indices = link_cell_indices[
+            (link_cell_indices >= 0).all(axis=1)
+            & (link_cell_indices[:, 0] != link_cell_indices[:, 1])
+        ]
+        link_cell_indices.sort(axis=1)
+        edges, counts = \
+            np.unique(link_cell_indices, axis=0, return_counts=True)
+
+        ret["links_dict"][link] = {"x": [], "y": [], "count": []}
+        for (cell_index, other_cell_index), count in zip(edges, counts):
+            ret["links_dict"][link]["x"] += \
+                [ret["x"][cell_index], ret["x"][other_cell_index], None]
+            ret["links_dict"][link]["y"] += \
+                [ret["y"][cell_index], ret["y"][other_cell_index], None]
+            ret["links_dict"][link]["count"].append(int(count))
+
+    return ret
+
+
 def get_main_fig_nodes_y_dict(sample_data_dict, sample_links_dict, date_attr,
                               track_list, track_date_node_count_dict,
                               max_node_count_at_track_dict, track_y_vals_dict):
@@ -0,0 +1,284 @@
+"""Fns for storing uploaded files server-side, under small ids.
+
+Uploaded files are only sent to the server once, when the user clicks
+the viz btn. Callbacks after that only send the id of the stored
+files. Files are stored on disk, so every gunicorn worker can read
+them.
+
+New samples can also be appended to stored files. That stores a new
+dataset, which remembers the dataset it was appended to, so links b/w
+earlier samples can be reused.
+"""
+
+from base64 import b64decode, b64encode
+import csv
+from io import StringIO
+from json import loads
+from os import replace
+from pathlib import Path
+from re import fullmatch
+from shutil import rmtree
+from tempfile import gettempdir
+
+from cache import get_cache_key
+
+# Where uploaded files are stored
+DATASET_STORE_DIR = Path(gettempdir()) / "amr_tv_datasets"
+
+# Least recently added datasets above this count are removed
+MAX_STORED_DATASETS = 32
+
+# Names of the files of each dataset
+DATASET_FILE_NAMES = ["sample", "config", "matrix"]
+
+# Name of the file storing the id of the dataset that samples were
+# appended to.
+PARENT_DATASET_FILE_NAME = "parent"
+
+
+def add_dataset(sample_file_base64_str, config_file_base64_str,
+                matrix_file_base64_str=None, parent_dataset_id=None):
+    """Store uploaded files, if they are not already stored.
+
+    :param sample_file_base64_str: Base64 encoded sample file
+    :type sample_file_base64_str: str
+    :param config_file_base64_str: Base64 encoded config file
+    :type config_file_base64_str: str
+    :param matrix_file_base64_str: Base64 encoded matrix file
+    :type matrix_file_base64_str: str
+    :param parent_dataset_id: Id of stored files that these files
+        append samples to.
+    :type parent_dataset_id: str
+    :return: Id of stored files
+    :rtype: str
+    """
+    file_strs = [sample_file_base64_str,
+                 config_file_base64_str,
+                 matrix_file_base64_str]
+    dataset_id = get_cache_key(*file_strs)
+    dataset_dir = DATASET_STORE_DIR / dataset_id
+    if dataset_dir.is_dir():
+        # Mark as recently added, so it is not removed soon
+        dataset_dir.touch()
+        return dataset_id
+
+    # Files are written to a temporary dir that is renamed once
+    # complete, so other workers never read partially written files.
+    tmp_dir = DATASET_STORE_DIR / ("%s.tmp" % dataset_id)
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    for file_name, file_str in zip(DATASET_FILE_NAMES, file_strs):
+        if file_str is not None:
+            (tmp_dir / file_name).write_text(file_str)
+    if parent_dataset_id is not None:
+        (tmp_dir / PARENT_DATASET_FILE_NAME).write_text(parent_dataset_id)
+    try:
+        replace(tmp_dir, dataset_dir)
+    except OSError:
+        # Another worker stored the same files first
+        rmtree(tmp_dir, ignore_errors=True)
+
+    remove_old_datasets()
+    return dataset_id
+
+
+def get_dataset(dataset_id):
+    """Get stored files.
+
+    :param dataset_id: ``add_dataset`` ret val
+    :type dataset_id: str
+    :return: Dict mapping ``DATASET_FILE_NAMES`` to base64 encoded
+        files, which are ``None`` if they were not uploaded. ``None``
+        if there are no files stored under ``dataset_id``.
+    :rtype: dict[str, str|None]|None
+    """
+    dataset_dir = get_dataset_dir(dataset_id)
+    if dataset_dir is None:
+        return None
+    ret = {}
+    for file_name in DATASET_FILE_NAMES:
+        file_path = dataset_dir / file_name
+        ret[file_name] = file_path.read_text() if file_path.is_file() else None
+    return ret
+
+
+def get_dataset_dir(dataset_id):
+    """Get dir of stored files.
+
+    :param dataset_id: ``add_dataset`` ret val
+    :type dataset_id: str
+    :return: Dir of files stored under ``dataset_id``, or ``None`` if
+        there are none.
+    :rtype: Path|None
+    """
+    # Ids come from the browser, so they are checked before being used
+    # in paths.
+    if not isinstance(dataset_id, str) or not fullmatch("[0-9a-f]+",
+                                                        dataset_id):
+        return None
+    dataset_dir = DATASET_STORE_DIR / dataset_id
+    if not dataset_dir.is_dir():
+        return None
+    return dataset_dir
+
+
+def get_parent_dataset_id(dataset_id):
+    """Get id of stored files that samples were appended to.
+
+    :param dataset_id: ``add_dataset`` ret val
+    :type dataset_id: str
+    :return: ``append_dataset`` arg that ``dataset_id`` was returned
+        for, or ``None`` if samples were not appended.
+    :rtype: str|None
+    """
+    dataset_dir = get_dataset_dir(dataset_id)
+    if dataset_dir is None:
+        return None
+    parent_file_path = dataset_dir / PARENT_DATASET_FILE_NAME
+    if not parent_file_path.is_file():
+        return None
+    return parent_file_path.read_text()
+
+
+def append_dataset(dataset_id, sample_file_base64_str,
+                   matrix_file_base64_str=None):
+    """Store files with new samples appended to stored files.
+
+    The new sample file must have the same header as the stored one,
+    and samples that are not stored yet. The new matrix file needs rows
+    for the new samples, but only the new samples.
+
+    :param dataset_id: ``add_dataset`` ret val to append samples to
+    :type dataset_id: str
+    :param sample_file_base64_str: Base64 encoded sample file with new
+        samples.
+    :type sample_file_base64_str: str
+    :param matrix_file_base64_str: Base64 encoded matrix file with new
+        samples.
+    :type matrix_file_base64_str: str
+    :return: Id of stored files with new samples, or ``None`` if there
+        are no files stored under ``dataset_id``.
+    :rtype: str|None
+    """
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        return None
+    config_file_dict = loads(b64decode(dataset["config"]).decode("utf-8"))
+    delimiter = config_file_dict["delimiter"]
+
+    sample_file_str = b64decode(dataset["sample"]).decode("utf-8")
+    new_sample_file_str = b64decode(sample_file_base64_str).decode("utf-8")
+    sample_file_str = append_sample_file_str(sample_file_str,
+                                             new_sample_file_str,
+                                             delimiter,
+                                             config_file_dict["sample_id"])
+
+    matrix_file_str = None
+    if dataset["matrix"]:
+        matrix_file_str = b64decode(dataset["matrix"]).decode("utf-8")
+    if matrix_file_base64_str:
+        new_matrix_file_str = \
+            b64decode(matrix_file_base64_str).decode("utf-8")
+        if matrix_file_str is None:
+            matrix_file_str = new_matrix_file_str
+        else:
+            matrix_file_str = append_matrix_file_str(matrix_file_str,
+                                                     new_matrix_file_str,
+                                                     delimiter)
+
+    if matrix_file_str is not None:
+        matrix_file_str = b64encode(matrix_file_str.encode("utf-8"))
+        matrix_file_str = matrix_file_str.decode("utf-8")
+    return add_dataset(b64encode(sample_file_str.encode("utf-8")).decode(),
+                       dataset["config"],
+                       matrix_file_base64_str=matrix_file_str,
+                       parent_dataset_id=dataset_id)
+
+
+def append_sample_file_str(sample_file_str, new_sample_file_str,
+                           delimiter, sample_id_attr):
+    """Append rows of a sample file to another.
+
+    Rows are appended as is, so stored samples keep the same order,
+    and are parsed the same way.
+
+    :param sample_file_str: Str corresponding to contents of stored
+        sample file.
+    :type sample_file_str: str
+    :param new_sample_file_str: Str corresponding to contents of sample
+        file with new samples.
+    :type new_sample_file_str: str
+    :param delimiter: Delimiter in sample files
+    :type delimiter: str
+    :param sample_id_attr: Sample file attr corresponding to sample ids
+    :type sample_id_attr: str
+    :return: Str corresponding to contents of sample file with new
+        samples.
+    :rtype: str
+    """
+    reader = csv.DictReader(StringIO(sample_file_str), delimiter=delimiter)
+    new_reader = csv.DictReader(StringIO(new_sample_file_str),
+                                delimiter=delimiter)
+    if new_reader.fieldnames != reader.fieldnames:
+        msg = "New sample file has a different header than stored one"
+        raise ValueError(msg)
+    sample_ids = {row[sample_id_attr] for row in reader}
+    new_sample_ids = {row[sample_id_attr] for row in new_reader}
+    if new_sample_ids & sample_ids:
+        msg = "New sample file has samples that are already stored"
+        raise ValueError(msg)
+
+    (_, _, new_rows_str) = new_sample_file_str.partition("\n")
+    if not sample_file_str.endswith("\n"):
+        sample_file_str += "\n"
+    return sample_file_str + new_rows_str
+
+
+def append_matrix_file_str(matrix_file_str, new_matrix_file_str, delimiter):
+    """Append rows and cols of a matrix file to another.
+
+    Vals are copied as is. Stored rows get vals for new cols from the
+    new rows, as matrices are symmetric.
+
+    :param matrix_file_str: Str corresponding to contents of stored
+        matrix file.
+    :type matrix_file_str: str
+    :param new_matrix_file_str: Str corresponding to contents of matrix
+        file with new samples.
+    :type new_matrix_file_str: str
+    :param delimiter: Delimiter in matrix files
+    :type delimiter: str
+    :return: Str corresponding to contents of matrix file with new
+        samples.
+    :rtype: str
+    """
+    [header, *rows] = \
+        csv.reader(StringIO(matrix_file_str), delimiter=delimiter)
+    [new_header, *new_rows] = \
+        csv.reader(StringIO(new_matrix_file_str), delimiter=delimiter)
+    rows_dict = {row[0]: dict(zip(header[1:], row[1:])) for row in rows}
+    new_rows_dict = \
+        {row[0]: dict(zip(new_header[1:], row[1:])) for row in new_rows}
+    rows_dict.update(new_rows_dict)
+
+    cols = list(dict.fromkeys(header[1:] + new_header[1:]))
+    output = StringIO()
+    writer = csv.writer(output, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(header[:1] + cols)
+    for row_name, row_dict in rows_dict.items():
+        vals = []
+        for col in cols:
+            if col in row_dict:
+                vals.append(row_dict[col])
+            else:
+                vals.append(rows_dict.get(col, {}).get(row_name, ""))
+        writer.writerow([row_name] + vals)
+    return output.getvalue()
+
+
+def remove_old_datasets():
+    """Remove datasets above ``MAX_STORED_DATASETS``, oldest first."""
+    dataset_dirs = [e for e in DATASET_STORE_DIR.iterdir()
+                    if e.is_dir() and not e.name.endswith(".tmp")]
+    dataset_dirs.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for dataset_dir in dataset_dirs[MAX_STORED_DATASETS:]:
+        rmtree(dataset_dir, ignore_errors=True)
@@ -0,0 +1,463 @@
+"""Fns for generating app data in background processes.
+
+Generating app data for large datasets can take longer than gunicorn
+lets a request run. So callbacks start a job in a background process
+instead, and the browser polls for its progress. Job progress and
+results are stored in shared caches, so any gunicorn worker can answer
+a poll, or use the results once the job is done.
+
+Each browser session only needs its latest job. Jobs no session needs
+anymore are abandoned at the next stage of ``get_app_data``.
+
+Only the slow part of app data, which links are generated and how
+nodes are laid out, is generated in jobs and stored in shared caches.
+It only depends on the dataset, filtered link types and whether node
+overlap is removed. Weight filters and node states set through the ui
+are applied to it in the worker that needs them, which is fast enough
+to do without a job.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from tempfile import gettempdir
+
+from cache import DiskCache, LRUCache, RedisCache, get_cache, get_cache_key
+from dataset_store import get_dataset, get_parent_dataset_id
+from data_parser import (APP_DATA_STAGES,
+                         get_main_fig_spatial_index_dict,
+                         get_node_filtered_app_data,
+                         get_unfiltered_app_data,
+                         get_weight_filtered_app_data)
+from main_fig_generator import (is_viewport_culling_needed,
+                                is_zoomed_out_lod_needed)
+
+# Stages reported to the browser. Figs are generated after the job is
+# done, by the callback that started it.
+JOB_STAGES = APP_DATA_STAGES + ["figures"]
+
+# Labels of ``JOB_STAGES`` shown in the browser
+JOB_STAGE_LABELS = {
+    "parse": "Parsing files",
+    "links": "Generating links",
+    "ordering": "Ordering nodes",
+    "vpsc": "Removing node overlap",
+    "figures": "Generating figures"
+}
+
+# ``get_app_data`` keyword args that only change weight filters
+WEIGHT_FILTER_KWARGS = ["link_slider_vals_dict", "link_neq_dict"]
+
+# ``get_app_data`` keyword args that only change node states
+NODE_STATE_KWARGS = ["selected_nodes",
+                     "filtered_node_symbols",
+                     "filtered_node_colors"]
+
+# Max number of app data vals with weight filters or node states
+# applied, kept in each process. They are cheap to regenerate, so they
+# are not stored in shared caches, where they would evict the slow
+# ``get_unfiltered_app_data`` ret vals.
+MAX_FILTERED_APP_DATA = 8
+
+# Where job statuses are stored, if the disk cache backend is used
+JOB_STATUS_DIR = Path(gettempdir()) / "amr_tv_jobs"
+
+# Max number of job statuses, and sessions' latest jobs, kept on disk
+MAX_JOB_STATUSES = 256
+
+# Max number of background processes per gunicorn worker
+MAX_JOB_PROCESSES = 1
+
+# Created the first time a job is started, so gunicorn workers do not
+# share the processes of the parent process.
+executor = None
+
+# ``get_weight_filtered_app_data`` and ``get_app_data`` ret vals
+filtered_app_data_cache = LRUCache(max_size=MAX_FILTERED_APP_DATA)
+
+
+class JobSuperseded(Exception):
+    """Raised in a job that no session needs anymore."""
+
+
+def get_app_data_key(dataset_id, app_data_kwargs):
+    """Get cache key of ``get_app_data`` ret val.
+
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    :return: Cache key
+    :rtype: str
+    """
+    return get_cache_key(dataset_id, app_data_kwargs)
+
+
+def get_unfiltered_app_data_key(dataset_id, app_data_kwargs):
+    """Get cache key of ``get_unfiltered_app_data`` ret val.
+
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    :return: Cache key, which is the same for any weight filters and
+        node states.
+    :rtype: str
+    """
+    return get_cache_key(dataset_id,
+                         get_unfiltered_app_data_kwargs(app_data_kwargs),
+                         "unfiltered")
+
+
+def get_weight_filtered_app_data_key(dataset_id, app_data_kwargs):
+    """Get cache key of ``get_weight_filtered_app_data`` ret val.
+
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    :return: Cache key, which is the same for any node states
+    :rtype: str
+    """
+    weight_filtered_kwargs = {k: v for k, v in app_data_kwargs.items()
+                              if k not in NODE_STATE_KWARGS}
+    return get_cache_key(dataset_id, weight_filtered_kwargs, "weights")
+
+
+def get_unfiltered_app_data_kwargs(app_data_kwargs):
+    """Get keyword args passed to ``get_unfiltered_app_data``.
+
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    :return: ``app_data_kwargs`` without weight filters and node states
+    :rtype: dict
+    """
+    return {k: v for k, v in app_data_kwargs.items()
+            if k not in WEIGHT_FILTER_KWARGS + NODE_STATE_KWARGS}
+
+
+def fetch_unfiltered_app_data(app_data_cache, dataset_id, app_data_kwargs,
+                              stage_callback=None):
+    """Get ``get_unfiltered_app_data`` ret val, generating it if needed.
+
+    If samples were appended to another dataset, its cached
+    ``get_unfiltered_app_data`` ret val is used to only generate links
+    for the new samples.
+
+    :param app_data_cache: Cache with ``get`` and ``set`` methods
+    :type app_data_cache: LRUCache|TieredCache
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    :param stage_callback: Passed to ``get_unfiltered_app_data``
+    :type stage_callback: (str) -> None
+    :return: ``get_unfiltered_app_data`` ret val, or ``None`` if there
+        are no files stored under ``dataset_id``.
+    :rtype: dict|None
+    """
+    unfiltered_key = get_unfiltered_app_data_key(dataset_id, app_data_kwargs)
+    unfiltered_app_data = app_data_cache.get(unfiltered_key)
+    if unfiltered_app_data is not None:
+        return unfiltered_app_data
+
+    dataset = get_dataset(dataset_id)
+    if dataset is None:
+        return None
+    prev_unfiltered_app_data = None
+    parent_dataset_id = get_parent_dataset_id(dataset_id)
+    if parent_dataset_id is not None:
+        prev_unfiltered_app_data = app_data_cache.get(
+            get_unfiltered_app_data_key(parent_dataset_id, app_data_kwargs)
+        )
+    unfiltered_app_data = get_unfiltered_app_data(
+        dataset["sample"],
+        dataset["config"],
+        matrix_file_base64_str=dataset["matrix"],
+        stage_callback=stage_callback,
+        prev_unfiltered_app_data=prev_unfiltered_app_data,
+        **get_unfiltered_app_data_kwargs(app_data_kwargs)
+    )
+    app_data_cache.set(unfiltered_key, unfiltered_app_data)
+    return unfiltered_app_data
+
+
+def fetch_app_data(app_data_cache, dataset_id, app_data_kwargs,
+                   stage_callback=None):
+    """Get ``get_app_data`` ret val, reusing cached vals if possible.
+
+    If only node states changed, they are applied to cached
+    ``get_weight_filtered_app_data`` ret vals. If weight filters
+    changed too, they are applied to cached
+    ``get_unfiltered_app_data`` ret vals first.
+
+    :param app_data_cache: Cache with ``get`` and ``set`` methods
+    :type app_data_cache: LRUCache|TieredCache
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    :param stage_callback: Passed to ``get_unfiltered_app_data``
+    :type stage_callback: (str) -> None
+    :return: ``get_app_data`` ret val, or ``None`` if there are no
+        files stored under ``dataset_id``.
+    :rtype: dict|None
+    """
+    key = get_app_data_key(dataset_id, app_data_kwargs)
+    app_data = filtered_app_data_cache.get(key)
+    if app_data is not None:
+        return app_data
+
+    weight_filtered_key = \
+        get_weight_filtered_app_data_key(dataset_id, app_data_kwargs)
+    weight_filtered_app_data = filtered_app_data_cache.get(weight_filtered_key)
+    if weight_filtered_app_data is None:
+        unfiltered_app_data = \
+            fetch_unfiltered_app_data(app_data_cache,
+                                      dataset_id,
+                                      app_data_kwargs,
+                                      stage_callback=stage_callback)
+        if unfiltered_app_data is None:
+            return None
+        weight_filter_kwargs = {k: v for k, v in app_data_kwargs.items()
+                                if k in WEIGHT_FILTER_KWARGS}
+        weight_filtered_app_data = \
+            get_weight_filtered_app_data(unfiltered_app_data,
+                                         **weight_filter_kwargs)
+        filtered_app_data_cache.set(weight_filtered_key,
+                                    weight_filtered_app_data)
+
+    node_state_kwargs = {k: v for k, v in app_data_kwargs.items()
+                         if k in NODE_STATE_KWARGS}
+    app_data = get_node_filtered_app_data(weight_filtered_app_data,
+                                          **node_state_kwargs)
+    # Spatial indices are only used to cull zoomed in main figs. They
+    # are cached with app data, so viewport requests do not rebuild
+    # them.
+    if not app_data_kwargs.get("vpsc") \
+            and is_viewport_culling_needed(app_data):
+        app_data["main_fig_spatial_index_dict"] = \
+            get_main_fig_spatial_index_dict(app_data)
+    filtered_app_data_cache.set(key, app_data)
+    return app_data
+
+
+def is_app_data_job_needed(app_data_cache, dataset_id, app_data_kwargs):
+    """Check whether app data is slow enough to generate in a job.
+
+    That is the case unless ``get_unfiltered_app_data`` ret vals are
+    cached, for the main fig and zoomed-out main fig.
+
+    :param app_data_cache: Cache with ``get`` and ``set`` methods
+    :type app_data_cache: LRUCache|TieredCache
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    :return: Whether ``run_app_data_job`` should generate app data
+    :rtype: bool
+    """
+    unfiltered_app_data = app_data_cache.get(
+        get_unfiltered_app_data_key(dataset_id, app_data_kwargs)
+    )
+    if unfiltered_app_data is None:
+        return True
+    # Aggregated cells do not need node overlap removal
+    if is_zoomed_out_lod_needed(unfiltered_app_data["app_data"]):
+        return False
+    vpsc_kwargs = dict(app_data_kwargs, vpsc=True)
+    vpsc_key = get_unfiltered_app_data_key(dataset_id, vpsc_kwargs)
+    return app_data_cache.get(vpsc_key) is None
+
+
+def get_job_status_cache(cache_backend):
+    """Get cache storing job statuses.
+
+    Statuses change while a job runs, so they are only stored in a
+    shared cache, and never in an in-process cache.
+
+    :param cache_backend: ``"disk"`` or ``"redis"``
+    :type cache_backend: str
+    :return: Cache with ``get`` and ``set`` methods
+    :rtype: DiskCache|RedisCache
+    """
+    if cache_backend == "redis":
+        return RedisCache(prefix="amr_tv_job:")
+    else:
+        return DiskCache(JOB_STATUS_DIR, max_size=MAX_JOB_STATUSES)
+
+
+def get_job_status(cache_backend, job_id):
+    """Get status of job.
+
+    :param cache_backend: ``"disk"`` or ``"redis"``
+    :type cache_backend: str
+    :param job_id: ``start_app_data_job`` ret val
+    :type job_id: str
+    :return: Dict with the current ``stage``, whether the job is
+        ``done`` or was ``cancelled``, and an ``error`` msg if it
+        failed. ``None`` if there is no job with ``job_id``.
+    :rtype: dict|None
+    """
+    return get_job_status_cache(cache_backend).get(job_id)
+
+
+def set_job_status(cache_backend, job_id, stage, done=False, error=None,
+                   cancelled=False):
+    """Set status of job.
+
+    :param cache_backend: ``"disk"`` or ``"redis"``
+    :type cache_backend: str
+    :param job_id: ``start_app_data_job`` ret val
+    :type job_id: str
+    :param stage: Current stage in ``JOB_STAGES``
+    :type stage: str
+    :param done: Whether the job is done
+    :type done: bool
+    :param error: Error msg, if the job failed
+    :type error: str
+    :param cancelled: Whether the job was abandoned
+    :type cancelled: bool
+    """
+    get_job_status_cache(cache_backend).set(
+        job_id,
+        {"stage": stage, "done": done, "error": error, "cancelled": cancelled}
+    )
+
+
+def set_session_job(cache_backend, session_id, job_id=None):
+    """Set latest job needed by a browser session.
+
+    Earlier jobs started by the session are abandoned, unless another
+    session needs them.
+
+    :param cache_backend: ``"disk"`` or ``"redis"``
+    :type cache_backend: str
+    :param session_id: Id of browser session
+    :type session_id: str
+    :param job_id: ``start_app_data_job`` ret val, or ``None`` if the
+        session does not need any job.
+    :type job_id: str
+    """
+    # Session ids come from the browser, so they are hashed before
+    # being used in paths.
+    session_key = get_cache_key("session", session_id)
+    get_job_status_cache(cache_backend).set(session_key, job_id)
+
+
+def is_job_superseded(cache_backend, job_id):
+    """Check whether no session needs a job anymore.
+
+    :param cache_backend: ``"disk"`` or ``"redis"``
+    :type cache_backend: str
+    :param job_id: ``start_app_data_job`` ret val
+    :type job_id: str
+    :return: Whether every session that started or joined the job has
+        a newer latest job.
+    :rtype: bool
+    """
+    job_status_cache = get_job_status_cache(cache_backend)
+    session_ids = job_status_cache.get(get_cache_key("sessions", job_id))
+    for session_id in session_ids or []:
+        session_key = get_cache_key("session", session_id)
+        if job_status_cache.get(session_key) == job_id:
+            return False
+    return True
+
+
+def run_app_data_job(cache_backend, job_id, dataset_id, app_data_kwargs):
+    """Generate unfiltered app data, and zoomed-out one if needed.
+
+    This runs in a background process. Results are stored in the app
+    data cache.
+
+    :param cache_backend: ``"disk"`` or ``"redis"``
+    :type cache_backend: str
+    :param job_id: ``start_app_data_job`` ret val
+    :type job_id: str
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    """
+    app_data_cache = get_cache(cache_backend)
+    # Zoomed-out app data repeats some earlier stages, but the progress
+    # shown in the browser should not go backwards.
+    reached_stages = []
+
+    def stage_callback(stage):
+        if is_job_superseded(cache_backend, job_id):
+            raise JobSuperseded
+        if stage in reached_stages:
+            return
+        reached_stages.append(stage)
+        set_job_status(cache_backend, job_id, stage)
+
+    try:
+        unfiltered_app_data = \
+            fetch_unfiltered_app_data(app_data_cache,
+                                      dataset_id,
+                                      app_data_kwargs,
+                                      stage_callback=stage_callback)
+        if unfiltered_app_data is None:
+            raise ValueError("Uploaded files are no longer stored")
+
+        # Aggregated cells do not need node overlap removal
+        if not is_zoomed_out_lod_needed(unfiltered_app_data["app_data"]):
+            vpsc_kwargs = dict(app_data_kwargs, vpsc=True)
+            fetch_unfiltered_app_data(app_data_cache,
+                                      dataset_id,
+                                      vpsc_kwargs,
+                                      stage_callback=stage_callback)
+        set_job_status(cache_backend, job_id, "figures", done=True)
+    except JobSuperseded:
+        set_job_status(cache_backend, job_id, None, cancelled=True)
+    except Exception as e:
+        set_job_status(cache_backend, job_id, None, error=str(e))
+
+
+def start_app_data_job(cache_backend, session_id, dataset_id,
+                       app_data_kwargs):
+    """Start generating app data in a background process.
+
+    Jobs generating the same unfiltered app data are only started once,
+    and are shared by the sessions that need them, whatever weight
+    filters or node states they set. The job becomes the latest
+    job of ``session_id``.
+
+    :param cache_backend: ``"disk"`` or ``"redis"``
+    :type cache_backend: str
+    :param session_id: Id of browser session
+    :type session_id: str
+    :param dataset_id: ``dataset_store.add_dataset`` ret val
+    :type dataset_id: str
+    :param app_data_kwargs: Keyword args passed to ``get_app_data``
+    :type app_data_kwargs: dict
+    :return: Job id
+    :rtype: str
+    """
+    global executor
+
+    job_id = get_unfiltered_app_data_key(dataset_id, app_data_kwargs)
+    set_session_job(cache_backend, session_id, job_id)
+
+    job_status_cache = get_job_status_cache(cache_backend)
+    sessions_key = get_cache_key("sessions", job_id)
+    job_status = get_job_status(cache_backend, job_id)
+    if job_status and not (job_status["done"]
+                           or job_status["error"]
+                           or job_status["cancelled"]):
+        session_ids = job_status_cache.get(sessions_key) or []
+        if session_id not in session_ids:
+            job_status_cache.set(sessions_key, session_ids + [session_id])
+        return job_id
+
+    job_status_cache.set(sessions_key, [session_id])
+    set_job_status(cache_backend, job_id, JOB_STAGES[0])
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=MAX_JOB_PROCESSES)
+    executor.submit(run_app_data_job,
+                    cache_backend,
+                    job_id,
+                    dataset_id,
+                    app_data_kwargs)
+    return job_id
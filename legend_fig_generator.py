@@ -5,7 +5,8 @@ from sys import maxsize
 import dash_bootstrap_components as dbc
 import dash_core_components as dcc
 import dash_html_components as html
-import plotly.graph_objects as go
+
+from main_fig_generator import get_fig
 
 
 def get_node_symbol_legend_fig_nodes(app_data):
@@ -17,9 +18,10 @@ def get_node_symbol_legend_fig_nodes(app_data):
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
     :return: Plotly obj in node symbol legend
-    :rtype: list[go.Scatter|go.Bar]
+    :rtype: list[dict]
     """
-    nodes = go.Scatter(
+    nodes = dict(
+        type="scatter",
         x=[1 for _ in app_data["node_shape_legend_fig_nodes_y"]],
         y=app_data["node_shape_legend_fig_nodes_y"],
         mode="markers+text",
@@ -40,7 +42,8 @@ def get_node_symbol_legend_fig_nodes(app_data):
         },
         hoverinfo="skip"
     )
-    easier_clicking = go.Bar(
+    easier_clicking = dict(
+        type="bar",
         x=[2 for _ in app_data["node_shape_legend_fig_nodes_y"]],
         y=app_data["node_shape_legend_fig_nodes_y"],
         hoverinfo="none",
@@ -58,10 +61,10 @@ def get_node_symbol_legend_fig(app_data):
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
     :return: Plotly figure object that shows node symbol legend in viz
-    :rtype: go.Figure
+    :rtype: dict
     """
     graph = get_node_symbol_legend_fig_nodes(app_data)
-    fig = go.Figure(
+    fig = get_fig(
         data=graph,
         layout={
             "margin": {
@@ -98,11 +101,12 @@ def get_link_legend_fig_graph_objs(link_type, link_color, is_filtered):
     :param is_filtered: Whether link is filtered or not
     :type is_filtered: bool
     :return: Plotly scatter/bar obj used to draw a link in link legend
-    :rtype: list[go.Scatter, go.Bar]
+    :rtype: list[dict]
     """
     (r, g, b) = link_color
     a = "0.5" if is_filtered else "1"
-    scatter_obj = go.Scatter(
+    scatter_obj = dict(
+        type="scatter",
         x=[0, 1],
         y=[1, 1],
         mode="lines+text",
@@ -119,7 +123,8 @@ def get_link_legend_fig_graph_objs(link_type, link_color, is_filtered):
         hoverinfo="skip"
     )
     # Invisible bar chart underneath to register clicks
-    bar_obj = go.Bar(
+    bar_obj = dict(
+        type="bar",
         x=[1],
         y=[1],
         hoverinfo="none",
@@ -142,11 +147,11 @@ def get_link_legend_fig(link_type, link_color, is_filtered):
     :param is_filtered: Whether link is filtered or not
     :type is_filtered: bool
     :return: Plotly fig obj used to draw one link in link legend
-    :rtype: go.Figure
+    :rtype: dict
     """
     graph_objs = \
         get_link_legend_fig_graph_objs(link_type, link_color, is_filtered)
-    fig = go.Figure(
+    fig = get_fig(
         data=graph_objs,
         layout={
             "margin": {
@@ -289,14 +294,15 @@ def get_node_color_legend_fig_nodes(app_data):
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
     :return: Plotly obj in node color legend
-    :rtype: list[go.Scatter|go.Bar]
+    :rtype: list[dict]
     """
     node_color_attr_dict = app_data["node_color_attr_dict"]
 
     if not node_color_attr_dict:
-        return {}
+        return []
 
-    nodes = go.Scatter(
+    nodes = dict(
+        type="scatter",
         x=[1 for _ in node_color_attr_dict],
         y=list(range(len(node_color_attr_dict))),
         mode="markers+text",
@@ -318,7 +324,8 @@ def get_node_color_legend_fig_nodes(app_data):
         textposition="middle right",
         hoverinfo="skip"
     )
-    easier_clicking = go.Bar(
+    easier_clicking = dict(
+        type="bar",
         x=[5 for _ in node_color_attr_dict],
         y=list(range(len(node_color_attr_dict))),
         hoverinfo="none",
@@ -336,10 +343,10 @@ def get_node_color_legend_fig(app_data):
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
     :return: Plotly figure object that shows node color legend in viz
-    :rtype: go.Figure
+    :rtype: dict
     """
     graph = get_node_color_legend_fig_nodes(app_data)
-    fig = go.Figure(
+    fig = get_fig(
         data=graph,
         layout={
             "margin": {
@@ -359,5 +366,5 @@ def get_node_color_legend_fig(app_data):
         },
     )
     if graph:
-        fig.update_layout(height=len(graph[0]["y"] * 50))
+        fig["layout"]["height"] = len(graph[0]["y"] * 50)
     return fig
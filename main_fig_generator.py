@@ -1,19 +1,77 @@
 """Fns for generating main fig in viz."""
 
-import plotly.graph_objects as go
+from re import compile
 
+import numpy as np
+import plotly.io as pio
 
-def get_main_fig_nodes(app_data):
+from data_parser import get_main_fig_arc_lines_dict
+
+# Figs are built as dicts, instead of ``go.Figure`` objs, to skip
+# validating every trace and layout property each time. But we still
+# want the same look, so the default template is converted once.
+FIG_TEMPLATE = pio.templates[pio.templates.default].to_plotly_json()
+
+# Arrowheads above this count are drawn as polygon traces, instead of
+# annotations.
+MAX_ARROWHEAD_ANNOTATIONS = 500
+
+# Arcs above this count are drawn as line traces, instead of shapes
+MAX_ARC_SHAPES = 250
+
+# Weight labels above this count are drawn as text traces, instead of
+# annotations.
+MAX_LABEL_ANNOTATIONS = 500
+
+# Weight labels drawn as text traces are swapped for angled annotations
+# when the visible range is at most this fraction of the full range.
+MAX_TEXT_LABEL_ZOOM = 0.25
+
+# Main figs with more nodes or links than these are drawn with WebGL
+MAX_SVG_NODES = 2000
+MAX_SVG_LINKS = 5000
+
+# Zoomed in main figs with more nodes or links than these only include
+# elements near the visible range.
+MAX_UNCULLED_NODES = 5000
+MAX_UNCULLED_LINKS = 10000
+
+# Zoomed out main figs with more nodes than this aggregate nodes and
+# links into cells, instead of drawing each one.
+MAX_ZOOMED_OUT_NODES = 1000
+
+# Number of decimals kept in coordinates of figs sent to the browser.
+# One x or y unit spans at least 144 pixels in the main fig, so this is
+# well below a pixel.
+COORD_PRECISION = 3
+
+# Trace, marker and textfont attributes that may be arrays, but are sent
+# as single vals if every val is the same.
+COLLAPSIBLE_ATTRS = ["color", "opacity", "size", "symbol", "hoverinfo", "text"]
+
+# Matches floats in shape paths
+FLOAT_REGEX = compile(r"-?\d+\.\d+(e-?\d+)?")
+
+# Width of the base of arrowheads drawn as polygons, as a fraction of
+# their length.
+ARROWHEAD_POLYGON_WIDTH = 0.8
+
+
+def get_main_fig_nodes(app_data, webgl=False):
     """Get plotly scatter obj of nodes in main fig.
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly scatter obj of nodes in main fig
-    :rtype: go.Scatter
+    :param webgl: Use WebGL instead of SVG scatter objs
+    :type webgl: bool
+    :return: Plotly scatter trace of nodes in main fig
+    :rtype: dict
     """
+    trace_type = "scattergl" if webgl else "scatter"
     opacity = app_data["main_fig_nodes_marker_opacity"]
     text = app_data["main_fig_nodes_text"]
-    nodes = go.Scatter(
+    nodes = dict(
+        type=trace_type,
         x=app_data["main_fig_nodes_x"],
         y=app_data["main_fig_nodes_y"],
         mode="markers+text",
@@ -36,12 +94,14 @@ def get_main_fig_nodes(app_data):
         hoverinfo=["text" if e else "skip" for e in opacity],
         hovertext=app_data["main_fig_nodes_hovertext"],
         name="main_fig_nodes_trace",
-        customdata=opacity
+        # Nodes may be culled, so indices are kept alongside opacities
+        customdata=[[e, app_data["main_fig_nodes_index"][i]]
+                    for i, e in enumerate(opacity)]
     )
     return nodes
 
 
-def get_main_fig_link_graphs(app_data):
+def get_main_fig_link_graphs(app_data, webgl=False):
     """Get plotly scatter objs of links in main fig.
 
     This is basically a list of different scatter objs--one for each
@@ -49,16 +109,20 @@ def get_main_fig_link_graphs(app_data):
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly scatter objs of links in main fig
-    :rtype: list[go.Scatter]
+    :param webgl: Use WebGL instead of SVG scatter objs
+    :type webgl: bool
+    :return: Plotly scatter traces of links in main fig
+    :rtype: list[dict]
     """
+    trace_type = "scattergl" if webgl else "scatter"
     ret = []
     for link in app_data["main_fig_links_dict"]:
         link_x = app_data["main_fig_links_dict"][link]["x"]
         link_y = app_data["main_fig_links_dict"][link]["y"]
         (r, g, b) = app_data["link_color_dict"][link]
 
-        link_graph = go.Scatter(
+        link_graph = dict(
+            type=trace_type,
             x=[x if x else None for x in link_x],
             y=[y if y else None for y in link_y],
             mode="lines",
@@ -72,6 +136,46 @@ def get_main_fig_link_graphs(app_data):
     return ret
 
 
+def get_main_fig_arc_graphs(app_data, webgl=False):
+    """Get plotly scatter objs of arcs in main fig.
+
+    This is an alternative to arc shapes, which Plotly renders as
+    individual elements. All arcs of a link type are drawn by one
+    scatter obj, using points sampled along each arc. Points are only
+    sampled here, as arcs are usually drawn as shapes.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param webgl: Use WebGL instead of SVG scatter objs
+    :type webgl: bool
+    :return: Plotly scatter traces of arcs in main fig
+    :rtype: list[dict]
+    """
+    trace_type = "scattergl" if webgl else "scatter"
+    main_fig_arc_lines_dict = \
+        get_main_fig_arc_lines_dict(app_data["main_fig_arcs_dict"])
+    ret = []
+    for link in main_fig_arc_lines_dict:
+        arc_x = main_fig_arc_lines_dict[link]["x"]
+        arc_y = main_fig_arc_lines_dict[link]["y"]
+        (r, g, b) = app_data["link_color_dict"][link]
+
+        arc_graph = dict(
+            type=trace_type,
+            x=arc_x,
+            y=arc_y,
+            mode="lines",
+            line={
+                "width": 3,
+                "color": "rgb(%s,%s,%s)" % (r, g, b)
+            },
+            hoverinfo="skip"
+        )
+        ret += [arc_graph]
+
+    return ret
+
+
 def get_main_fig_primary_facet_lines(app_data):
     """Get plotly scatter obj of primary facet lines in main fig.
 
@@ -80,11 +184,12 @@ def get_main_fig_primary_facet_lines(app_data):
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly scatter obj used to draw primary facet lines in
+    :return: Plotly scatter trace used to draw primary facet lines in
         main fig.
-    :rtype: go.Scatter
+    :rtype: dict
     """
-    lines = go.Scatter(
+    lines = dict(
+        type="scatter",
         x=app_data["main_fig_primary_facet_x"],
         y=app_data["main_fig_primary_facet_y"],
         mode="lines",
@@ -102,11 +207,12 @@ def get_main_fig_secondary_facet_lines(app_data):
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly scatter obj used to draw secondary facet lines in
+    :return: Plotly scatter trace used to draw secondary facet lines in
         main fig.
-    :rtype: go.Scatter
+    :rtype: dict
     """
-    lines = go.Scatter(
+    lines = dict(
+        type="scatter",
         x=app_data["main_fig_secondary_facet_x"],
         y=app_data["main_fig_secondary_facet_y"],
         mode="lines",
@@ -119,20 +225,54 @@ def get_main_fig_secondary_facet_lines(app_data):
     return lines
 
 
-def get_main_fig(app_data):
+def get_main_fig(app_data, marker_arrowheads=None, traced_arcs=None,
+                 text_labels=None, webgl=None):
     """Get main fig in viz.
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly figure obj showing main fig in viz
-    :rtype: go.Figure
+    :param marker_arrowheads: Draw arrowheads as polygon traces instead
+        of annotations. If ``None``, polygons are only used when there
+        are more than ``MAX_ARROWHEAD_ANNOTATIONS`` arrowheads.
+    :type marker_arrowheads: bool | None
+    :param traced_arcs: Draw arcs as line traces instead of shapes. If
+        ``None``, line traces are only used when there are more than
+        ``MAX_ARC_SHAPES`` arcs.
+    :type traced_arcs: bool | None
+    :param text_labels: Draw weight labels as text traces instead of
+        annotations. If ``None``, text traces are only used when there
+        are more than ``MAX_LABEL_ANNOTATIONS`` labels.
+    :type text_labels: bool | None
+    :param webgl: Draw nodes, links and arcs with WebGL instead of SVG.
+        If ``None``, WebGL is only used when there are more than
+        ``MAX_SVG_NODES`` nodes or ``MAX_SVG_LINKS`` links. Arcs are
+        always drawn as line traces with WebGL.
+    :type webgl: bool | None
+    :return: Plotly figure dict showing main fig in viz
+    :rtype: dict
     """
-    nodes_graph = get_main_fig_nodes(app_data)
-    link_graphs = get_main_fig_link_graphs(app_data)
+    default_render_opts = get_main_fig_render_opts(app_data)
+    if marker_arrowheads is None:
+        marker_arrowheads = default_render_opts["marker_arrowheads"]
+    if webgl is None:
+        webgl = default_render_opts["webgl"]
+    if traced_arcs is None or webgl:
+        traced_arcs = webgl or default_render_opts["traced_arcs"]
+    if text_labels is None:
+        text_labels = default_render_opts["text_labels"]
+
+    nodes_graph = get_main_fig_nodes(app_data, webgl=webgl)
+    link_graph_groups = \
+        get_main_fig_link_graph_groups(app_data,
+                                       marker_arrowheads=marker_arrowheads,
+                                       traced_arcs=traced_arcs,
+                                       text_labels=text_labels,
+                                       webgl=webgl)
+    link_graphs = [e for group in link_graph_groups for e in group]
     primary_facet_lines_graph = get_main_fig_primary_facet_lines(app_data)
     secondary_facet_lines_graph = get_main_fig_secondary_facet_lines(app_data)
 
-    ret = go.Figure(
+    ret = get_fig(
         data=link_graphs + [
               nodes_graph,
               secondary_facet_lines_graph,
@@ -153,37 +293,326 @@ def get_main_fig(app_data):
             },
             "plot_bgcolor": "white",
             "dragmode": "pan"
+        }
+    )
+
+    ret["layout"]["annotations"] = \
+        get_main_fig_annotations(app_data,
+                                 arrowheads=not marker_arrowheads,
+                                 labels=not text_labels,
+                                 arrow_width=3,
+                                 arrow_size=0.6)
+    if traced_arcs:
+        ret["layout"]["shapes"] = []
+    else:
+        ret["layout"]["shapes"] = get_arc_shapes(app_data, line_width=3)
+    # Reused when selecting or filtering, so the traces stay the same
+    ret["layout"]["meta"] = {
+        "render_opts": {
+            "marker_arrowheads": marker_arrowheads,
+            "traced_arcs": traced_arcs,
+            "text_labels": text_labels,
+            "webgl": webgl
         },
+        "version_dict": app_data["version_dict"]
+    }
+
+    return ret
+
+
+def get_main_fig_link_graph_groups(app_data, marker_arrowheads, traced_arcs,
+                                   text_labels, webgl):
+    """Get plotly scatter objs of links, and of elements drawn for them.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param marker_arrowheads: Draw arrowheads as polygon traces
+    :type marker_arrowheads: bool
+    :param traced_arcs: Draw arcs as line traces
+    :type traced_arcs: bool
+    :param text_labels: Draw weight labels as text traces
+    :type text_labels: bool
+    :param webgl: Use WebGL instead of SVG scatter objs
+    :type webgl: bool
+    :return: Lists of traces of links, arcs, arrowheads and weight
+        labels, in the order they are drawn in. Each list has one trace
+        for each link in ``link_color_dict``.
+    :rtype: list[list[dict]]
+    """
+    ret = [get_main_fig_link_graphs(app_data, webgl=webgl)]
+    if traced_arcs:
+        ret.append(get_main_fig_arc_graphs(app_data, webgl=webgl))
+    if marker_arrowheads:
+        ret.append(get_main_fig_arrowhead_graphs(app_data,
+                                                 arrowhead_size=12,
+                                                 webgl=webgl))
+    if text_labels:
+        ret.append(get_main_fig_label_graphs(app_data, webgl=webgl))
+    return ret
+
+
+def get_main_fig_annotations(app_data, arrowheads, labels, arrow_width,
+                             arrow_size):
+    """Get annotations drawn for links in main fig.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param arrowheads: Draw arrowheads as annotations
+    :type arrowheads: bool
+    :param labels: Draw weight labels as annotations
+    :type labels: bool
+    :param arrow_width: Width of links
+    :type arrow_width: int
+    :param arrow_size: Size of arrowhead; must be greater than 0.3
+    :type arrow_size: float
+    :return: list of annotations
+    :rtype: list
+    """
+    annotations = []
+    if arrowheads:
+        annotations += get_link_arrowhead_annotations(app_data,
+                                                      arrow_width=arrow_width,
+                                                      arrow_size=arrow_size)
+        annotations += get_arc_arrowhead_annotations(app_data,
+                                                     arrow_width=arrow_width,
+                                                     arrow_size=arrow_size)
+    if labels:
+        annotations += get_link_label_annotations(app_data)
+        annotations += get_arc_label_annotations(app_data)
+    return annotations
+
+
+def get_links_app_data(app_data, links):
+    """Get ``app_data`` with only the elements of some links.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param links: Links to keep, in the order of ``link_color_dict``
+    :type links: list[str]
+    :return: ``app_data`` with only links, arcs, arrowheads, weight
+        labels and colors of ``links``.
+    :rtype: dict
+    """
+    ret = dict(app_data)
+    element_dict_keys = ["main_fig_links_dict",
+                         "main_fig_arcs_dict",
+                         "main_fig_link_arrowheads_dict",
+                         "main_fig_arc_arrowheads_dict",
+                         "main_fig_link_labels_dict",
+                         "main_fig_arc_labels_dict",
+                         "link_color_dict"]
+    for key in element_dict_keys:
+        ret[key] = {k: v for k, v in app_data[key].items() if k in links}
+    return ret
+
+
+def get_changed_links(app_data, version_dict):
+    """Get links and nodes drawn differently than in an earlier fig.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param version_dict: ``version_dict`` of app data the earlier fig
+        was drawn with, kept in its meta.
+    :type version_dict: dict|None
+    :return: Links in the order of ``link_color_dict`` whose elements
+        changed, and whether nodes changed. ``None`` if the earlier fig
+        was drawn with another layout, so every trace may have changed.
+    :rtype: tuple[list[str], bool]|None
+    """
+    new_version_dict = app_data["version_dict"]
+    if not version_dict:
+        return None
+    if version_dict["layout"] != new_version_dict["layout"]:
+        return None
+    changed_links = [k for k in app_data["link_color_dict"]
+                     if version_dict["links"].get(k)
+                     != new_version_dict["links"][k]]
+    nodes_changed = version_dict["nodes"] != new_version_dict["nodes"]
+    return changed_links, nodes_changed
+
+
+def get_main_fig_patch(app_data, version_dict, marker_arrowheads, traced_arcs,
+                       text_labels, webgl):
+    """Get main fig props that changed since an earlier main fig.
+
+    Selecting and filtering nodes only changes the opacities of nodes,
+    and which links are drawn. So only the props of nodes, and the
+    traces of links whose elements changed, are generated again.
+
+    :param app_data: ``data_parser.get_app_data`` ret val. If the
+        earlier fig was culled, elements must be in the same viewport.
+    :type app_data: dict
+    :param version_dict: ``version_dict`` in meta of earlier fig
+    :type version_dict: dict|None
+    :param marker_arrowheads: Render opt of earlier fig
+    :type marker_arrowheads: bool
+    :param traced_arcs: Render opt of earlier fig
+    :type traced_arcs: bool
+    :param text_labels: Render opt of earlier fig
+    :type text_labels: bool
+    :param webgl: Render opt of earlier fig
+    :type webgl: bool
+    :return: Dict with a ``data`` dict mapping trace indices to new
+        trace props, and a ``layout`` dict of new layout props. ``None``
+        if the whole fig must be generated again.
+    :rtype: dict|None
+    """
+    changed_links = get_changed_links(app_data, version_dict)
+    if changed_links is None:
+        return None
+    (changed_links, nodes_changed) = changed_links
+
+    link_graph_groups = get_main_fig_link_graph_groups(
+        get_links_app_data(app_data, changed_links),
+        marker_arrowheads=marker_arrowheads,
+        traced_arcs=traced_arcs,
+        text_labels=text_labels,
+        webgl=webgl
     )
+    data = get_link_graph_groups_patch(app_data,
+                                       link_graph_groups,
+                                       changed_links)
+    if nodes_changed:
+        nodes_graph = get_main_fig_nodes(app_data, webgl=webgl)
+        nodes_graph_index = \
+            len(link_graph_groups) * len(app_data["link_color_dict"])
+        data[nodes_graph_index] = {
+            "marker": {"opacity": nodes_graph["marker"]["opacity"]},
+            "text": nodes_graph["text"],
+            "textfont": {"color": nodes_graph["textfont"]["color"]},
+            "hoverinfo": nodes_graph["hoverinfo"],
+            "customdata": nodes_graph["customdata"]
+        }
+
+    layout = {"meta": {"version_dict": app_data["version_dict"]}}
+    if changed_links:
+        if not marker_arrowheads or not text_labels:
+            layout["annotations"] = \
+                get_main_fig_annotations(app_data,
+                                         arrowheads=not marker_arrowheads,
+                                         labels=not text_labels,
+                                         arrow_width=3,
+                                         arrow_size=0.6)
+        if not traced_arcs:
+            layout["shapes"] = get_arc_shapes(app_data, line_width=3)
+    return {"data": data, "layout": layout}
 
-    main_fig_annotations = get_link_arrowhead_annotations(app_data,
-                                                          arrow_width=3,
-                                                          arrow_size=0.6)
-    main_fig_annotations += get_arc_arrowhead_annotations(app_data,
-                                                          arrow_width=3,
-                                                          arrow_size=0.6)
-    main_fig_annotations += get_link_label_annotations(app_data)
-    main_fig_annotations += get_arc_label_annotations(app_data)
-    main_fig_shapes = get_arc_shapes(app_data, line_width=3)
-    ret.update_layout(annotations=main_fig_annotations,
-                      shapes=main_fig_shapes)
 
+def get_link_graph_groups_patch(app_data, link_graph_groups, links):
+    """Get trace props of links, wrt trace indices in a fig.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param link_graph_groups: ``get_main_fig_link_graph_groups`` ret
+        val, for ``app_data`` with only ``links``.
+    :type link_graph_groups: list[list[dict]]
+    :param links: Links in the order of ``link_color_dict``
+    :type links: list[str]
+    :return: Dict mapping indices of traces in a fig with every link
+        of ``app_data`` to traces in ``link_graph_groups``.
+    :rtype: dict[int, dict]
+    """
+    link_list = list(app_data["link_color_dict"])
+    ret = {}
+    for i, group in enumerate(link_graph_groups):
+        for link, link_graph in zip(links, group):
+            ret[i * len(link_list) + link_list.index(link)] = link_graph
     return ret
 
 
-def get_zoomed_out_main_fig(app_data):
+def get_main_fig_render_opts(app_data):
+    """Get opts used to draw main fig by default, wrt its size.
+
+    Culled main figs are drawn with the opts of the full main fig, so
+    elements do not switch b/w traces and annotations while panning.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :return: Keyword args of ``get_main_fig``, decided wrt the number
+        of elements in ``app_data``.
+    :rtype: dict
+    """
+    return {
+        "marker_arrowheads":
+            get_arrowhead_count(app_data) > MAX_ARROWHEAD_ANNOTATIONS,
+        "traced_arcs": get_arc_count(app_data) > MAX_ARC_SHAPES,
+        "text_labels": get_label_count(app_data) > MAX_LABEL_ANNOTATIONS,
+        "webgl": is_webgl_needed(app_data)
+    }
+
+
+def get_zoomed_out_main_fig(app_data, marker_arrowheads=None,
+                            traced_arcs=None, webgl=None, lod=None,
+                            main_fig_app_data=None):
     """Get zoomed out main fig in viz.
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly figure obj showing zoomed-out main fig in viz
-    :rtype: go.Figure
+    :param marker_arrowheads: Draw arrowheads as polygon traces instead
+        of annotations. If ``None``, polygons are only used when there
+        are more than ``MAX_ARROWHEAD_ANNOTATIONS`` arrowheads.
+    :type marker_arrowheads: bool | None
+    :param traced_arcs: Draw arcs as line traces instead of shapes. If
+        ``None``, line traces are only used when there are more than
+        ``MAX_ARC_SHAPES`` arcs.
+    :type traced_arcs: bool | None
+    :param webgl: Draw nodes, links and arcs with WebGL instead of SVG.
+        If ``None``, WebGL is only used when there are more than
+        ``MAX_SVG_NODES`` nodes or ``MAX_SVG_LINKS`` links. Arcs are
+        always drawn as line traces with WebGL.
+    :type webgl: bool | None
+    :param lod: Draw aggregated cells and bundled edges instead of
+        individual nodes and links. If ``None``, cells are only drawn
+        when there are more than ``MAX_ZOOMED_OUT_NODES`` nodes.
+        Arrowheads are not drawn for bundled edges.
+    :type lod: bool | None
+    :param main_fig_app_data: ``data_parser.get_app_data`` ret val
+        used to draw main fig, if ``app_data`` was generated with node
+        overlap removal. Defaults to ``app_data``.
+    :type main_fig_app_data: dict | None
+    :return: Plotly figure dict showing zoomed-out main fig in viz
+    :rtype: dict
     """
-    nodes_graph = get_main_fig_nodes(app_data)
-    link_graphs = get_main_fig_link_graphs(app_data)
+    if main_fig_app_data is None:
+        main_fig_app_data = app_data
+    if lod is None:
+        lod = is_zoomed_out_lod_needed(app_data)
+    if lod:
+        marker_arrowheads = True
+        traced_arcs = True
+    if marker_arrowheads is None:
+        marker_arrowheads = \
+            get_arrowhead_count(app_data) > MAX_ARROWHEAD_ANNOTATIONS
+    if webgl is None:
+        webgl = is_webgl_needed(app_data)
+    if traced_arcs is None or webgl:
+        traced_arcs = webgl or get_arc_count(app_data) > MAX_ARC_SHAPES
+
+    if lod:
+        nodes_graph = get_zoomed_out_main_fig_cells(app_data, webgl=webgl)
+        link_graphs = \
+            get_zoomed_out_main_fig_edge_graphs(app_data, webgl=webgl)
+    else:
+        nodes_graph = get_main_fig_nodes(app_data, webgl=webgl)
+        # Clicked nodes are resolved to main fig nodes using customdata.
+        # Their main fig positions are kept too, as they may be culled
+        # from the main fig.
+        nodes_graph["customdata"] = \
+            [[e,
+              main_fig_app_data["main_fig_nodes_x"][e],
+              main_fig_app_data["main_fig_nodes_y"][e]]
+             for e in app_data["main_fig_nodes_index"]]
+        link_graph_groups = \
+            get_main_fig_link_graph_groups(app_data,
+                                           marker_arrowheads=marker_arrowheads,
+                                           traced_arcs=traced_arcs,
+                                           text_labels=False,
+                                           webgl=webgl)
+        link_graphs = [e for group in link_graph_groups for e in group]
     primary_facet_lines_graph = get_main_fig_primary_facet_lines(app_data)
+    primary_facet_lines_graph["line"]["width"] = 1
 
-    ret = go.Figure(
+    ret = get_fig(
         data=link_graphs + [nodes_graph, primary_facet_lines_graph],
         layout={
             "margin": {
@@ -208,23 +637,206 @@ def get_zoomed_out_main_fig(app_data):
                 "linecolor": "black"
             },
             "plot_bgcolor": "white"
-        },
+        }
     )
 
-    ret.update_traces(marker_size=8)
-    ret.update_traces(mode="markers",
+    update_fig_traces(ret,
+                      {"marker": {"size": 8}},
+                      selector={"name": "main_fig_nodes_trace"})
+    update_fig_traces(ret,
+                      {"mode": "markers"},
                       selector={"mode": "markers+text"})
-    ret.update_traces(line_width=1)
-
-    zoomed_out_main_fig_annotations = \
-        get_link_arrowhead_annotations(app_data, arrow_width=1, arrow_size=1)
-    zoomed_out_main_fig_annotations +=\
-        get_arc_arrowhead_annotations(app_data, arrow_width=1, arrow_size=1)
-    zoomed_out_main_fig_shapes = get_arc_shapes(app_data, line_width=1)
-    ret.update_layout(
-        annotations=zoomed_out_main_fig_annotations,
-        shapes=zoomed_out_main_fig_shapes
+    # Bundled edges are already drawn with widths wrt their weights
+    if not lod:
+        update_fig_traces(ret, {"line": {"width": 1}})
+
+    ret["layout"]["annotations"] = \
+        get_main_fig_annotations(app_data,
+                                 arrowheads=not marker_arrowheads,
+                                 labels=False,
+                                 arrow_width=1,
+                                 arrow_size=1)
+    if traced_arcs:
+        ret["layout"]["shapes"] = []
+    else:
+        ret["layout"]["shapes"] = get_arc_shapes(app_data, line_width=1)
+    # Reused when selecting or filtering, so the traces stay the same
+    ret["layout"]["meta"] = {
+        "render_opts": {
+            "marker_arrowheads": marker_arrowheads,
+            "traced_arcs": traced_arcs,
+            "webgl": webgl,
+            "lod": lod
+        },
+        "version_dict": app_data["version_dict"]
+    }
+
+    return ret
+
+
+def get_zoomed_out_main_fig_patch(app_data, version_dict, marker_arrowheads,
+                                  traced_arcs, webgl, lod):
+    """Get zoomed out main fig props that changed since an earlier one.
+
+    Same as ``get_main_fig_patch``, but for traces drawn like in
+    ``get_zoomed_out_main_fig``. Aggregated cells and bundled edges
+    change with node opacities, so they are always generated again.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param version_dict: ``version_dict`` in meta of earlier fig
+    :type version_dict: dict|None
+    :param marker_arrowheads: Render opt of earlier fig
+    :type marker_arrowheads: bool
+    :param traced_arcs: Render opt of earlier fig
+    :type traced_arcs: bool
+    :param webgl: Render opt of earlier fig
+    :type webgl: bool
+    :param lod: Render opt of earlier fig
+    :type lod: bool
+    :return: Dict with a ``data`` dict mapping trace indices to new
+        trace props, and a ``layout`` dict of new layout props. ``None``
+        if the whole fig must be generated again.
+    :rtype: dict|None
+    """
+    changed_links = get_changed_links(app_data, version_dict)
+    if lod or changed_links is None:
+        return None
+    (changed_links, nodes_changed) = changed_links
+
+    link_graph_groups = get_main_fig_link_graph_groups(
+        get_links_app_data(app_data, changed_links),
+        marker_arrowheads=marker_arrowheads,
+        traced_arcs=traced_arcs,
+        text_labels=False,
+        webgl=webgl
+    )
+    for link_graph in [e for group in link_graph_groups for e in group]:
+        update_nested_dict(link_graph, {"line": {"width": 1}})
+    data = get_link_graph_groups_patch(app_data,
+                                       link_graph_groups,
+                                       changed_links)
+    if nodes_changed:
+        nodes_graph = get_main_fig_nodes(app_data, webgl=webgl)
+        nodes_graph_index = \
+            len(link_graph_groups) * len(app_data["link_color_dict"])
+        data[nodes_graph_index] = {
+            "marker": {"opacity": nodes_graph["marker"]["opacity"]},
+            "text": nodes_graph["text"],
+            "textfont": {"color": nodes_graph["textfont"]["color"]},
+            "hoverinfo": nodes_graph["hoverinfo"]
+        }
+
+    layout = {"meta": {"version_dict": app_data["version_dict"]}}
+    if changed_links:
+        if not marker_arrowheads:
+            layout["annotations"] = \
+                get_main_fig_annotations(app_data,
+                                         arrowheads=True,
+                                         labels=False,
+                                         arrow_width=1,
+                                         arrow_size=1)
+        if not traced_arcs:
+            layout["shapes"] = get_arc_shapes(app_data, line_width=1)
+    return {"data": data, "layout": layout}
+
+
+def is_zoomed_out_lod_needed(app_data):
+    """Determine whether zoomed out main fig should aggregate nodes.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :return: Whether there are more than ``MAX_ZOOMED_OUT_NODES`` nodes
+    :rtype: bool
+    """
+    return len(app_data["main_fig_nodes_x"]) > MAX_ZOOMED_OUT_NODES
+
+
+def get_zoomed_out_main_fig_cells(app_data, webgl=False):
+    """Get plotly scatter obj of aggregated cells in zoomed out fig.
+
+    Each cell is sized wrt the number of nodes it aggregates. The
+    customdata of each cell is the index and position of a
+    representative node in the main fig, which is scrolled to when the
+    cell is clicked.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param webgl: Use WebGL instead of SVG scatter objs
+    :type webgl: bool
+    :return: Plotly scatter trace of cells in zoomed out main fig
+    :rtype: dict
+    """
+    trace_type = "scattergl" if webgl else "scatter"
+    lod_dict = app_data["zoomed_out_main_fig_lod_dict"]
+    count = np.array(lod_dict["count"])
+    cells = dict(
+        type=trace_type,
+        x=lod_dict["x"],
+        y=lod_dict["y"],
+        mode="markers",
+        marker={
+            "color": lod_dict["marker_color"],
+            "line": {
+                "color": "black",
+                "width": 1
+            },
+            "size": np.minimum(32, 6 + 2 * np.sqrt(count)).tolist(),
+            "symbol": "circle",
+            "opacity": lod_dict["marker_opacity"]
+        },
+        hoverinfo="text",
+        hovertext=["%s samples" % e for e in lod_dict["count"]],
+        name="zoomed_out_main_fig_cells_trace",
+        customdata=[[e,
+                     app_data["main_fig_nodes_x"][e],
+                     app_data["main_fig_nodes_y"][e]]
+                    for e in lod_dict["representative_nodes"]]
     )
+    return cells
+
+
+def get_zoomed_out_main_fig_edge_graphs(app_data, webgl=False):
+    """Get plotly scatter objs of bundled edges in zoomed out fig.
+
+    Edges are drawn with a width wrt the number of links they bundle.
+    There is one scatter obj for each link and edge width.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param webgl: Use WebGL instead of SVG scatter objs
+    :type webgl: bool
+    :return: Plotly scatter traces of edges in zoomed out main fig
+    :rtype: list[dict]
+    """
+    trace_type = "scattergl" if webgl else "scatter"
+    links_dict = app_data["zoomed_out_main_fig_lod_dict"]["links_dict"]
+    ret = []
+    for link in links_dict:
+        (r, g, b) = app_data["link_color_dict"][link]
+        width_dict = {}
+        for i, count in enumerate(links_dict[link]["count"]):
+            width = min(6, 1 + int(np.log2(count)))
+            edge_x = links_dict[link]["x"][3*i:3*i+3]
+            edge_y = links_dict[link]["y"][3*i:3*i+3]
+            if width not in width_dict:
+                width_dict[width] = {"x": [], "y": []}
+            width_dict[width]["x"] += edge_x
+            width_dict[width]["y"] += edge_y
+
+        for width in sorted(width_dict):
+            edge_graph = dict(
+                type=trace_type,
+                x=width_dict[width]["x"],
+                y=width_dict[width]["y"],
+                mode="lines",
+                line={
+                    "width": width,
+                    "color": "rgb(%s,%s,%s)" % (r, g, b)
+                },
+                hoverinfo="skip"
+            )
+            ret += [edge_graph]
 
     return ret
 
@@ -309,6 +921,360 @@ def get_arc_arrowhead_annotations(app_data, arrow_width, arrow_size):
     return annotations
 
 
+def is_viewport_culling_needed(app_data):
+    """Determine whether zoomed in main fig should be culled.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :return: True if there are more than ``MAX_UNCULLED_NODES`` nodes
+        or ``MAX_UNCULLED_LINKS`` links and arcs, False otherwise.
+    :rtype: bool
+    """
+    if len(app_data["main_fig_nodes_x"]) > MAX_UNCULLED_NODES:
+        return True
+    links_dict = app_data["main_fig_links_dict"]
+    # Links are separated by ``None``, so every link takes 3 vals
+    link_count = sum([len(links_dict[link]["x"])//3 for link in links_dict])
+    return link_count + get_arc_count(app_data) > MAX_UNCULLED_LINKS
+
+
+def is_webgl_needed(app_data):
+    """Determine whether main fig is too large to draw with SVG.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :return: True if there are more than ``MAX_SVG_NODES`` nodes or
+        ``MAX_SVG_LINKS`` links and arcs, False otherwise.
+    :rtype: bool
+    """
+    if len(app_data["main_fig_nodes_x"]) > MAX_SVG_NODES:
+        return True
+    links_dict = app_data["main_fig_links_dict"]
+    # Links are separated by ``None``, so every link takes 3 vals
+    link_count = sum([len(links_dict[link]["x"])//3 for link in links_dict])
+    return link_count + get_arc_count(app_data) > MAX_SVG_LINKS
+
+
+def get_arrowhead_count(app_data):
+    """Get the number of link and arc arrowheads in main fig.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :return: Number of arrowheads across all links and arcs
+    :rtype: int
+    """
+    ret = 0
+    for key in ["main_fig_link_arrowheads_dict",
+                "main_fig_arc_arrowheads_dict"]:
+        for link in app_data[key]:
+            ret += len(app_data[key][link]["x"])
+    return ret
+
+
+def get_arc_count(app_data):
+    """Get the number of arcs in main fig.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :return: Number of arcs across all links
+    :rtype: int
+    """
+    arcs_dict = app_data["main_fig_arcs_dict"]
+    return sum([len(arcs_dict[link]["x"]) for link in arcs_dict])
+
+
+def get_main_fig_arrowhead_graphs(app_data, arrowhead_size, webgl=False):
+    """Get plotly scatter objs of link and arc arrowheads in main fig.
+
+    This is an alternative to arrowhead annotations, which Plotly
+    renders as individual elements. All arrowheads of a link type are
+    drawn by one scatter obj, as filled triangles separated by
+    ``None``, pointing in the direction of the arrowhead vectors.
+
+    The plotly.js version bundled with our Dash version cannot rotate
+    scatter markers, and its triangle symbols only point in eight
+    directions. Polygons point in the exact direction of each link, but
+    take about three times as many vals as markers would. That is still
+    far fewer than annotations take. Unlike markers, polygons are sized
+    in axis units, so they grow when zooming in, like nodes do.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param arrowhead_size: Length of arrowheads, in pixels of the main
+        fig before zooming.
+    :type arrowhead_size: float
+    :param webgl: Use WebGL instead of SVG scatter objs
+    :type webgl: bool
+    :return: Plotly scatter traces of arrowheads in main fig
+    :rtype: list[dict]
+    """
+    trace_type = "scattergl" if webgl else "scatter"
+    xaxis_range = app_data["main_fig_xaxis_range"]
+    yaxis_range = app_data["main_fig_yaxis_range"]
+    x_pixel_per_unit = \
+        app_data["main_fig_width"] / (xaxis_range[1] - xaxis_range[0])
+    y_pixel_per_unit = \
+        app_data["main_fig_height"] / (yaxis_range[1] - yaxis_range[0])
+
+    ret = []
+    for link in app_data["link_color_dict"]:
+        arrowhead_x = []
+        arrowhead_y = []
+        for key in ["main_fig_link_arrowheads_dict",
+                    "main_fig_arc_arrowheads_dict"]:
+            if link in app_data[key]:
+                arrowhead_x += app_data[key][link]["x"]
+                arrowhead_y += app_data[key][link]["y"]
+
+        # Columns are tail and head of each arrowhead vector. Link types
+        # without arrowheads still get an empty trace, so selecting and
+        # filtering do not change the traces in main fig.
+        arrowhead_x = np.array(arrowhead_x, dtype=float).reshape(-1, 2)
+        arrowhead_y = np.array(arrowhead_y, dtype=float).reshape(-1, 2)
+        # Triangles are computed in pixels, so they are not skewed by
+        # axes with different scales.
+        dx = (arrowhead_x[:, 1] - arrowhead_x[:, 0]) * x_pixel_per_unit
+        dy = (arrowhead_y[:, 1] - arrowhead_y[:, 0]) * y_pixel_per_unit
+        length = np.hypot(dx, dy)
+        # Vectors without a direction point right
+        dx = np.where(length > 0, dx, 1)
+        dy = np.where(length > 0, dy, 0)
+        length = np.where(length > 0, length, 1)
+        back_x = -dx / length * arrowhead_size
+        back_y = -dy / length * arrowhead_size
+        side_x = -back_y * ARROWHEAD_POLYGON_WIDTH / 2
+        side_y = back_x * ARROWHEAD_POLYGON_WIDTH / 2
+
+        # Tip, two base corners and a ``None`` separator per arrowhead
+        polygon_x = np.empty((len(arrowhead_x), 4), dtype=object)
+        polygon_x[:, 0] = arrowhead_x[:, 1]
+        polygon_x[:, 1] = \
+            arrowhead_x[:, 1] + (back_x + side_x) / x_pixel_per_unit
+        polygon_x[:, 2] = \
+            arrowhead_x[:, 1] + (back_x - side_x) / x_pixel_per_unit
+        polygon_y = np.empty((len(arrowhead_y), 4), dtype=object)
+        polygon_y[:, 0] = arrowhead_y[:, 1]
+        polygon_y[:, 1] = \
+            arrowhead_y[:, 1] + (back_y + side_y) / y_pixel_per_unit
+        polygon_y[:, 2] = \
+            arrowhead_y[:, 1] + (back_y - side_y) / y_pixel_per_unit
+
+        (r, g, b) = app_data["link_color_dict"][link]
+        arrowhead_graph = dict(
+            type=trace_type,
+            x=polygon_x.ravel().tolist(),
+            y=polygon_y.ravel().tolist(),
+            mode="lines",
+            # Each segment b/w ``None`` vals is filled separately
+            fill="toself",
+            fillcolor="rgb(%s,%s,%s)" % (r, g, b),
+            line={
+                "width": 0,
+                "color": "rgb(%s,%s,%s)" % (r, g, b)
+            },
+            hoverinfo="skip",
+            name="main_fig_arrowheads_trace"
+        )
+        ret += [arrowhead_graph]
+
+    return ret
+
+
+def get_label_count(app_data):
+    """Get the number of link and arc weight labels in main fig.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :return: Number of weight labels across all links and arcs
+    :rtype: int
+    """
+    ret = 0
+    for key in ["main_fig_link_labels_dict", "main_fig_arc_labels_dict"]:
+        for link in app_data[key]:
+            ret += len(app_data[key][link]["x"])
+    return ret
+
+
+def get_main_fig_label_graphs(app_data, webgl=False):
+    """Get plotly scatter objs of link and arc weight labels in main fig.
+
+    This is an alternative to label annotations, which Plotly renders
+    as individual elements. All labels of a link type are drawn by one
+    scatter obj. The white background of annotations is approximated
+    with white square markers behind the text.
+
+    Scatter text cannot be angled, so the angle of each link label is
+    kept in ``customdata``. ``get_zoomed_in_label_annotations`` uses it
+    to draw angled annotations once the user zooms in far enough.
+
+    :param app_data: ``data_parser.get_app_data`` ret val
+    :type app_data: dict
+    :param webgl: Use WebGL instead of SVG scatter objs
+    :type webgl: bool
+    :return: Plotly scatter traces of weight labels in main fig
+    :rtype: list[dict]
+    """
+    trace_type = "scattergl" if webgl else "scatter"
+    ret = []
+    for link in app_data["link_color_dict"]:
+        label_x = []
+        label_y = []
+        label_text = []
+        label_angle = []
+        if link in app_data["main_fig_link_labels_dict"]:
+            link_label_dict = app_data["main_fig_link_labels_dict"][link]
+            label_x += link_label_dict["x"]
+            label_y += link_label_dict["y"]
+            label_text += link_label_dict["text"]
+            label_angle += link_label_dict["textangle"]
+        if link in app_data["main_fig_arc_labels_dict"]:
+            arc_label_dict = app_data["main_fig_arc_labels_dict"][link]
+            label_x += arc_label_dict["x"]
+            label_y += arc_label_dict["y"]
+            label_text += arc_label_dict["text"]
+            label_angle += [0 for _ in arc_label_dict["x"]]
+
+        (r, g, b) = app_data["link_color_dict"][link]
+        label_graph = dict(
+            type=trace_type,
+            x=label_x,
+            y=label_y,
+            mode="markers+text",
+            marker={
+                "color": "white",
+                "size": [max(14, 7 * len(str(e))) for e in label_text],
+                "symbol": "square",
+                "line": {
+                    "width": 0
+                }
+            },
+            text=label_text,
+            textfont={
+                "color": "rgb(%s, %s, %s)" % (r, g, b),
+                "size": 12
+            },
+            textposition="middle center",
+            hoverinfo="skip",
+            name="main_fig_labels_trace",
+            customdata=label_angle
+        )
+        ret += [label_graph]
+
+    return ret
+
+
+def get_zoomed_in_label_annotations(main_fig, xaxis_range, yaxis_range):
+    """Get angled annotations for weight labels drawn as text traces.
+
+    Only labels inside the visible ranges of a zoomed in main fig are
+    returned, which keeps the number of annotations small.
+
+    :param main_fig: Main fig with weight labels drawn as text traces
+    :type main_fig: dict
+    :param xaxis_range: Visible main fig x-axis min and max val
+    :type xaxis_range: list
+    :param yaxis_range: Visible main fig y-axis min and max val
+    :type yaxis_range: list
+    :return: list of annotations to be added as weight labels
+    :rtype: list
+    """
+    [xmin, xmax] = xaxis_range
+    [ymin, ymax] = yaxis_range
+    annotations = []
+    for trace in main_fig["data"]:
+        if "name" not in trace or trace["name"] != "main_fig_labels_trace":
+            continue
+        text_list = trace["text"]
+        # ``get_compact_fig`` sends lists with one distinct val as that val
+        if not isinstance(text_list, (list, tuple)):
+            text_list = [text_list] * len(trace["x"])
+        zip_obj = zip(trace["x"], trace["y"], text_list,
+                      trace["customdata"])
+        for (x, y, text, textangle) in zip_obj:
+            if not (xmin <= x <= xmax and ymin <= y <= ymax):
+                continue
+            annotations.append({
+                "x": x,
+                "y": y,
+                "text": text,
+                "textangle": textangle,
+                "showarrow": False,
+                "font": {
+                    "color": trace["textfont"]["color"],
+                    "size": 12
+                },
+                "bgcolor": "white",
+                "name": "main_fig_label_annotation"
+            })
+
+    return annotations
+
+
+def update_main_fig_text_labels(main_fig, xaxis_range, yaxis_range,
+                                change_in_range):
+    """Update weight labels drawn as text traces after zooming.
+
+    If the main fig is zoomed in far enough, the text traces are hidden
+    and replaced by angled annotations for visible labels. Otherwise,
+    the text traces are shown and those annotations are removed.
+
+    :param main_fig: Main fig that may have weight labels drawn as text
+        traces.
+    :type main_fig: dict
+    :param xaxis_range: Visible main fig x-axis min and max val
+    :type xaxis_range: list
+    :param yaxis_range: Visible main fig y-axis min and max val
+    :type yaxis_range: list
+    :param change_in_range: Visible range as a fraction of full range
+    :type change_in_range: float
+    """
+    label_traces = [e for e in main_fig["data"]
+                    if e.get("name") == "main_fig_labels_trace"]
+    if not label_traces:
+        return
+
+    zoomed_in = change_in_range <= MAX_TEXT_LABEL_ZOOM
+    annotations = [e for e in main_fig["layout"].get("annotations", [])
+                   if e.get("name") != "main_fig_label_annotation"]
+    if zoomed_in:
+        annotations += get_zoomed_in_label_annotations(main_fig,
+                                                       xaxis_range,
+                                                       yaxis_range)
+    for trace in label_traces:
+        trace["visible"] = not zoomed_in
+    main_fig["layout"]["annotations"] = annotations
+
+
+def update_main_fig_zoom(main_fig, xaxis_range, yaxis_range,
+                         change_in_range):
+    """Update visible ranges of main fig, and resize nodes and text.
+
+    The ``updateMainVizFigs`` clientside callback does the same when
+    users zoom, so figs generated while zoomed in match it.
+
+    :param main_fig: Main fig
+    :type main_fig: dict
+    :param xaxis_range: Visible main fig x-axis min and max val
+    :type xaxis_range: list
+    :param yaxis_range: Visible main fig y-axis min and max val
+    :type yaxis_range: list
+    :param change_in_range: Visible range as a fraction of full range
+    :type change_in_range: float
+    """
+    # TODO do not used hardcoded values
+    update_fig_traces(main_fig,
+                      {"marker": {"size": max(1, 24/change_in_range)},
+                       "textfont": {"size": max(1, 16/change_in_range)}},
+                      selector={"name": "main_fig_nodes_trace"})
+    update_fig_layout(main_fig,
+                      {"xaxis": {"range": xaxis_range, "autorange": False},
+                       "yaxis": {"range": yaxis_range, "autorange": False}})
+    update_main_fig_text_labels(main_fig,
+                                xaxis_range,
+                                yaxis_range,
+                                change_in_range)
+
+
 def get_link_label_annotations(app_data):
     """Get annotations to be added as link labels to main fig.
 
@@ -346,9 +1312,8 @@ def get_arc_shapes(app_data, line_width):
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly figure object that shows the arc links on the main
-        graph.
-    :rtype: go.Figure
+    :return: Plotly shapes that show the arc links on the main graph
+    :rtype: list[dict]
     """
     shapes = []
     for link in app_data["main_fig_arcs_dict"]:
@@ -360,8 +1325,10 @@ def get_arc_shapes(app_data, line_width):
             shapes.append({
                 "type": "path",
                 "path": "M %s,%s Q %s,%s %s,%s  " % (x0, y0, cx, cy, x1, y1),
-                "line_color": "rgb(%s, %s, %s)" % (r, g, b),
-                "line_width": line_width,
+                "line": {
+                    "color": "rgb(%s, %s, %s)" % (r, g, b),
+                    "width": line_width
+                },
                 "layer": "below"
             })
     return shapes
@@ -400,12 +1367,13 @@ def get_main_fig_x_axis(app_data):
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly figure object that shows the x-axis belonging to
+    :return: Plotly figure dict that shows the x-axis belonging to
         the main graph.
-    :rtype: go.Figure
+    :rtype: dict
     """
-    ret = go.Figure(
-        go.Scatter(
+    ret = get_fig(
+        data=[dict(
+            type="scatter",
             x=app_data["main_fig_xaxis_tickvals"],
             y=[0.5 for _ in app_data["main_fig_xaxis_tickvals"]],
             mode="text",
@@ -416,7 +1384,7 @@ def get_main_fig_x_axis(app_data):
             hoverinfo="skip",
             name="main_fig_x_axis_trace",
             customdata=app_data["main_fig_xaxis_range"]
-        ),
+        )],
         layout={
             "margin": {
                 "l": 0, "r": 0, "t": 0, "b": 0
@@ -433,7 +1401,7 @@ def get_main_fig_x_axis(app_data):
                 "visible": False
             },
             "plot_bgcolor": "white"
-        },
+        }
     )
     return ret
 
@@ -443,12 +1411,13 @@ def get_main_fig_y_axis(app_data):
 
     :param app_data: ``data_parser.get_app_data`` ret val
     :type app_data: dict
-    :return: Plotly figure object that shows the y-axis belonging to
+    :return: Plotly figure dict that shows the y-axis belonging to
         the main graph.
-    :rtype: go.Figure
+    :rtype: dict
     """
-    ret = go.Figure(
-        go.Scatter(
+    ret = get_fig(
+        data=[dict(
+            type="scatter",
             x=[0.5 for _ in app_data["main_fig_yaxis_tickvals"]],
             y=app_data["main_fig_yaxis_tickvals"],
             mode="text",
@@ -459,7 +1428,7 @@ def get_main_fig_y_axis(app_data):
             hoverinfo="skip",
             name="main_fig_y_axis_trace",
             customdata=app_data["main_fig_yaxis_range"]
-        ),
+        )],
         layout={
             "margin": {
                 "l": 0, "r": 0, "t": 0, "b": 0
@@ -476,6 +1445,283 @@ def get_main_fig_y_axis(app_data):
                 "visible": False
             },
             "plot_bgcolor": "white"
-        },
+        }
     )
     return ret
+
+
+def get_rounded_vals(vals, precision=COORD_PRECISION):
+    """Round floats in a list of vals.
+
+    :param vals: Vals to round. Vals that are not floats, like
+        ``None`` separators, are unchanged.
+    :type vals: list|tuple
+    :param precision: Number of decimals kept
+    :type precision: int
+    :return: Rounded vals
+    :rtype: list
+    """
+    return [round(e, precision) if isinstance(e, float) else e for e in vals]
+
+
+def get_collapsed_attrs(attrs):
+    """Replace array attributes where every val is the same.
+
+    :param attrs: Dict of trace, marker or textfont attributes
+    :type attrs: dict
+    :return: ``attrs``, with every array in ``COLLAPSIBLE_ATTRS`` that
+        has a single distinct val replaced by that val.
+    :rtype: dict
+    """
+    ret = dict(attrs)
+    for attr in COLLAPSIBLE_ATTRS:
+        vals = ret.get(attr)
+        if not isinstance(vals, (list, tuple)) or not vals:
+            continue
+        if all(e == vals[0] for e in vals):
+            ret[attr] = vals[0]
+    return ret
+
+
+def get_compact_fig(fig, precision=COORD_PRECISION):
+    """Get a fig that is smaller to send to the browser.
+
+    Coordinates of traces, annotations and shapes are rounded, and
+    array attributes of traces where every val is the same are replaced
+    by a single val.
+
+    Plotly typed arrays would be smaller still, but the plotly.js
+    version bundled with our Dash version does not support them.
+
+    :param fig: Plotly figure dict
+    :type fig: dict
+    :param precision: Number of decimals kept in coordinates
+    :type precision: int
+    :return: Copy of ``fig`` with rounded coordinates and collapsed
+        arrays.
+    :rtype: dict
+    """
+    data = [get_compact_trace(e, precision=precision) for e in fig["data"]]
+    return {"data": data,
+            "layout": get_compact_layout(fig["layout"], precision=precision)}
+
+
+def get_compact_trace(trace, precision=COORD_PRECISION):
+    """Get a trace that is smaller to send to the browser.
+
+    :param trace: Plotly trace dict
+    :type trace: dict
+    :param precision: Number of decimals kept in coordinates
+    :type precision: int
+    :return: Copy of ``trace`` with rounded coordinates and collapsed
+        arrays.
+    :rtype: dict
+    """
+    trace = dict(trace)
+    for axis in ["x", "y"]:
+        if axis in trace and trace[axis] is not None:
+            trace[axis] = get_rounded_vals(trace[axis], precision)
+    trace = get_collapsed_attrs(trace)
+    for attr in ["marker", "textfont"]:
+        if attr in trace:
+            trace[attr] = get_collapsed_attrs(trace[attr])
+    return trace
+
+
+def get_compact_layout(layout, precision=COORD_PRECISION):
+    """Get a layout that is smaller to send to the browser.
+
+    :param layout: Plotly layout dict
+    :type layout: dict
+    :param precision: Number of decimals kept in coordinates
+    :type precision: int
+    :return: Copy of ``layout`` with rounded coordinates of annotations
+        and shapes.
+    :rtype: dict
+    """
+    layout = dict(layout)
+    annotations = []
+    for annotation in layout.get("annotations", []):
+        annotation = dict(annotation)
+        for attr in ["x", "y", "ax", "ay"]:
+            if isinstance(annotation.get(attr), float):
+                annotation[attr] = round(annotation[attr], precision)
+        annotations.append(annotation)
+    shapes = []
+    for shape in layout.get("shapes", []):
+        shape = dict(shape)
+        if "path" in shape:
+            shape["path"] = FLOAT_REGEX.sub(
+                lambda m: str(round(float(m.group()), precision)),
+                shape["path"]
+            )
+        shapes.append(shape)
+    if "annotations" in layout:
+        layout["annotations"] = annotations
+    if "shapes" in layout:
+        layout["shapes"] = shapes
+
+    return layout
+
+
+def get_fig(data, layout):
+    """Get Plotly figure dict.
+
+    :param data: Plotly trace dicts
+    :type data: list[dict]
+    :param layout: Plotly layout dict, without a template
+    :type layout: dict
+    :return: Plotly figure dict, using ``FIG_TEMPLATE``
+    :rtype: dict
+    """
+    return {"data": data, "layout": dict(layout, template=FIG_TEMPLATE)}
+
+
+def get_nested_dict_diff(old_dict, new_dict):
+    """Get vals in a dict that differ from vals in an older dict.
+
+    Nested dicts are compared recursively, so only their changed vals
+    are returned. Other vals, like lists, are compared as a whole.
+    Keys only in ``old_dict`` are ignored.
+
+    :param old_dict: Older dict
+    :type old_dict: dict
+    :param new_dict: Newer dict
+    :type new_dict: dict
+    :return: Vals that ``update_nested_dict`` can use to turn
+        ``old_dict`` into ``new_dict``.
+    :rtype: dict
+    """
+    ret = {}
+    for key, new_val in new_dict.items():
+        old_val = old_dict.get(key)
+        if isinstance(new_val, dict) and isinstance(old_val, dict):
+            nested_diff = get_nested_dict_diff(old_val, new_val)
+            if nested_diff:
+                ret[key] = nested_diff
+        elif key not in old_dict or old_val != new_val:
+            ret[key] = new_val
+    return ret
+
+
+def get_fig_diff(old_fig, new_fig, trace_indices=None):
+    """Get trace and layout props that differ b/w two figs.
+
+    Selecting and filtering only change a few props of an otherwise
+    unchanged fig, like node opacities, so sending just those props is
+    much cheaper than sending the new fig.
+
+    :param old_fig: Plotly figure dict currently in the browser
+    :type old_fig: dict
+    :param new_fig: Plotly figure dict that should replace it
+    :type new_fig: dict
+    :param trace_indices: Indices of the only traces that may differ,
+        like those patched by ``get_patched_fig``. Defaults to every
+        trace.
+    :type trace_indices: list[int]
+    :return: Dict with a ``data`` dict mapping trace indices to changed
+        trace props, and a ``layout`` dict of changed layout props. If
+        the figs do not have the same traces, ``None`` is returned.
+    :rtype: dict|None
+    """
+    old_data = (old_fig or {}).get("data")
+    if old_data is None or len(old_data) != len(new_fig["data"]):
+        return None
+    if trace_indices is None:
+        trace_indices = range(len(old_data))
+    data_diff = {}
+    for i in trace_indices:
+        old_trace = old_data[i]
+        new_trace = new_fig["data"][i]
+        for attr in ["type", "name"]:
+            if old_trace.get(attr) != new_trace.get(attr):
+                return None
+        trace_diff = get_nested_dict_diff(old_trace, new_trace)
+        if trace_diff:
+            data_diff[i] = trace_diff
+    layout_diff = get_nested_dict_diff(old_fig.get("layout", {}),
+                                       new_fig["layout"])
+    return {"data": data_diff, "layout": layout_diff}
+
+
+def get_patched_fig(fig, patch):
+    """Get a compact fig with new props from a patch.
+
+    Only the patched traces and the layout are copied, so the other
+    traces are shared with ``fig``.
+
+    :param fig: Compact Plotly figure dict
+    :type fig: dict
+    :param patch: ``get_main_fig_patch`` or
+        ``get_zoomed_out_main_fig_patch`` ret val for ``fig``.
+    :type patch: dict
+    :return: Compact Plotly figure dict, with patched props merged
+        into ``fig`` like ``update_nested_dict`` merges them.
+    :rtype: dict
+    """
+    data = list(fig["data"])
+    for i, trace_patch in patch["data"].items():
+        trace = get_dict_copy(data[i])
+        update_nested_dict(trace, trace_patch)
+        data[i] = get_compact_trace(trace)
+    layout = get_dict_copy(fig["layout"])
+    update_nested_dict(layout, patch["layout"])
+    return {"data": data, "layout": get_compact_layout(layout)}
+
+
+def get_dict_copy(val):
+    """Copy nested dicts, without copying other vals like lists.
+
+    :param val: Val to copy
+    :return: Copy of ``val`` if it is a dict, otherwise ``val``
+    """
+    if not isinstance(val, dict):
+        return val
+    return {k: get_dict_copy(v) for k, v in val.items()}
+
+
+def update_nested_dict(nested_dict, updates):
+    """Recursively update a dict, like Plotly updates figure props.
+
+    Nested dicts in ``updates`` are merged into ``nested_dict``,
+    instead of replacing them.
+
+    :param nested_dict: Dict to update in place
+    :type nested_dict: dict
+    :param updates: Dict of new vals
+    :type updates: dict
+    """
+    for key, val in updates.items():
+        if isinstance(val, dict):
+            if not isinstance(nested_dict.get(key), dict):
+                nested_dict[key] = {}
+            update_nested_dict(nested_dict[key], val)
+        else:
+            nested_dict[key] = val
+
+
+def update_fig_traces(fig, updates, selector=None):
+    """Update traces in a Plotly figure dict.
+
+    :param fig: Plotly figure dict to update in place
+    :type fig: dict
+    :param updates: Dict of new trace props
+    :type updates: dict
+    :param selector: Only update traces with these top-level props
+    :type selector: dict
+    """
+    for trace in fig["data"]:
+        if selector and any(trace.get(k) != v for k, v in selector.items()):
+            continue
+        update_nested_dict(trace, updates)
+
+
+def update_fig_layout(fig, updates):
+    """Update layout of a Plotly figure dict.
+
+    :param fig: Plotly figure dict to update in place
+    :type fig: dict
+    :param updates: Dict of new layout props
+    :type updates: dict
+    """
+    update_nested_dict(fig["layout"], updates)
@@ -7,12 +7,16 @@ import dash_core_components as dcc
 from dash_html_components import A, B, Br, Hr, I, P, H5
 
 
-def get_upload_data_modal():
+def get_upload_data_modal(bundle_ids=None):
     """Get modal for uploading data.
 
+    :param bundle_ids: Ids of bundles that can be opened instead
+    :type bundle_ids: list[str]
     :return: Modal for uploading data
     :rtype: dbc.Modal
     """
+    if bundle_ids is None:
+        bundle_ids = []
     ret = dbc.Modal(
         [
             dbc.ModalHeader("Upload data"),
@@ -34,10 +38,54 @@ def get_upload_data_modal():
                                color="light"),
                     id="upload-matrix-file",
                     className="mt-1"
+                ),
+                dbc.Checklist(
+                    options=[{"label": "Append samples to current data",
+                              "value": "append"}],
+                    value=[],
+                    id="append-data-switch",
+                    switch=True,
+                    className="mt-2"
+                ),
+                Hr(),
+                dbc.InputGroup(
+                    [
+                        dbc.Select(
+                            id="bundle-select",
+                            placeholder="Or open precomputed data",
+                            options=[{"label": e, "value": e}
+                                     for e in bundle_ids],
+                            disabled=not bundle_ids
+                        ),
+                        dbc.InputGroupAddon(
+                            dbc.Button("Open",
+                                       id="open-bundle-btn",
+                                       disabled=not bundle_ids),
+                            addon_type="append"
+                        )
+                    ]
                 )
             ]),
             dbc.ModalFooter(
-                dbc.Button("Visualize", id="viz-btn")
+                dbc.Row(
+                    [
+                        dbc.Col(
+                            dbc.Label(None,
+                                      id="upload-error-msg-label",
+                                      color="danger",
+                                      className="mb-0"),
+                            id="upload-error-msg-col",
+                            className="text-right my-auto",
+                            style={"visibility": "hidden"}
+                        ),
+                        dbc.Col(
+                            dbc.Button("Visualize", id="viz-btn"),
+                            className="text-right my-auto",
+                            width=4
+                        )
+                    ],
+                    style={"width": "100%"}
+                )
             )
         ],
         id="upload-data-modal"
@@ -0,0 +1,226 @@
+"""Fns for generating app data and figs outside of the viz.
+
+Running this script generates app data, links and figs for datasets,
+optionally in parallel, and writes them to disk with the time each
+stage took. Bundles the viz can open may be saved as well.
+"""
+
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from json import dump
+from pathlib import Path
+import pickle
+from time import perf_counter
+
+from plotly.utils import PlotlyJSONEncoder
+
+from bundles import (get_initial_unfiltered_app_data_dict,
+                     read_dataset_files,
+                     write_bundle)
+from data_parser import (get_node_filtered_app_data,
+                         get_weight_filtered_app_data)
+from main_fig_generator import (get_main_fig,
+                                get_main_fig_x_axis,
+                                get_main_fig_y_axis,
+                                get_zoomed_out_main_fig,
+                                is_zoomed_out_lod_needed)
+
+
+def precompute_dataset(output_dir, sample_file_path, config_file_path,
+                       matrix_file_path=None, bundle_dir=None):
+    """Write app data, links and figs for a dataset.
+
+    App data is generated the same way the viz first generates it,
+    without selected nodes or filters set through the ui. These files
+    are written to ``output_dir``:
+
+    * ``app_data.pickle``: ``data_parser.get_app_data`` ret vals for
+      the main fig, and the zoomed-out main fig if it is different
+    * ``links.json``: Links of each link type, as sample, other sample
+      and weight, before weight filters are applied
+    * ``main_fig.json``, ``main_fig_x_axis.json``,
+      ``main_fig_y_axis.json``, ``zoomed_out_main_fig.json``: Plotly
+      figure dicts
+    * ``timings.json``: Seconds each stage took
+
+    :param output_dir: Dir files are written to
+    :type output_dir: Path
+    :param sample_file_path: Path of sample file
+    :type sample_file_path: str|Path
+    :param config_file_path: Path of config file
+    :type config_file_path: str|Path
+    :param matrix_file_path: Path of matrix file
+    :type matrix_file_path: str|Path
+    :param bundle_dir: Dir a bundle named after ``output_dir`` is
+        saved in, if any.
+    :type bundle_dir: Path
+    :return: Seconds each stage took
+    :rtype: dict[str, float]
+    """
+    stage_start_list = []
+
+    def stage_callback(stage):
+        stage_start_list.append((stage, perf_counter()))
+
+    start = perf_counter()
+    file_strs = read_dataset_files(sample_file_path,
+                                   config_file_path,
+                                   matrix_file_path=matrix_file_path)
+    unfiltered_app_data_dict = \
+        get_initial_unfiltered_app_data_dict(*file_strs,
+                                             stage_callback=stage_callback)
+    stage_start_list.append((None, perf_counter()))
+    timings = {"read": stage_start_list[0][1] - start}
+    stage_prefix = ""
+    for (stage, stage_start), (_, stage_end) in zip(stage_start_list,
+                                                    stage_start_list[1:]):
+        # App data for the zoomed-out main fig is generated after, from
+        # the first stage again.
+        if stage_prefix + stage in timings:
+            stage_prefix = "zoomed_out_"
+        timings[stage_prefix + stage] = stage_end - stage_start
+
+    start = perf_counter()
+    weight_filtered_app_data_dict = \
+        {k: get_weight_filtered_app_data(v)
+         for k, v in unfiltered_app_data_dict.items()}
+    timings["weight_filters"] = perf_counter() - start
+
+    start = perf_counter()
+    app_data = get_node_filtered_app_data(weight_filtered_app_data_dict[False])
+    if True in weight_filtered_app_data_dict:
+        zoomed_out_app_data = \
+            get_node_filtered_app_data(weight_filtered_app_data_dict[True])
+    else:
+        zoomed_out_app_data = app_data
+    timings["node_states"] = perf_counter() - start
+
+    fig_fn_dict = {
+        "main_fig": lambda: get_main_fig(app_data),
+        "main_fig_x_axis": lambda: get_main_fig_x_axis(app_data),
+        "main_fig_y_axis": lambda: get_main_fig_y_axis(app_data),
+        "zoomed_out_main_fig": lambda: get_zoomed_out_main_fig(
+            zoomed_out_app_data,
+            lod=is_zoomed_out_lod_needed(app_data),
+            main_fig_app_data=app_data
+        )
+    }
+    fig_dict = {}
+    for fig_name, fig_fn in fig_fn_dict.items():
+        start = perf_counter()
+        fig_dict[fig_name] = fig_fn()
+        timings[fig_name] = perf_counter() - start
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    with open(output_dir / "app_data.pickle", "wb") as fp:
+        pickle.dump({"app_data": app_data,
+                     "zoomed_out_app_data": zoomed_out_app_data},
+                    fp,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    sample_links_dict = unfiltered_app_data_dict[False]["sample_links_dict"]
+    links_dict = {
+        link: [[sample, other_sample, None if v is None else v["weight"]]
+               for (sample, other_sample), v in link_dict.items()]
+        for link, link_dict in sample_links_dict.items()
+    }
+    with open(output_dir / "links.json", "w") as fp:
+        dump(links_dict, fp, cls=PlotlyJSONEncoder)
+    for fig_name, fig in fig_dict.items():
+        with open(output_dir / ("%s.json" % fig_name), "w") as fp:
+            dump(fig, fp, cls=PlotlyJSONEncoder)
+    with open(output_dir / "timings.json", "w") as fp:
+        dump(timings, fp, indent=2)
+
+    if bundle_dir is not None:
+        write_bundle(output_dir.name,
+                     file_strs,
+                     unfiltered_app_data_dict,
+                     bundle_dir=bundle_dir)
+    return timings
+
+
+def precompute_datasets(output_dir, dataset_list, processes=1,
+                        bundle_dir=None):
+    """Write app data, links and figs for several datasets.
+
+    :param output_dir: Dir with a subdir for each dataset, named after
+        its sample file.
+    :type output_dir: Path
+    :param dataset_list: Paths of sample, config and optionally matrix
+        file of each dataset.
+    :type dataset_list: list[list[str]]
+    :param processes: Number of datasets processed at once
+    :type processes: int
+    :param bundle_dir: Dir bundles named after sample files are saved
+        in, if any.
+    :type bundle_dir: Path
+    :return: Dict mapping sample file names to ``precompute_dataset``
+        ret vals, or the exceptions raised.
+    :rtype: dict[str, dict[str, float]|Exception]
+    """
+    dataset_dict = {Path(e[0]).stem: e for e in dataset_list}
+    if len(dataset_dict) < len(dataset_list):
+        raise ValueError("Sample files must have different names")
+
+    ret = {}
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        future_dict = {
+            executor.submit(precompute_dataset,
+                            output_dir / name,
+                            *dataset,
+                            bundle_dir=bundle_dir): name
+            for name, dataset in dataset_dict.items()
+        }
+        for future, name in future_dict.items():
+            try:
+                ret[name] = future.result()
+            except Exception as e:
+                ret[name] = e
+    return ret
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Write app data, links and figs "
+                                        "of datasets to disk.")
+    parser.add_argument("--dataset",
+                        nargs="+",
+                        action="append",
+                        required=True,
+                        metavar="FILE",
+                        help="Paths of sample file, config file, and "
+                             "optionally matrix file. Repeat for more "
+                             "datasets.")
+    parser.add_argument("--output-dir",
+                        type=Path,
+                        default=Path("precomputed"),
+                        help="Dir with a subdir for each dataset")
+    parser.add_argument("--processes",
+                        type=int,
+                        default=1,
+                        help="Number of datasets processed at once")
+    parser.add_argument("--bundle-dir",
+                        type=Path,
+                        help="Also save bundles the viz can open here")
+    args = parser.parse_args()
+    for dataset_args in args.dataset:
+        if len(dataset_args) not in [2, 3]:
+            parser.error("--dataset takes 2 or 3 paths")
+
+    try:
+        results = precompute_datasets(args.output_dir,
+                                      args.dataset,
+                                      processes=args.processes,
+                                      bundle_dir=args.bundle_dir)
+    except ValueError as e:
+        parser.error(str(e))
+    failed = False
+    for name, result in results.items():
+        if isinstance(result, Exception):
+            failed = True
+            print("%s: failed: %r" % (name, result))
+            continue
+        print("%s: %.2fs" % (name, sum(result.values())))
+        for stage, seconds in result.items():
+            print("  %s: %.3fs" % (stage, seconds))
+    if failed:
+        raise SystemExit(1)
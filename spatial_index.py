@@ -0,0 +1,179 @@
+"""Spatial index used to query main fig elements by position."""
+
+import numpy as np
+
+
+class GridIndex:
+    """Uniform grid over the bounding boxes of elements.
+
+    Each element is registered in every grid cell its bounding box
+    overlaps, so queries only check elements in nearby cells. Elements
+    that overlap too many cells, like very long links, are kept in a
+    separate list that is checked by every query instead.
+    """
+
+    def __init__(self, x_min, x_max, y_min, y_max, max_cells_per_element=64):
+        """Build index.
+
+        :param x_min: Min x val of each element
+        :type x_min: np.ndarray
+        :param x_max: Max x val of each element
+        :type x_max: np.ndarray
+        :param y_min: Min y val of each element
+        :type y_min: np.ndarray
+        :param y_max: Max y val of each element
+        :type y_max: np.ndarray
+        :param max_cells_per_element: Elements overlapping more cells
+            than this are not registered in cells.
+        :type max_cells_per_element: int
+        """
+        self.x_min = np.asarray(x_min, dtype=float)
+        self.x_max = np.asarray(x_max, dtype=float)
+        self.y_min = np.asarray(y_min, dtype=float)
+        self.y_max = np.asarray(y_max, dtype=float)
+        num_of_elements = len(self.x_min)
+
+        if num_of_elements:
+            self.origin = (self.x_min.min(), self.y_min.min())
+            width = max(self.x_max.max() - self.origin[0], 1e-9)
+            height = max(self.y_max.max() - self.origin[1], 1e-9)
+        else:
+            self.origin = (0, 0)
+            width = height = 1
+        # About one element per cell, if elements were spread evenly
+        cells_per_axis = max(1, int(np.sqrt(num_of_elements)))
+        self.cell_width = width / cells_per_axis
+        self.cell_height = height / cells_per_axis
+        self.num_of_cols = cells_per_axis
+        self.num_of_rows = cells_per_axis
+
+        col_min, row_min = self.get_cell_coords(self.x_min, self.y_min)
+        col_max, row_max = self.get_cell_coords(self.x_max, self.y_max)
+        cols_per_element = col_max - col_min + 1
+        cells_per_element = cols_per_element * (row_max - row_min + 1)
+        is_large = cells_per_element > max_cells_per_element
+        self.large_elements = np.flatnonzero(is_large)
+
+        # Expand each element into one entry per overlapped cell
+        elements = np.flatnonzero(~is_large)
+        entry_counts = cells_per_element[elements]
+        entry_elements = np.repeat(elements, entry_counts)
+        entry_offsets = np.arange(entry_counts.sum())
+        entry_offsets -= np.repeat(np.cumsum(entry_counts) - entry_counts,
+                                   entry_counts)
+        entry_widths = cols_per_element[entry_elements]
+        entry_cols = col_min[entry_elements] + entry_offsets % entry_widths
+        entry_rows = row_min[entry_elements] + entry_offsets // entry_widths
+        entry_cells = entry_rows * self.num_of_cols + entry_cols
+
+        order = np.argsort(entry_cells, kind="stable")
+        self.cell_elements = entry_elements[order]
+        self.cell_starts = np.searchsorted(
+            entry_cells[order],
+            np.arange(self.num_of_rows * self.num_of_cols + 1)
+        )
+
+    def __len__(self):
+        return len(self.x_min)
+
+    def get_cell_coords(self, x, y):
+        """Get cols and rows of grid cells containing points.
+
+        Points outside the grid are assigned to the nearest cell.
+
+        :param x: x vals of points
+        :type x: np.ndarray|float
+        :param y: y vals of points
+        :type y: np.ndarray|float
+        :return: Cols and rows of cells
+        :rtype: tuple[np.ndarray]
+        """
+        cols = np.floor((np.asarray(x) - self.origin[0]) / self.cell_width)
+        rows = np.floor((np.asarray(y) - self.origin[1]) / self.cell_height)
+        cols = np.clip(cols, 0, self.num_of_cols - 1).astype(int)
+        rows = np.clip(rows, 0, self.num_of_rows - 1).astype(int)
+        return cols, rows
+
+    def get_candidates(self, col_min, col_max, row_min, row_max):
+        """Get elements registered in a block of cells, or large.
+
+        :param col_min: First col of block
+        :type col_min: int
+        :param col_max: Last col of block
+        :type col_max: int
+        :param row_min: First row of block
+        :type row_min: int
+        :param row_max: Last row of block
+        :type row_max: int
+        :return: Unique indices of candidate elements
+        :rtype: np.ndarray
+        """
+        candidates = [self.large_elements]
+        for row in range(row_min, row_max + 1):
+            first_cell = row * self.num_of_cols + col_min
+            last_cell = row * self.num_of_cols + col_max
+            start = self.cell_starts[first_cell]
+            stop = self.cell_starts[last_cell + 1]
+            candidates.append(self.cell_elements[start:stop])
+        return np.unique(np.concatenate(candidates))
+
+    def query_range(self, x_range, y_range):
+        """Get elements with bounding boxes intersecting a range.
+
+        :param x_range: Min and max x vals of range
+        :type x_range: list[float]
+        :param y_range: Min and max y vals of range
+        :type y_range: list[float]
+        :return: Sorted indices of elements in range
+        :rtype: np.ndarray
+        """
+        if not len(self):
+            return np.array([], dtype=int)
+        col_min, row_min = self.get_cell_coords(x_range[0], y_range[0])
+        col_max, row_max = self.get_cell_coords(x_range[1], y_range[1])
+        candidates = self.get_candidates(col_min, col_max, row_min, row_max)
+        in_range = ((self.x_max[candidates] >= x_range[0])
+                    & (self.x_min[candidates] <= x_range[1])
+                    & (self.y_max[candidates] >= y_range[0])
+                    & (self.y_min[candidates] <= y_range[1]))
+        return candidates[in_range]
+
+    def query_nearest(self, x, y):
+        """Get element with bounding box nearest to a point.
+
+        We search blocks of cells of increasing size around the point,
+        until the nearest candidate is closer than any element outside
+        the block could be.
+
+        :param x: x val of point
+        :type x: float
+        :param y: y val of point
+        :type y: float
+        :return: Index of nearest element, or ``None`` if there are no
+            elements.
+        :rtype: int|None
+        """
+        if not len(self):
+            return None
+        col, row = self.get_cell_coords(x, y)
+        max_radius = max(self.num_of_cols, self.num_of_rows)
+        for radius in range(max_radius + 1):
+            candidates = self.get_candidates(
+                max(0, col - radius), min(self.num_of_cols - 1, col + radius),
+                max(0, row - radius), min(self.num_of_rows - 1, row + radius)
+            )
+            if not len(candidates):
+                continue
+            dx = np.maximum.reduce([self.x_min[candidates] - x,
+                                    np.zeros(len(candidates)),
+                                    x - self.x_max[candidates]])
+            dy = np.maximum.reduce([self.y_min[candidates] - y,
+                                    np.zeros(len(candidates)),
+                                    y - self.y_max[candidates]])
+            distances = np.hypot(dx, dy)
+            nearest = np.argmin(distances)
+            # Elements outside the block are at least this far away
+            block_distance = \
+                radius * min(self.cell_width, self.cell_height)
+            if distances[nearest] <= block_distance or radius == max_radius:
+                return int(candidates[nearest])